@@ -1,6 +1,28 @@
-# Import the actual graph implementations
-from agent.chatbot_graph import chatbot_graph
-from agent.deep_researcher import deep_researcher_graph
-from agent.math_agent import math_agent_graph
+"""Agent graphs of the backend, loaded lazily through the registry."""
 
-__all__ = ["deep_researcher_graph", "chatbot_graph", "math_agent_graph"]
+# Graphs are compiled lazily on first access through the registry, so importing
+# the package stays cheap and one misconfigured graph does not break the others
+from agent.registry import get_graph, registry
+
+_GRAPH_ATTRIBUTES = {
+    "deep_researcher_graph": "deep_researcher",
+    "chatbot_graph": "chatbot",
+    "math_agent_graph": "math_agent",
+}
+
+
+def __getattr__(name: str):
+    if name in _GRAPH_ATTRIBUTES:
+        graph = get_graph(_GRAPH_ATTRIBUTES[name])
+        globals()[name] = graph
+        return graph
+    raise AttributeError(f"module 'agent' has no attribute {name!r}")
+
+
+__all__ = [
+    "deep_researcher_graph",
+    "chatbot_graph",
+    "math_agent_graph",
+    "get_graph",
+    "registry",
+]
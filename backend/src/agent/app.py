@@ -1,12 +1,168 @@
 # mypy: disable - error - code = "no-untyped-def,misc"
 import pathlib
+from contextlib import asynccontextmanager
+from typing import Any, Dict
 
 import fastapi.exceptions
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, Field
+
+from agent.registry import registry
+from jobs import STATUSES, JobNotFoundError, JobStateError, get_job_pool
+from telemetry import get_metrics, get_state_summaries
+from tools.cache import get_tool_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background job workers for the lifetime of the server."""
+    pool = get_job_pool()
+    if pool.workers > 0:
+        await pool.start()
+    try:
+        yield
+    finally:
+        await pool.stop()
+
 
 # Define the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+class JobRequest(BaseModel):
+    """A graph run to queue as a background job."""
+
+    graph: str = Field(default="deep_researcher", description="Registered graph to run")
+    question: str | None = Field(
+        default=None, description="Shorthand for a single user message as input"
+    )
+    input: Dict[str, Any] | None = Field(
+        default=None, description="Graph input, used when question is not set"
+    )
+    config: Dict[str, Any] = Field(
+        default_factory=dict, description="Run config, e.g. {'configurable': {...}}"
+    )
+    max_attempts: int = Field(
+        default=2, ge=1, description="Attempts before a transient failure is final"
+    )
+
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a job without its input and result."""
+    return {key: value for key, value in job.items() if key not in ("input", "result")}
+
+
+# The job endpoints are plain functions: FastAPI runs them in its thread pool,
+# keeping the SQLite queries of the job store off the event loop.
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    """Queue a graph run and return its job id without waiting for it."""
+    if request.graph not in registry.names():
+        raise HTTPException(404, f"Unknown graph '{request.graph}'")
+    if request.question is not None:
+        input = {"messages": [{"role": "user", "content": request.question}]}
+    elif request.input is not None:
+        input = request.input
+    else:
+        raise HTTPException(422, "Either question or input is required")
+    pool = get_job_pool()
+    job = pool.store.submit(request.graph, input, request.config, request.max_attempts)
+    pool.notify()
+    return _job_view(job)
+
+
+@app.get("/jobs")
+def list_jobs(status: str | None = None, limit: int = 50):
+    """List the most recent jobs and the number of jobs per status."""
+    if status is not None and status not in STATUSES:
+        raise HTTPException(422, f"Unknown status '{status}'")
+    pool = get_job_pool()
+    return {
+        "jobs": [_job_view(job) for job in pool.store.list(status, limit)],
+        "pool": pool.snapshot(),
+    }
+
+
+def _get_job(job_id: str) -> Dict[str, Any]:
+    try:
+        return get_job_pool().store.get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(404, f"Unknown job '{job_id}'")
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Return the status, attempts and error of a job."""
+    return _job_view(_get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """Return the result of a succeeded job; 409 while it has none."""
+    job = _get_job(job_id)
+    if job["result"] is None:
+        raise HTTPException(409, f"Job '{job_id}' is {job['status']}")
+    return {"id": job_id, "status": job["status"], **job["result"]}
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued job, or stop a running job after its current node."""
+    try:
+        return _job_view(get_job_pool().store.cancel(job_id))
+    except JobNotFoundError:
+        raise HTTPException(404, f"Unknown job '{job_id}'")
+    except JobStateError as e:
+        raise HTTPException(409, str(e))
+
+
+@app.post("/jobs/{job_id}/retry")
+def retry_job(job_id: str):
+    """Queue a failed or cancelled job again."""
+    pool = get_job_pool()
+    try:
+        job = pool.store.retry(job_id)
+    except JobNotFoundError:
+        raise HTTPException(404, f"Unknown job '{job_id}'")
+    except JobStateError as e:
+        raise HTTPException(409, str(e))
+    pool.notify()
+    return _job_view(job)
+
+
+@app.get("/graphs/health")
+async def graphs_health(load: bool = False):
+    """Report which graphs are loaded, failed or not yet requested."""
+    # Graph modules load outside the event loop: the MCP agent runs its own
+    return await run_in_threadpool(registry.health, load)
+
+
+@app.get("/metrics/state")
+async def state_metrics(limit: int = 20):
+    """Return the most recent per-run state size summaries."""
+    return {"runs": get_state_summaries(limit)}
+
+
+@app.get("/metrics/tools")
+async def tool_metrics():
+    """Return the tool result cache lookups and hit rate per tool."""
+    cache = get_tool_cache()
+    if cache is None:
+        return {"enabled": False, "tools": {}}
+    return {"enabled": True, "entries": len(cache), "tools": cache.hit_rates()}
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus"):
+    """Expose the process metrics, as Prometheus text or as JSON."""
+    if format == "json":
+        return get_metrics().snapshot()
+    return Response(
+        get_metrics().render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 def create_frontend_router(build_dir="../frontend/dist"):
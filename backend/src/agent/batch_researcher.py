@@ -0,0 +1,277 @@
+"""Batch researcher graph: several questions researched in one run.
+
+Query planning and answer writing for all questions run as batched model
+calls, and searches that overlap across questions run only once. A question
+whose planning or answer fails gets an error entry in ``question_errors``
+(and in its answer) while the other questions of the batch still complete.
+"""
+
+import logging
+import os
+import threading
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from agent.configuration import BatchResearchConfiguration
+from agent.deep_researcher import run_web_search
+from agent.models import get_chat_model
+from agent.prompts import (
+    answer_instructions,
+    get_current_date,
+    query_writer_instructions,
+)
+from agent.scheduler import RESEARCH, scheduled
+from agent.state import BatchResearchState, BatchSearchState
+from agent.structured_output import structured_output
+from agent.tools_and_schemas import SearchQueryList
+from agent.utils import normalize_query, restore_short_urls
+from telemetry import instrument_graph, instrument_node
+
+load_dotenv()
+
+if os.getenv("GEMINI_API_KEY") is None:
+    raise ValueError("GEMINI_API_KEY is not set")
+
+logger = logging.getLogger(__name__)
+
+# One semaphore per configured limit, shared by all runs of the graph
+_search_slots: dict[int, threading.BoundedSemaphore] = {}
+_search_slots_lock = threading.Lock()
+
+
+def _search_slot(limit: int) -> threading.BoundedSemaphore:
+    with _search_slots_lock:
+        if limit not in _search_slots:
+            _search_slots[limit] = threading.BoundedSemaphore(max(1, limit))
+        return _search_slots[limit]
+
+
+def _question_error(index: int, question: str, stage: str, error: Exception) -> dict:
+    logger.error(f"{stage} failed for question {index} '{question}': {error}")
+    return {
+        "index": index,
+        "question": question,
+        "stage": stage,
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+# Nodes
+def plan_queries(
+    state: BatchResearchState, config: RunnableConfig
+) -> BatchResearchState:
+    """LangGraph node that generates search queries for every question of the batch.
+
+    Query generation for all questions runs as one batched structured-output
+    call. Queries that overlap across questions (same words, ignoring case,
+    punctuation and order) are searched only once.
+
+    Args:
+        state: Current graph state containing the questions
+        config: Configuration for the runnable, including LLM provider settings
+
+    Returns:
+        Dictionary with state update, including the unique searches, the
+        searches each question uses and the questions whose planning failed
+    """
+    configurable = BatchResearchConfiguration.from_runnable_config(config)
+
+    llm = get_chat_model(
+        configurable.query_generator_model,
+        temperature=1.0,
+        cache=configurable.query_generator_cache,
+        batch=True,
+    )
+    structured_llm = structured_output(
+        llm, SearchQueryList, configurable.structured_output_retries
+    )
+
+    current_date = get_current_date()
+    prompts = [
+        query_writer_instructions.format(
+            current_date=current_date,
+            research_topic=question,
+            number_queries=configurable.number_of_initial_queries,
+        )
+        for question in state["questions"]
+    ]
+    results = structured_llm.batch(
+        prompts,
+        config={"max_concurrency": configurable.batch_planning_concurrency},
+        return_exceptions=True,
+    )
+
+    # Deduplicate the searches across questions, keeping the first wording
+    searches: dict[str, dict] = {}
+    question_queries, question_errors = [], []
+    for index, (question, result) in enumerate(zip(state["questions"], results)):
+        if isinstance(result, Exception):
+            # The question gets no searches and is reported, not answered
+            question_errors.append(
+                _question_error(index, question, "plan_queries", result)
+            )
+            question_queries.append([])
+            continue
+        keys = []
+        for query in result.query:
+            key = normalize_query(query)
+            if key not in searches:
+                searches[key] = {"key": key, "query": query, "id": len(searches)}
+            if key not in keys:
+                keys.append(key)
+        question_queries.append(keys)
+
+    planned = sum(
+        len(result.query) for result in results if not isinstance(result, Exception)
+    )
+    logger.info(
+        f"Planned {planned} searches for {len(prompts)} questions, "
+        f"{len(searches)} after deduplication"
+    )
+    return {
+        "searches": list(searches.values()),
+        "question_queries": question_queries,
+        "question_errors": question_errors,
+    }
+
+
+def continue_to_web_research(state: BatchResearchState):
+    """LangGraph routing function that sends every unique search to ``web_research``."""
+    if not state["searches"]:
+        return "finalize_answers"
+    return [
+        Send(
+            "web_research",
+            {"search_query": search["query"], "id": search["id"], "key": search["key"]},
+        )
+        for search in state["searches"]
+    ]
+
+
+def web_research(state: BatchSearchState, config: RunnableConfig) -> BatchResearchState:
+    """LangGraph node that runs one deduplicated search of the batch.
+
+    At most ``batch_search_concurrency`` searches run at the same time.
+
+    Args:
+        state: The search query, its id and its deduplication key
+        config: Configuration for the runnable, including search API settings
+
+    Returns:
+        Dictionary with state update, including the search result keyed by query
+    """
+    configurable = BatchResearchConfiguration.from_runnable_config(config)
+    with _search_slot(configurable.batch_search_concurrency):
+        result = run_web_search(state["search_query"], state["id"], config)
+    # A failed search leaves an empty result and its error instead of a summary
+    return {
+        "search_results": [
+            {
+                "key": state["key"],
+                "web_research_result": "".join(result["web_research_result"]),
+                "sources_gathered": result["sources_gathered"],
+                "errors": result.get("research_errors", []),
+            }
+        ]
+    }
+
+
+def finalize_answers(state: BatchResearchState, config: RunnableConfig):
+    """LangGraph node that writes one answer per question from its search results.
+
+    Args:
+        state: Current graph state containing the questions and search results
+        config: Configuration for the runnable, including LLM provider settings
+
+    Returns:
+        Dictionary with state update, including one answer per question in
+        question order; a failed question has an empty answer and an ``error``
+    """
+    configurable = BatchResearchConfiguration.from_runnable_config(config)
+    results_by_key = {result["key"]: result for result in state["search_results"]}
+    questions = state["questions"]
+    answers: list[dict | None] = [None] * len(questions)
+    # Questions whose planning failed have no searches to answer from
+    for error in state.get("question_errors") or []:
+        answers[error["index"]] = _failed_answer(error)
+
+    current_date = get_current_date()
+    pending, prompts, question_results = [], [], []
+    for index, keys in enumerate(state["question_queries"]):
+        if answers[index] is not None:
+            continue
+        results = [results_by_key[key] for key in keys if key in results_by_key]
+        pending.append(index)
+        question_results.append(results)
+        prompts.append(
+            answer_instructions.format(
+                current_date=current_date,
+                research_topic=questions[index],
+                summaries="\n---\n\n".join(
+                    r["web_research_result"]
+                    for r in results
+                    if r["web_research_result"]
+                ),
+            )
+        )
+
+    llm = get_chat_model(
+        configurable.answer_model, temperature=0, cache=configurable.answer_cache
+    )
+    responses = llm.batch(
+        prompts,
+        config={"max_concurrency": configurable.batch_answer_concurrency},
+        return_exceptions=True,
+    )
+
+    question_errors = []
+    for index, results, response in zip(pending, question_results, responses):
+        if isinstance(response, Exception):
+            error = _question_error(
+                index, questions[index], "finalize_answers", response
+            )
+            question_errors.append(error)
+            answers[index] = _failed_answer(error)
+            continue
+        content, unique_sources = restore_short_urls(
+            response.content,
+            [source for result in results for source in result["sources_gathered"]],
+        )
+        answers[index] = {
+            "question": questions[index],
+            "answer": content,
+            "sources_gathered": unique_sources,
+        }
+    return {"answers": answers, "question_errors": question_errors}
+
+
+def _failed_answer(error: dict) -> dict:
+    return {
+        "question": error["question"],
+        "answer": "",
+        "sources_gathered": [],
+        "error": error["error"],
+    }
+
+
+# Create the Batch Researcher Graph
+builder = StateGraph(BatchResearchState, config_schema=BatchResearchConfiguration)
+
+builder.add_node("plan_queries", scheduled(instrument_node(plan_queries), RESEARCH))
+builder.add_node("web_research", scheduled(instrument_node(web_research), RESEARCH))
+builder.add_node(
+    "finalize_answers", scheduled(instrument_node(finalize_answers), RESEARCH)
+)
+
+builder.add_edge(START, "plan_queries")
+# Fan out to the deduplicated searches in parallel branches
+builder.add_conditional_edges(
+    "plan_queries", continue_to_web_research, ["web_research", "finalize_answers"]
+)
+builder.add_edge("web_research", "finalize_answers")
+builder.add_edge("finalize_answers", END)
+
+batch_researcher_graph = instrument_graph(builder.compile(name="batch-researcher"))
@@ -0,0 +1,405 @@
+"""Micro-batching of concurrent chat-model calls with the same model and options.
+
+Under load, the research fan-out issues many ``generate_query``,
+``reflection`` and map-reduce condensing calls at once. With batching on
+(``LLM_BATCH_ENABLED``), the models these nodes get from
+:func:`agent.models.get_chat_model` hand their calls to the process-wide
+:class:`MicroBatcher`. It collects calls with the same model and call options
+(tools, structured-output schema, stop words) for ``LLM_BATCH_WINDOW_MS``, or
+until ``LLM_BATCH_MAX_SIZE`` calls are waiting, then sends them together and
+fans the results back out to the waiting nodes.
+
+How a batch is sent depends on the backend:
+
+* :class:`HttpBatchBackend` posts the whole batch as one request to a batch
+  endpoint (``LLM_BATCH_URL``), e.g. a gateway in front of the provider or
+  ``python -m benchmarks.fake_batch_server``;
+* :class:`MultiplexBackend`, used without ``LLM_BATCH_URL``, sends every
+  call on its own over the shared client, as soon as it is made: there is no
+  request to combine the calls into, so waiting for the window would only
+  add latency. Gemini's Batch API is asynchronous (jobs complete within
+  hours), so online calls cannot use it.
+
+Batches are sent from a pool of ``LLM_BATCH_SENDERS`` threads, and a single
+background thread sends the batches whose window ended.
+
+Metrics at ``GET /metrics``: ``llm_batch_size`` histogram and
+``llm_batches_total`` counter by ``backend`` and ``model``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumpd, loads
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import (
+    Runnable,
+    RunnableBinding,
+    RunnableParallel,
+    RunnableSequence,
+)
+
+from telemetry import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# One call of a batch: messages, stop words and call options
+BatchItem = Tuple[List[BaseMessage], List[str] | None, Dict[str, Any]]
+
+
+def model_name(model: BaseChatModel) -> str:
+    """Return the name of the model a chat model calls."""
+    return str(getattr(model, "model", None) or getattr(model, "model_name", "unknown"))
+
+
+class MultiplexBackend:
+    """Send the calls of a batch concurrently through the model's own client.
+
+    The calls are not combined, so :class:`MicroBatcher` sends each of them
+    at once instead of holding it for a window.
+    """
+
+    name = "multiplex"
+    coalesces = False
+
+    def __init__(self, max_workers: int = 64):
+        """Create a backend sending at most ``max_workers`` calls of a batch at once."""
+        self._executor = ThreadPoolExecutor(max_workers, "llm-multiplex")
+
+    def send(
+        self, model: BaseChatModel, items: Sequence[BatchItem]
+    ) -> List[Union[ChatResult, BaseException]]:
+        """Return the result, or the error, of every call."""
+        if len(items) == 1:
+            messages, stop, kwargs = items[0]
+            try:
+                return [model._generate(messages, stop, **kwargs)]
+            except Exception as e:
+                return [e]
+        futures = [
+            self._executor.submit(model._generate, messages, stop, **kwargs)
+            for messages, stop, kwargs in items
+        ]
+        results: List[Union[ChatResult, BaseException]] = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class HttpBatchBackend:
+    """Send a batch as a single request to a batch endpoint.
+
+    The endpoint receives ``{"model": ..., "requests": [{"messages", "stop",
+    "kwargs"}]}`` with LangChain-serialized messages and answers
+    ``{"responses": [{"generations": [...]} | {"error": "..."}]}`` in order.
+    """
+
+    name = "http"
+    coalesces = True
+
+    def __init__(self, url: str, timeout: float = 120.0, max_connections: int = 64):
+        """Create a backend posting batches to ``url``."""
+        import httpx
+
+        self.url = url
+        self._client = httpx.Client(
+            timeout=timeout, limits=httpx.Limits(max_connections=max_connections)
+        )
+
+    def send(
+        self, model: BaseChatModel, items: Sequence[BatchItem]
+    ) -> List[Union[ChatResult, BaseException]]:
+        """Post the batch and return the result, or the error, of every call."""
+        response = self._client.post(
+            self.url,
+            content=json.dumps(
+                {
+                    "model": model_name(model),
+                    "requests": [
+                        {"messages": dumpd(messages), "stop": stop, "kwargs": kwargs}
+                        for messages, stop, kwargs in items
+                    ],
+                },
+                default=str,
+            ),
+            headers={"content-type": "application/json"},
+        )
+        response.raise_for_status()
+        results: List[Union[ChatResult, BaseException]] = []
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            for entry in response.json()["responses"]:
+                if "error" in entry:
+                    results.append(RuntimeError(entry["error"]))
+                else:
+                    generations = loads(
+                        json.dumps(entry["generations"]), allowed_objects="core"
+                    )
+                    results.append(ChatResult(generations=generations))
+        return results
+
+
+@dataclass
+class _Batch:
+    model: BaseChatModel
+    items: List[BatchItem] = field(default_factory=list)
+    futures: List[Future] = field(default_factory=list)
+    # Monotonic time the window of the batch ends, None to send at once
+    deadline: float | None = None
+
+
+class MicroBatcher:
+    """Collect concurrent calls per model and options and send them in batches.
+
+    Args:
+        backend: Sends a batch and returns a result or an error per call
+        window_ms: How long the first call of a batch waits for others
+        max_batch_size: Calls that trigger sending a batch before its window
+            ends
+        senders: Threads sending batches; a batch waits when all are busy
+    """
+
+    def __init__(
+        self,
+        backend: Union[MultiplexBackend, HttpBatchBackend],
+        window_ms: float = 5.0,
+        max_batch_size: int = 16,
+        senders: int = 64,
+    ):
+        """Create a batcher sending through ``backend``."""
+        self.backend = backend
+        # Calls a backend cannot combine are not held back for the window
+        self.window = window_ms / 1000 if backend.coalesces else 0.0
+        self.max_batch_size = max(1, max_batch_size) if backend.coalesces else 1
+        self._pending: Dict[Tuple, _Batch] = {}
+        self._lock = threading.Lock()
+        self._window_ended = threading.Condition(self._lock)
+        self._flusher: threading.Thread | None = None
+        self._executor = ThreadPoolExecutor(max(1, senders), "llm-batch")
+
+    def submit(
+        self,
+        model: BaseChatModel,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue a call of ``model`` and return the future of its ``ChatResult``."""
+        key = (
+            type(model).__name__,
+            model_name(model),
+            json.dumps(model._identifying_params, sort_keys=True, default=str),
+            json.dumps({"stop": stop, **kwargs}, sort_keys=True, default=str),
+        )
+        future: Future = Future()
+        ready = None
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = _Batch(model)
+                if self.max_batch_size > 1 and self.window > 0:
+                    batch.deadline = time.monotonic() + self.window
+                    self._start_flusher()
+                    self._window_ended.notify()
+            batch.items.append((messages, stop, kwargs))
+            batch.futures.append(future)
+            if len(batch.items) >= self.max_batch_size or batch.deadline is None:
+                ready = self._pending.pop(key)
+        if ready is not None:
+            # Sent from the pool, so that the caller only waits for its own
+            # result like every other call of the batch
+            self._executor.submit(self._send, ready)
+        return future
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._flush, name="llm-batch-window", daemon=True
+            )
+            self._flusher.start()
+
+    def _flush(self) -> None:
+        """Send every batch whose window ended, for the life of the process."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                ready = [
+                    key
+                    for key, batch in self._pending.items()
+                    if batch.deadline is not None and batch.deadline <= now
+                ]
+                if not ready:
+                    deadlines = [
+                        batch.deadline
+                        for batch in self._pending.values()
+                        if batch.deadline is not None
+                    ]
+                    self._window_ended.wait(min(deadlines) - now if deadlines else None)
+                    continue
+                batches = [self._pending.pop(key) for key in ready]
+            for batch in batches:
+                self._executor.submit(self._send, batch)
+
+    def _send(self, batch: _Batch) -> None:
+        name = model_name(batch.model)
+        metrics = get_metrics()
+        metrics.histogram(
+            "llm_batch_size", "Calls per micro-batch", buckets=_BATCH_BUCKETS
+        ).observe(len(batch.items), backend=self.backend.name, model=name)
+        metrics.counter("llm_batches_total", "Micro-batches sent").inc(
+            backend=self.backend.name, model=name
+        )
+        try:
+            results = self.backend.send(batch.model, batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(
+                    f"Batch of {len(batch.items)} calls returned {len(results)} results"
+                )
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch.items)} {name} calls failed: {e}")
+            results = [e] * len(batch.items)
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class BatchingChatModel(BaseChatModel):
+    """Chat model whose calls go through a :class:`MicroBatcher`.
+
+    Tool binding and structured output are delegated to the wrapped model,
+    so batched calls carry exactly the options the model would send.
+    """
+
+    inner: BaseChatModel
+    batcher: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"batched-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """Bind tools the way the wrapped model formats them."""
+        return self.bind(**self.inner.bind_tools(tools, **kwargs).kwargs)
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:
+        """Return the wrapped model's structured-output chain, calling this model.
+
+        The wrapped model picks the method (e.g. Gemini's JSON schema output)
+        and the parser; the options it binds are sent through the batcher.
+        """
+        return self._rebind(self.inner.with_structured_output(schema, **kwargs))
+
+    def _rebind(self, runnable: Runnable) -> Runnable:
+        """Replace the wrapped model in ``runnable`` with this model."""
+        if runnable is self.inner:
+            return self
+        if isinstance(runnable, RunnableBinding) and runnable.bound is self.inner:
+            return self.bind(**runnable.kwargs).with_config(runnable.config)
+        if isinstance(runnable, RunnableSequence):
+            return RunnableSequence(*(self._rebind(step) for step in runnable.steps))
+        if isinstance(runnable, RunnableParallel):
+            return RunnableParallel(
+                {key: self._rebind(step) for key, step in runnable.steps__.items()}
+            )
+        return runnable
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.batcher.submit(self.inner, messages, stop, **kwargs).result()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        future = self.batcher.submit(self.inner, messages, stop, **kwargs)
+        return await asyncio.wrap_future(future)
+
+
+def create_batcher(
+    enabled: bool | None = None,
+    window_ms: float | None = None,
+    max_batch_size: int | None = None,
+    url: str | None = None,
+    senders: int | None = None,
+) -> MicroBatcher | None:
+    """Create the micro-batcher, configured from the environment by default.
+
+    Args:
+        enabled: Whether to batch at all (``LLM_BATCH_ENABLED``, default false)
+        window_ms: Collection window (``LLM_BATCH_WINDOW_MS``, default 5)
+        max_batch_size: Calls per batch (``LLM_BATCH_MAX_SIZE``, default 16)
+        url: Batch endpoint (``LLM_BATCH_URL``); unset multiplexes the calls
+            of a batch over the model's client
+        senders: Threads sending batches (``LLM_BATCH_SENDERS``, default 64)
+    """
+    if enabled is None:
+        enabled = os.getenv("LLM_BATCH_ENABLED", "false").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    if not enabled:
+        return None
+    if window_ms is None:
+        window_ms = float(os.getenv("LLM_BATCH_WINDOW_MS", "5"))
+    if max_batch_size is None:
+        max_batch_size = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+    if senders is None:
+        senders = int(os.getenv("LLM_BATCH_SENDERS", "64"))
+    url = url if url is not None else os.getenv("LLM_BATCH_URL")
+    backend = HttpBatchBackend(url) if url else MultiplexBackend()
+    return MicroBatcher(backend, window_ms, max_batch_size, senders)
+
+
+_batcher: MicroBatcher | None = None
+_configured = False
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> MicroBatcher | None:
+    """Return the process-wide micro-batcher, or None when batching is off."""
+    global _batcher, _configured
+    if not _configured:
+        with _batcher_lock:
+            if not _configured:
+                _batcher = create_batcher()
+                _configured = True
+    return _batcher
+
+
+def set_batcher(batcher: MicroBatcher | None) -> None:
+    """Replace the process-wide micro-batcher; None turns batching off."""
+    global _batcher, _configured
+    with _batcher_lock:
+        _batcher = batcher
+        _configured = True
@@ -0,0 +1,210 @@
+"""Model cascades: a cheap model answers first, the strong model only when needed.
+
+Nodes with a ``*_cascade_model`` configured call that model first and check
+its output locally; the node's regular model is only called when the check
+fails ("escalation"):
+
+* ``reflection``: the structured output must parse, and ``is_sufficient``
+  must agree with the local coverage score of the research, with follow-up
+  queries whenever the research is judged insufficient;
+* ``finalize_answer``: the answer must cite enough of the gathered sources,
+  and only sources that exist, with enough words for the number of sources;
+* ``chat_response``: the reply must be non-empty and not hedge.
+
+Metrics at ``GET /metrics``, by node: ``cascade_requests_total`` by
+``outcome`` (``accepted``, ``escalated``) and ``reason``, and the estimated
+latency and cost saved by accepted answers (``cascade_saved_seconds_total``,
+``cascade_saved_usd_total``) against what escalations wasted on the cheap
+model (``cascade_overhead_seconds_total``, ``cascade_overhead_usd_total``).
+Savings compare to the strong model's running mean latency and to its price.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Sequence, TypeVar
+
+from agent.map_reduce import SHORT_URL_PATTERN, estimate_tokens
+from telemetry import get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# USD per million input and output tokens
+MODEL_PRICES: Dict[str, tuple] = {
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+_HEDGES = re.compile(
+    r"\b(?:i(?:'m| am) not sure|i don't know|i do not know|i cannot (?:help|answer)|"
+    r"i can't (?:help|answer)|as an ai\b|unable to (?:answer|help))",
+    re.IGNORECASE,
+)
+
+# Running mean latency per model, for the latency an accepted answer saved
+_latency: Dict[str, float] = {}
+_latency_lock = threading.Lock()
+_ALPHA = 0.2
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Return the estimated USD cost of a call; 0 for models without a price.
+
+    Versioned names (``gemini-2.5-flash-preview-04-17``) use the price of the
+    longest matching model name.
+    """
+    names = [name for name in MODEL_PRICES if model.startswith(name)]
+    input_price, output_price = (
+        MODEL_PRICES[max(names, key=len)] if names else (0.0, 0.0)
+    )
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _observe_latency(model: str, seconds: float) -> None:
+    with _latency_lock:
+        previous = _latency.get(model)
+        _latency[model] = (
+            seconds if previous is None else previous + _ALPHA * (seconds - previous)
+        )
+
+
+def mean_latency(model: str) -> float | None:
+    """Return the running mean latency of ``model``, if it was called before."""
+    with _latency_lock:
+        return _latency.get(model)
+
+
+@dataclass
+class CascadeResult(Generic[T]):
+    """The output of a cascade and which model produced it."""
+
+    value: T
+    model: str
+    escalated: bool
+    reason: str = ""
+
+
+def run_cascade(
+    node: str,
+    cheap_model: str | None,
+    strong_model: str,
+    call: Callable[[str], T],
+    check: Callable[[T], str | None],
+    prompt: str = "",
+) -> CascadeResult[T]:
+    """Call ``cheap_model`` and escalate to ``strong_model`` if its output fails ``check``.
+
+    Args:
+        node: Node name for the metrics
+        cheap_model: The model tried first; None or ``strong_model`` skips
+            the cascade
+        strong_model: The node's regular model
+        call: Calls a model by name and returns its output
+        check: Returns None to accept an output, or the reason to escalate
+        prompt: The prompt, for the cost estimates
+
+    Returns:
+        The accepted output and the model that produced it
+    """
+    if not cheap_model or cheap_model == strong_model:
+        return CascadeResult(call(strong_model), strong_model, False)
+
+    metrics = get_metrics()
+    input_tokens = estimate_tokens(prompt)
+    start = time.perf_counter()
+    try:
+        value = call(cheap_model)
+        reason = check(value)
+    except Exception as e:
+        # Malformed structured output and the like: the strong model may do better
+        value, reason = None, f"error:{type(e).__name__}"
+    cheap_seconds = time.perf_counter() - start
+    _observe_latency(cheap_model, cheap_seconds)
+    cheap_cost = estimate_cost(
+        cheap_model,
+        input_tokens,
+        estimate_tokens(str(value)) if value is not None else 0,
+    )
+
+    if reason is None:
+        strong_latency = mean_latency(strong_model)
+        strong_cost = estimate_cost(
+            strong_model, input_tokens, estimate_tokens(str(value))
+        )
+        metrics.counter(
+            "cascade_requests_total", "Cascade outcomes by node and reason"
+        ).inc(node=node, outcome="accepted", reason="")
+        if strong_latency is not None:
+            metrics.counter(
+                "cascade_saved_seconds_total",
+                "Estimated latency saved by accepted cheap-model outputs",
+            ).inc(max(0.0, strong_latency - cheap_seconds), node=node)
+        metrics.counter(
+            "cascade_saved_usd_total",
+            "Estimated cost saved by accepted cheap-model outputs",
+        ).inc(max(0.0, strong_cost - cheap_cost), node=node)
+        return CascadeResult(value, cheap_model, False)
+
+    logger.info(f"Cascade of {node} escalated to {strong_model}: {reason}")
+    metrics.counter(
+        "cascade_requests_total", "Cascade outcomes by node and reason"
+    ).inc(node=node, outcome="escalated", reason=reason.split(":")[0])
+    metrics.counter(
+        "cascade_overhead_seconds_total",
+        "Latency spent on escalated cheap-model outputs",
+    ).inc(cheap_seconds, node=node)
+    metrics.counter(
+        "cascade_overhead_usd_total", "Estimated cost of escalated cheap-model outputs"
+    ).inc(cheap_cost, node=node)
+    start = time.perf_counter()
+    value = call(strong_model)
+    _observe_latency(strong_model, time.perf_counter() - start)
+    return CascadeResult(value, strong_model, True, reason)
+
+
+def check_reflection(result: Any, coverage: float, min_coverage: float) -> str | None:
+    """Accept a reflection that agrees with the local coverage score."""
+    if result.is_sufficient and coverage < min_coverage:
+        return "sufficient_with_low_coverage"
+    if not result.is_sufficient and not result.follow_up_queries:
+        return "insufficient_without_queries"
+    return None
+
+
+def check_answer(
+    content: str,
+    sources: Sequence[Dict[str, Any]],
+    min_citations: int,
+    words_per_source: int,
+    max_words: int = 150,
+) -> str | None:
+    """Accept an answer citing ``min_citations`` known sources, long enough for them.
+
+    The answer needs ``words_per_source`` words per gathered source, up to
+    ``max_words``.
+    """
+    known = {source["short_url"] for source in sources}
+    cited = set(SHORT_URL_PATTERN.findall(content))
+    if cited - known:
+        return "unknown_citation"
+    if len(cited) < min(min_citations, len(known)):
+        return "too_few_citations"
+    if len(content.split()) < min(words_per_source * len(known), max_words):
+        return "too_short"
+    return None
+
+
+def check_chat_response(content: str) -> str | None:
+    """Accept a chat reply that is non-empty and does not hedge."""
+    if not content.strip():
+        return "empty"
+    if _HEDGES.search(content):
+        return "hedged"
+    return None
@@ -3,12 +3,16 @@ import os
 from dotenv import load_dotenv
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, START, StateGraph
 
+from agent.cascade import check_chat_response, run_cascade
+from agent.compaction import is_compaction_summary, make_compact_history_node
 from agent.configuration import ChatbotConfiguration
+from agent.models import get_chat_model
 from agent.prompts import chatbot_instructions
+from agent.scheduler import INTERACTIVE, scheduled
 from agent.state import ChatbotState
+from telemetry import instrument_graph, instrument_node
 
 load_dotenv()
 
@@ -31,23 +35,19 @@ def chat_response(state: ChatbotState, config: RunnableConfig) -> ChatbotState:
     """
     configurable = ChatbotConfiguration.from_runnable_config(config)
 
-    # Initialize Gemini model
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.chat_model,
-        temperature=configurable.temperature,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-
     # Get the latest user message
     if not state["messages"]:
         return {"messages": [AIMessage(content="Hello! How can I help you today?")]}
 
+    # Keep last 10 messages for context, plus the summary of compacted turns
+    recent = state["messages"][-10:]
+    summaries = [msg for msg in state["messages"][:-10] if is_compaction_summary(msg)]
+
     # Prepare the conversation context
     conversation_context = "\n".join(
         [
             f"{'Human' if isinstance(msg, HumanMessage) else 'Assistant'}: {msg.content}"
-            for msg in state["messages"][-10:]  # Keep last 10 messages for context
+            for msg in summaries + recent
         ]
     )
 
@@ -57,8 +57,17 @@ def chat_response(state: ChatbotState, config: RunnableConfig) -> ChatbotState:
         current_message=state["messages"][-1].content if state["messages"] else "",
     )
 
-    # Generate response
-    result = llm.invoke(formatted_prompt)
+    # Generate response, with the cheap model first when a cascade is configured
+    result = run_cascade(
+        "chat_response",
+        configurable.chat_cascade_model,
+        configurable.chat_model,
+        lambda model: get_chat_model(
+            model, configurable.temperature, cache=configurable.chat_cache
+        ).invoke(formatted_prompt),
+        lambda message: check_chat_response(str(message.content)),
+        formatted_prompt,
+    ).value
 
     return {"messages": [AIMessage(content=result.content)]}
 
@@ -66,12 +75,19 @@ def chat_response(state: ChatbotState, config: RunnableConfig) -> ChatbotState:
 # Create the Chatbot Graph
 builder = StateGraph(ChatbotState, config_schema=ChatbotConfiguration)
 
-# Define the single chat node
-builder.add_node("chat_response", chat_response)
+# Define the chat node, preceded by history compaction
+builder.add_node(
+    "compact_history",
+    instrument_node(make_compact_history_node(ChatbotConfiguration, "chat_model")),
+)
+builder.add_node(
+    "chat_response", scheduled(instrument_node(chat_response), INTERACTIVE)
+)
 
 # Set the entrypoint and flow
-builder.add_edge(START, "chat_response")
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "chat_response")
 builder.add_edge("chat_response", END)
 
 # Compile the graph
-chatbot_graph = builder.compile(name="basic-chatbot")
+chatbot_graph = instrument_graph(builder.compile(name="basic-chatbot"))
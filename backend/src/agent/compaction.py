@@ -0,0 +1,182 @@
+"""Message history compaction for long-lived agent threads.
+
+Once a thread's history grows past a message-count or token threshold, the
+``compact_history`` node replaces the older turns with a single summary
+message. Turns are only cut at a ``HumanMessage`` boundary, so an
+``AIMessage`` carrying ``tool_calls`` is never separated from its
+``ToolMessage`` results.
+
+The node removes the old messages with ``RemoveMessage`` and emits the
+summary as a new message; the :func:`add_messages_with_compaction` reducer
+keeps summary messages at the start of the history.
+"""
+
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Sequence
+
+from langchain_core.messages import (
+    AIMessage,
+    AnyMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import add_messages
+
+from agent.models import get_chat_model
+from agent.prompts import compaction_instructions
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# Tool results are truncated in the transcript handed to the summarizer
+_MAX_TOOL_RESULT_CHARS = 500
+
+
+def is_compaction_summary(message: Any) -> bool:
+    """Whether ``message`` is a summary produced by compaction."""
+    return bool(getattr(message, "additional_kwargs", {}).get("compaction_summary"))
+
+
+def add_messages_with_compaction(left: Any, right: Any) -> List[AnyMessage]:
+    """``add_messages`` reducer that keeps compaction summaries first."""
+    merged = add_messages(left, right)
+    summaries = [m for m in merged if is_compaction_summary(m)]
+    if not summaries or merged[: len(summaries)] == summaries:
+        return merged
+    return summaries + [m for m in merged if not is_compaction_summary(m)]
+
+
+def estimate_tokens(messages: Sequence[AnyMessage]) -> int:
+    """Roughly estimate the prompt tokens of ``messages`` (4 chars per token)."""
+    chars = 0
+    for message in messages:
+        chars += len(str(message.content))
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            chars += len(json.dumps(tool_calls, default=str))
+    return chars // 4
+
+
+def find_compaction_boundary(messages: Sequence[AnyMessage], keep_last: int) -> int:
+    """Return the index of the first message to keep.
+
+    Starts ``keep_last`` messages from the end and moves back to the closest
+    ``HumanMessage`` so that whole turns, including tool-call/tool-result
+    pairs, are kept together. Returns 0 when there is nothing to compact.
+    """
+    boundary = max(len(messages) - keep_last, 0)
+    while boundary > 0 and not (
+        isinstance(messages[boundary], HumanMessage)
+        and not is_compaction_summary(messages[boundary])
+    ):
+        boundary -= 1
+    # A lone previous summary is not worth re-summarizing
+    if all(is_compaction_summary(m) for m in messages[:boundary]):
+        return 0
+    return boundary
+
+
+def render_transcript(messages: Sequence[AnyMessage]) -> str:
+    """Render messages as a plain-text transcript for the summarizer."""
+    lines = []
+    for message in messages:
+        if is_compaction_summary(message):
+            lines.append(f"Previous summary: {message.content}")
+        elif isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, ToolMessage):
+            content = str(message.content)
+            if len(content) > _MAX_TOOL_RESULT_CHARS:
+                content = content[:_MAX_TOOL_RESULT_CHARS] + " [truncated]"
+            lines.append(f"Tool result ({message.name or 'tool'}): {content}")
+        elif isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                lines.append(
+                    f"Assistant called {call['name']} with {json.dumps(call['args'], default=str)}"
+                )
+            if message.content:
+                lines.append(f"Assistant: {message.content}")
+    return "\n".join(lines)
+
+
+def summarize_messages(
+    messages: Sequence[AnyMessage],
+    model: str,
+    max_words: int = 250,
+    cache: bool | None = None,
+) -> str:
+    """Summarize ``messages`` with ``model``, falling back to a local digest."""
+    transcript = render_transcript(messages)
+    try:
+        llm = get_chat_model(model, temperature=0, cache=cache)
+        result = llm.invoke(
+            compaction_instructions.format(transcript=transcript, max_words=max_words)
+        )
+        return str(result.content)
+    except Exception as e:
+        logger.warning(f"Summarizing history with {model} failed, using a digest: {e}")
+        # Keep the most recent part of the transcript, bounded in size
+        return transcript[-max_words * 6 :]
+
+
+def make_compact_history_node(
+    configuration_cls: Any, model_field: str
+) -> Callable[[Dict[str, Any], RunnableConfig], Dict[str, Any]]:
+    """Build a ``compact_history`` node for a message-based agent.
+
+    Args:
+        configuration_cls: Configuration class of the graph; it must define
+            the ``compaction_*`` fields
+        model_field: Name of the configuration field holding the model used
+            when ``compaction_model`` is not set
+    """
+
+    def compact_history(
+        state: Dict[str, Any], config: RunnableConfig
+    ) -> Dict[str, Any]:
+        """LangGraph node that replaces old turns with a summary message.
+
+        Args:
+            state: Current graph state containing the conversation messages
+            config: Configuration for the runnable, including compaction thresholds
+
+        Returns:
+            Dictionary with state update removing the compacted messages and
+            adding the summary, or an empty update below the thresholds
+        """
+        configurable = configuration_cls.from_runnable_config(config)
+        messages = state["messages"]
+        if (
+            len(messages) <= configurable.compaction_max_messages
+            and estimate_tokens(messages) <= configurable.compaction_max_tokens
+        ):
+            return {}
+
+        boundary = find_compaction_boundary(messages, configurable.compaction_keep_last)
+        if boundary == 0:
+            return {}
+
+        old = messages[:boundary]
+        model = configurable.compaction_model or getattr(configurable, model_field)
+        summary = summarize_messages(old, model, cache=configurable.compaction_cache)
+        logger.info(
+            f"Compacted {len(old)} messages (~{estimate_tokens(old)} tokens) "
+            f"into a summary, keeping {len(messages) - boundary}"
+        )
+        return {
+            "messages": [RemoveMessage(id=message.id) for message in old]
+            + [
+                HumanMessage(
+                    content=SUMMARY_PREFIX + summary,
+                    id=str(uuid.uuid4()),
+                    additional_kwargs={"compaction_summary": True},
+                )
+            ]
+        }
+
+    return compact_history
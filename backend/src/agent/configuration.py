@@ -1,13 +1,101 @@
+"""Configurations of the agent graphs and their performance profiles."""
+
+import functools
 import os
-from typing import Any, Optional
+from typing import Any, ClassVar, Dict, Self, Tuple
 
 from langchain_core.runnables import RunnableConfig
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+PERFORMANCE_PROFILES = ("fast", "balanced", "thorough")
+DEFAULT_PERFORMANCE_PROFILE = "balanced"
+
+
+class BaseConfiguration(BaseModel):
+    """Shared behaviour of the agent configurations.
+
+    Every configuration can be resolved against a named performance profile
+    ("fast", "balanced" or "thorough"). A profile supplies coherent values for
+    all settings of the configuration, and any field set explicitly through
+    the environment or ``configurable`` still overrides the profile.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    # Field values applied by each performance profile, on top of the defaults
+    profiles: ClassVar[Dict[str, Dict[str, Any]]] = {}
+
+    performance_profile: str = Field(
+        default=DEFAULT_PERFORMANCE_PROFILE,
+        metadata={
+            "description": "Named latency/quality trade-off: 'fast', 'balanced' or 'thorough'."
+        },
+    )
+
+    @classmethod
+    def from_runnable_config(cls, config: RunnableConfig | None = None) -> Self:
+        """Create a configuration instance from a RunnableConfig.
+
+        Resolved configurations are memoized per (profile, overrides), so
+        repeated node calls with the same settings reuse the same instance.
+        """
+        configurable = (
+            config["configurable"] if config and "configurable" in config else {}
+        )
+
+        # Get raw values from environment or config
+        raw_values: dict[str, Any] = {
+            name: os.environ.get(name.upper(), configurable.get(name))
+            for name in cls.model_fields.keys()
+        }
+
+        # Filter out None values
+        values = {k: v for k, v in raw_values.items() if v is not None}
+
+        try:
+            return _resolve_configuration(cls, tuple(sorted(values.items())))
+        except TypeError:
+            # Unhashable override values cannot be memoized
+            return cls._from_values(values)
+
+    @classmethod
+    def _from_values(cls, values: Dict[str, Any]) -> Self:
+        profile = values.get("performance_profile", DEFAULT_PERFORMANCE_PROFILE)
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(
+                f"Unknown performance profile '{profile}', expected one of {PERFORMANCE_PROFILES}"
+            )
+        return cls(**{**cls.profiles.get(profile, {}), **values})
+
 
+@functools.lru_cache(maxsize=256)
+def _resolve_configuration(
+    cls: type, items: Tuple[Tuple[str, Any], ...]
+) -> BaseConfiguration:
+    return cls._from_values(dict(items))
 
-class Configuration(BaseModel):
+
+class Configuration(BaseConfiguration):
     """The configuration for the agent."""
 
+    profiles: ClassVar[Dict[str, Dict[str, Any]]] = {
+        "fast": {
+            "query_generator_model": "gemini-2.0-flash",
+            "reflection_model": "gemini-2.0-flash",
+            "answer_model": "gemini-2.5-flash",
+            "number_of_initial_queries": 1,
+            "max_research_loops": 1,
+        },
+        "balanced": {},
+        "thorough": {
+            "query_generator_model": "gemini-2.5-flash",
+            "reflection_model": "gemini-2.5-pro",
+            "answer_model": "gemini-2.5-pro",
+            "number_of_initial_queries": 5,
+            "max_research_loops": 3,
+        },
+    }
+
     query_generator_model: str = Field(
         default="gemini-2.0-flash",
         metadata={
@@ -39,30 +127,255 @@ class Configuration(BaseModel):
         metadata={"description": "The maximum number of research loops to perform."},
     )
 
-    @classmethod
-    def from_runnable_config(
-        cls, config: Optional[RunnableConfig] = None
-    ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
-        configurable = (
-            config["configurable"] if config and "configurable" in config else {}
-        )
+    hedge_searches: bool = Field(
+        default=False,
+        metadata={
+            "description": "Issue a duplicate grounded search when one is slower than the recent latency percentile."
+        },
+    )
 
-        # Get raw values from environment or config
-        raw_values: dict[str, Any] = {
-            name: os.environ.get(name.upper(), configurable.get(name))
-            for name in cls.model_fields.keys()
-        }
+    hedge_percentile: float = Field(
+        default=95.0,
+        metadata={
+            "description": "Latency percentile (per model) after which a search is hedged."
+        },
+    )
 
-        # Filter out None values
-        values = {k: v for k, v in raw_values.items() if v is not None}
+    hedge_max_rate: float = Field(
+        default=0.1,
+        metadata={
+            "description": "Maximum fraction of recent searches that may be hedged."
+        },
+    )
+
+    search_max_attempts: int = Field(
+        default=3,
+        metadata={
+            "description": "Attempts per search before its branch degrades to an empty result."
+        },
+    )
+
+    search_retry_backoff_seconds: float = Field(
+        default=1.0,
+        metadata={
+            "description": "Delay before the first search retry in seconds, doubled on each retry."
+        },
+    )
+
+    research_deadline_seconds: float | None = Field(
+        default=None,
+        metadata={
+            "description": "Wall-clock budget of a research run in seconds. Near the deadline, outstanding searches are dropped and the answer is finalized from the results so far."
+        },
+    )
+
+    deadline_reserve_seconds: float = Field(
+        default=15.0,
+        metadata={
+            "description": "Seconds before the deadline reserved for writing the final answer. Must be less than research_deadline_seconds."
+        },
+    )
+
+    reflection_skip_threshold: float = Field(
+        default=1.01,
+        metadata={
+            "description": "Skip the LLM reflection when the local coverage score of the research reaches this value (0.0-1.0). Values above 1.0, the default, always reflect."
+        },
+    )
+
+    map_reduce_threshold_tokens: int = Field(
+        default=24000,
+        metadata={
+            "description": "Estimated tokens of research summaries past which the answer is written map-reduce style: summaries are condensed in parallel chunks first."
+        },
+    )
+
+    map_reduce_chunk_tokens: int = Field(
+        default=6000,
+        metadata={
+            "description": "Maximum estimated tokens of summaries condensed in one map-reduce chunk."
+        },
+    )
 
-        return cls(**values)
+    map_reduce_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "Model condensing map-reduce chunks. Defaults to the query generator model."
+        },
+    )
+
+    map_reduce_concurrency: int = Field(
+        default=4,
+        metadata={
+            "description": "Maximum number of chunks condensed at the same time."
+        },
+    )
+
+    knowledge_store_enabled: bool = Field(
+        default=False,
+        metadata={
+            "description": "Index the research of each turn in the thread and answer follow-up queries from it before searching. Off by default: key-term coverage alone does not tell a covered query from one that only shares its words."
+        },
+    )
+
+    knowledge_top_k: int = Field(
+        default=4,
+        metadata={"description": "Snippets of prior research retrieved per query."},
+    )
+
+    knowledge_coverage_threshold: float = Field(
+        default=0.8,
+        metadata={
+            "description": "Fraction of a query's key terms the retrieved snippets must contain for the query to skip the web search (0.0-1.0). Values above 1.0 always search."
+        },
+    )
+
+    reflection_cascade_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "Cheaper model tried before the reflection model; its reflection is kept unless it disagrees with the local coverage score. Unset disables the cascade."
+        },
+    )
 
+    reflection_cascade_min_coverage: float = Field(
+        default=0.5,
+        metadata={
+            "description": "Local coverage score (0.0-1.0) below which the cheap model judging the research sufficient is escalated."
+        },
+    )
+
+    answer_cascade_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "Cheaper model tried before the answer model; its answer is kept if it is long enough and cites enough known sources. Unset disables the cascade."
+        },
+    )
 
-class ChatbotConfiguration(BaseModel):
+    answer_cascade_min_citations: int = Field(
+        default=2,
+        metadata={
+            "description": "Distinct sources the cheap model's answer must cite (at most the number of sources gathered)."
+        },
+    )
+
+    answer_cascade_words_per_source: int = Field(
+        default=10,
+        metadata={
+            "description": "Words the cheap model's answer needs per source gathered (up to 150) to be kept."
+        },
+    )
+
+    query_generator_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated query generation calls from the response cache. Unset caches them only at temperature 0."
+        },
+    )
+
+    reflection_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated reflection calls from the response cache. Unset caches them only at temperature 0."
+        },
+    )
+
+    answer_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated answer and map-reduce condensing calls from the response cache. Unset caches them only at temperature 0."
+        },
+    )
+
+    structured_output_retries: int = Field(
+        default=1,
+        metadata={
+            "description": "Times query generation and reflection are requested again when their structured output cannot be repaired locally."
+        },
+    )
+
+    @model_validator(mode="after")
+    def _check_deadline(self) -> Self:
+        deadline = self.research_deadline_seconds
+        if deadline is not None and 0 < deadline <= self.deadline_reserve_seconds:
+            # Every search would be dropped as past the deadline
+            raise ValueError(
+                f"research_deadline_seconds ({deadline}) must be greater than "
+                f"deadline_reserve_seconds ({self.deadline_reserve_seconds})"
+            )
+        return self
+
+
+class BatchResearchConfiguration(Configuration):
+    """The configuration for the batch researcher."""
+
+    batch_planning_concurrency: int = Field(
+        default=4,
+        metadata={
+            "description": "The maximum number of concurrent query generation calls."
+        },
+    )
+
+    batch_search_concurrency: int = Field(
+        default=8,
+        metadata={"description": "The maximum number of concurrent web searches."},
+    )
+
+    batch_answer_concurrency: int = Field(
+        default=4,
+        metadata={
+            "description": "The maximum number of concurrent answer generation calls."
+        },
+    )
+
+
+class CompactionConfiguration(BaseConfiguration):
+    """Message history compaction settings shared by the conversational agents."""
+
+    compaction_max_messages: int = Field(
+        default=50,
+        metadata={
+            "description": "Compact the message history once it holds more than this many messages."
+        },
+    )
+
+    compaction_max_tokens: int = Field(
+        default=12000,
+        metadata={
+            "description": "Compact the message history once its estimated size exceeds this many tokens."
+        },
+    )
+
+    compaction_keep_last: int = Field(
+        default=10,
+        metadata={
+            "description": "The number of most recent messages kept verbatim when compacting."
+        },
+    )
+
+    compaction_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "The language model used to summarize old turns. Defaults to the agent's model."
+        },
+    )
+
+    compaction_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated history summaries from the response cache. Unset caches them only at temperature 0."
+        },
+    )
+
+
+class ChatbotConfiguration(CompactionConfiguration):
     """The configuration for the basic chatbot."""
 
+    profiles: ClassVar[Dict[str, Dict[str, Any]]] = {
+        "fast": {"chat_model": "gemini-2.0-flash-lite"},
+        "balanced": {},
+        "thorough": {"chat_model": "gemini-2.5-flash"},
+    }
+
     chat_model: str = Field(
         default="gemini-2.0-flash",
         metadata={
@@ -77,30 +390,30 @@ class ChatbotConfiguration(BaseModel):
         },
     )
 
-    @classmethod
-    def from_runnable_config(
-        cls, config: Optional[RunnableConfig] = None
-    ) -> "ChatbotConfiguration":
-        """Create a ChatbotConfiguration instance from a RunnableConfig."""
-        configurable = (
-            config["configurable"] if config and "configurable" in config else {}
-        )
-
-        # Get raw values from environment or config
-        raw_values: dict[str, Any] = {
-            name: os.environ.get(name.upper(), configurable.get(name))
-            for name in cls.model_fields.keys()
-        }
-
-        # Filter out None values
-        values = {k: v for k, v in raw_values.items() if v is not None}
+    chat_cascade_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "Cheaper model tried before the chat model; its reply is kept unless it is empty or hedges. Unset disables the cascade."
+        },
+    )
 
-        return cls(**values)
+    chat_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated chatbot calls from the response cache. Unset caches them only at temperature 0."
+        },
+    )
 
 
-class MathAgentConfiguration(BaseModel):
+class MathAgentConfiguration(CompactionConfiguration):
     """The configuration for the math agent."""
 
+    profiles: ClassVar[Dict[str, Dict[str, Any]]] = {
+        "fast": {"math_model": "gemini-2.0-flash-lite"},
+        "balanced": {},
+        "thorough": {"math_model": "gemini-2.5-flash"},
+    }
+
     math_model: str = Field(
         default="gemini-2.0-flash",
         metadata={
@@ -115,22 +428,41 @@ class MathAgentConfiguration(BaseModel):
         },
     )
 
-    @classmethod
-    def from_runnable_config(
-        cls, config: Optional[RunnableConfig] = None
-    ) -> "MathAgentConfiguration":
-        """Create a MathAgentConfiguration instance from a RunnableConfig."""
-        configurable = (
-            config["configurable"] if config and "configurable" in config else {}
-        )
+    math_cache: bool | None = Field(
+        default=None,
+        metadata={
+            "description": "Serve repeated math agent calls from the response cache. Unset caches them only at temperature 0."
+        },
+    )
 
-        # Get raw values from environment or config
-        raw_values: dict[str, Any] = {
-            name: os.environ.get(name.upper(), configurable.get(name))
-            for name in cls.model_fields.keys()
-        }
 
-        # Filter out None values
-        values = {k: v for k, v in raw_values.items() if v is not None}
+class RouterConfiguration(CompactionConfiguration):
+    """The configuration for the front-door router."""
 
-        return cls(**values)
+    router_model: str = Field(
+        default="gemini-2.0-flash-lite",
+        metadata={
+            "description": "The small language model asked to pick an agent when the rules are unsure."
+        },
+    )
+
+    router_model_fallback: bool = Field(
+        default=False,
+        metadata={
+            "description": "Ask the router model when the rule-based confidence is below router_min_confidence."
+        },
+    )
+
+    router_min_confidence: float = Field(
+        default=0.2,
+        metadata={
+            "description": "Margin between the best and second-best rule scores below which a route counts as uncertain."
+        },
+    )
+
+    router_force_agent: str | None = Field(
+        default=None,
+        metadata={
+            "description": "Send every message to this agent (deep_researcher, chatbot, math_agent or mcp_agent)."
+        },
+    )
@@ -0,0 +1,109 @@
+"""Wall-clock deadlines for research runs.
+
+``generate_query`` turns ``research_deadline_seconds`` into an absolute
+``deadline_at`` timestamp in the graph state, taken when the node starts so
+that the query generation call counts against the budget. The budget must
+exceed ``deadline_reserve_seconds``. From then on:
+
+* ``web_research`` branches give up on a search that would end after the
+  finalization reserve, and record it as dropped instead of holding up the
+  ``reflection`` join;
+* ``reflection`` and ``evaluate_research`` skip further loops once the deadline
+  is near;
+* ``finalize_answer`` answers from whatever results arrived and records what
+  was included and dropped.
+
+A dropped search is also stopped: the work running under
+:func:`call_with_deadline` sees its deadline through :func:`call_time_left`,
+so the search request times out with it and no retry starts after it.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, TypeVar
+
+from telemetry import get_metrics, run_profiled
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Monotonic deadline of the call running under call_with_deadline
+_call_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "call_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call did not finish before its deadline."""
+
+
+def deadline_at(deadline_seconds: float | None) -> float | None:
+    """Return the absolute deadline for a run starting now, if any."""
+    if deadline_seconds is None or deadline_seconds <= 0:
+        return None
+    return time.time() + deadline_seconds
+
+
+def time_left(deadline: float | None, reserve: float = 0.0) -> float | None:
+    """Return the seconds left before ``deadline`` minus ``reserve``, or None."""
+    if deadline is None:
+        return None
+    return deadline - reserve - time.time()
+
+
+def call_time_left() -> float | None:
+    """Return the seconds left to the call running under :func:`call_with_deadline`.
+
+    Returns None outside of such a call.
+    """
+    deadline = _call_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_with_deadline(func: Callable[[], T], timeout: float | None) -> T:
+    """Call ``func`` and give up after ``timeout`` seconds.
+
+    The call runs in a thread of its own, so the timeout starts when the call
+    does rather than in an executor queue. When it times out its result is
+    discarded; ``func`` is expected to stop by itself, by bounding its waits
+    with :func:`call_time_left`.
+
+    Raises:
+        DeadlineExceeded: If ``func`` did not return in time
+    """
+    if timeout is None:
+        return func()
+    if timeout <= 0:
+        raise DeadlineExceeded("deadline already passed")
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def run() -> None:
+        _call_deadline.set(time.monotonic() + timeout)
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(run_profiled(func))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(
+        target=context.run, args=(run,), name="deadline", daemon=True
+    ).start()
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise DeadlineExceeded(f"did not finish within {timeout:.2f}s") from None
+
+
+def record_deadline_event(event: str, **attributes: Any) -> None:
+    """Count a deadline event (``branch_dropped``, ``loop_skipped``, ``partial_answer``)."""
+    get_metrics().counter(
+        "research_deadline_total",
+        "Research work skipped or cut short by the run deadline",
+    ).inc(event=event)
+    logger.info(f"Research deadline: {event} {attributes}")
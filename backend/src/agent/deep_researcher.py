@@ -1,14 +1,28 @@
+"""Deep researcher graph: iterative web research with reflection and cited answers."""
+
+import logging
 import os
 
 from dotenv import load_dotenv
-from google.genai import Client
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
 
+from agent.cascade import check_answer, check_reflection, run_cascade
 from agent.configuration import Configuration
+from agent.deadline import (
+    DeadlineExceeded,
+    call_time_left,
+    call_with_deadline,
+    deadline_at,
+    record_deadline_event,
+    time_left,
+)
+from agent.hedging import hedged_call
+from agent.knowledge import KnowledgeStore, record_knowledge_query
+from agent.map_reduce import condense_summaries, estimate_tokens
+from agent.models import get_chat_model, get_genai_client
 from agent.prompts import (
     answer_instructions,
     get_current_date,
@@ -16,27 +30,33 @@ from agent.prompts import (
     reflection_instructions,
     web_searcher_instructions,
 )
+from agent.retry import EmptySearchResponse, retry_with_backoff
+from agent.scheduler import RESEARCH, scheduled
 from agent.state import (
     OverallState,
     QueryGenerationState,
     ReflectionState,
     WebSearchState,
 )
+from agent.structured_output import structured_output
+from agent.sufficiency import latest_question, record_reflection, score_coverage
 from agent.tools_and_schemas import Reflection, SearchQueryList
 from agent.utils import (
     get_citations,
     get_research_topic,
     insert_citation_markers,
+    normalize_query,
     resolve_urls,
+    restore_short_urls,
 )
+from telemetry import get_metrics, instrument_graph, instrument_node, trace_span
 
 load_dotenv()
 
 if os.getenv("GEMINI_API_KEY") is None:
     raise ValueError("GEMINI_API_KEY is not set")
 
-# Used for Google Search API
-genai_client = Client(api_key=os.getenv("GEMINI_API_KEY"))
+logger = logging.getLogger(__name__)
 
 
 # Nodes
@@ -54,19 +74,23 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
         Dictionary with state update, including search_query key containing the generated query
     """
     configurable = Configuration.from_runnable_config(config)
+    # The budget starts with the run, before the query generation call
+    run_deadline = deadline_at(configurable.research_deadline_seconds)
 
     # check for custom initial search query count
     if state.get("initial_search_query_count") is None:
         state["initial_search_query_count"] = configurable.number_of_initial_queries
 
     # init Gemini 2.0 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.query_generator_model,
+    llm = get_chat_model(
+        configurable.query_generator_model,
         temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+        cache=configurable.query_generator_cache,
+        batch=True,
+    )
+    structured_llm = structured_output(
+        llm, SearchQueryList, configurable.structured_output_retries
     )
-    structured_llm = llm.with_structured_output(SearchQueryList)
 
     # Format the prompt
     current_date = get_current_date()
@@ -77,16 +101,89 @@ def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerati
     )
     # Generate the search queries
     result = structured_llm.invoke(formatted_prompt)
-    return {"query_list": result.query}
+    return {
+        "query_list": result.query,
+        "deadline_at": run_deadline,
+    }
 
 
-def continue_to_web_research(state: QueryGenerationState):
+def retrieve_knowledge(state: OverallState, config: RunnableConfig) -> OverallState:
+    """LangGraph node that answers generated queries from the thread's prior research.
+
+    Looks up each query in the thread's knowledge store. Queries covered by
+    earlier turns, or already searched in the thread, are not searched again;
+    their snippets and sources are added to the research of this turn unless it
+    already holds them.
+
+    Args:
+        state: Current graph state containing the generated queries and the knowledge store
+        config: Configuration for the runnable, including the knowledge store settings
+
+    Returns:
+        Dictionary with state update, including query_list with the queries left to search
+    """
+    configurable = Configuration.from_runnable_config(config)
+    store = KnowledgeStore.from_state(state.get("knowledge_store"))
+    if not configurable.knowledge_store_enabled or not len(store):
+        return {"query_list": state["query_list"]}
+
+    results = state.get("web_research_result") or []
+    known_sources = {
+        (source["short_url"], source["value"])
+        for source in state.get("sources_gathered") or []
+    }
+    failed = {error["search_query"] for error in state.get("research_errors") or []}
+    searched = {
+        normalize_query(query)
+        for query in state.get("search_query") or []
+        if query not in failed
+    }
+    uncovered, retrieved, sources = [], [], []
+    for query in state["query_list"]:
+        match = store.search(query, configurable.knowledge_top_k)
+        if (
+            match.coverage < configurable.knowledge_coverage_threshold
+            and normalize_query(query) not in searched
+        ):
+            record_knowledge_query("searched")
+            uncovered.append(query)
+            continue
+        record_knowledge_query("covered")
+        for snippet in match.snippets:
+            if any(snippet["text"] in result for result in results + retrieved):
+                continue
+            retrieved.append(snippet["text"])
+            for source in snippet["sources"]:
+                if (source["short_url"], source["value"]) not in known_sources:
+                    known_sources.add((source["short_url"], source["value"]))
+                    sources.append(source)
+
+    update = {"query_list": uncovered}
+    if retrieved:
+        update["web_research_result"] = ["\n\n".join(retrieved)]
+        update["sources_gathered"] = sources
+    return update
+
+
+def continue_to_web_research(state: OverallState):
     """LangGraph node that sends the search queries to the web research node.
 
     This is used to spawn n number of web research nodes, one for each search query.
+    Goes straight to reflection when prior research covered every query.
     """
+    if not state["query_list"]:
+        return "reflection"
+    # Earlier turns of the thread already used the first short url ids
+    offset = len(state.get("search_query") or [])
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
+        Send(
+            "web_research",
+            {
+                "search_query": search_query,
+                "id": offset + int(idx),
+                "deadline_at": state.get("deadline_at"),
+            },
+        )
         for idx, search_query in enumerate(state["query_list"])
     ]
 
@@ -103,25 +200,124 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     Returns:
         Dictionary with state update, including sources_gathered, research_loop_count, and web_research_results
     """
+    # Give up on the search rather than hold up the reflection join past the deadline
+    configurable = Configuration.from_runnable_config(config)
+    timeout = time_left(state.get("deadline_at"), configurable.deadline_reserve_seconds)
+    try:
+        return call_with_deadline(
+            lambda: run_web_search(state["search_query"], state["id"], config),
+            timeout,
+        )
+    except DeadlineExceeded as e:
+        record_deadline_event("branch_dropped", search_query=state["search_query"])
+        return {
+            "dropped_research": [
+                {
+                    "search_query": state["search_query"],
+                    "id": state["id"],
+                    "reason": str(e),
+                }
+            ]
+        }
+
+
+def run_web_search(search_query: str, id: int, config: RunnableConfig) -> OverallState:
+    """Run one grounded Google Search and return the ``web_research`` state update.
+
+    Transient failures are retried with backoff. When every attempt fails, the
+    branch degrades to an empty result with an entry in ``research_errors``
+    instead of failing the run and the work of the other branches.
+
+    Shared with the batch researcher, which runs deduplicated searches for
+    several questions.
+
+    Args:
+        search_query: The query to search for
+        id: Unique id of the search within the run, used for short urls
+        config: Configuration for the runnable, including search API settings
+    """
+    configurable = Configuration.from_runnable_config(config)
+    attempts = 0
+
+    def attempt() -> OverallState:
+        nonlocal attempts
+        attempts += 1
+        return _grounded_search(search_query, id, config)
+
+    try:
+        return retry_with_backoff(
+            attempt,
+            attempts=configurable.search_max_attempts,
+            backoff=configurable.search_retry_backoff_seconds,
+            name="web_research",
+        )
+    except Exception as e:
+        left = call_time_left()
+        if left is not None and left <= 0:
+            # The branch was already dropped at the deadline; it did not fail
+            raise DeadlineExceeded(f"search stopped at the deadline: {e}") from e
+        get_metrics().counter(
+            "web_research_failures_total", "Searches that failed after all retries"
+        ).inc(error=type(e).__name__)
+        logger.error(f"Search '{search_query}' failed after {attempts} attempts: {e}")
+        return {
+            "sources_gathered": [],
+            "search_query": [search_query],
+            "web_research_result": [],
+            "research_errors": [
+                {
+                    "search_query": search_query,
+                    "id": id,
+                    "error": f"{type(e).__name__}: {e}",
+                    "attempts": attempts,
+                }
+            ],
+        }
+
+
+def _grounded_search(
+    search_query: str, id: int, config: RunnableConfig
+) -> OverallState:
     # Configure
     configurable = Configuration.from_runnable_config(config)
     formatted_prompt = web_searcher_instructions.format(
         current_date=get_current_date(),
-        research_topic=state["search_query"],
+        research_topic=search_query,
     )
 
+    search_config: dict = {"tools": [{"google_search": {}}], "temperature": 0}
+    left = call_time_left()
+    if left is not None:
+        # Past the branch deadline the request is abandoned, so stop it too
+        search_config["http_options"] = {"timeout": max(1, int(left * 1000))}
+
     # Uses the google genai client as the langchain client doesn't return grounding metadata
-    response = genai_client.models.generate_content(
+    with trace_span(
+        config,
+        "google_search",
         model=configurable.query_generator_model,
-        contents=formatted_prompt,
-        config={
-            "tools": [{"google_search": {}}],
-            "temperature": 0,
-        },
-    )
+        search_query=search_query,
+        id=id,
+        prompt_chars=len(formatted_prompt),
+    ):
+        response = hedged_call(
+            lambda: get_genai_client().models.generate_content(
+                model=configurable.query_generator_model,
+                contents=formatted_prompt,
+                config=search_config,
+            ),
+            model=configurable.query_generator_model,
+            enabled=configurable.hedge_searches,
+            percentile=configurable.hedge_percentile,
+            max_rate=configurable.hedge_max_rate,
+        )
+    if not response.candidates or not response.text:
+        raise EmptySearchResponse(f"No answer for search '{search_query}'")
+    # Searches without grounding metadata still return text, without citations
+    grounding_metadata = response.candidates[0].grounding_metadata
     # resolve the urls to short urls for saving tokens and time
     resolved_urls = resolve_urls(
-        response.candidates[0].grounding_metadata.grounding_chunks, state["id"]
+        grounding_metadata.grounding_chunks if grounding_metadata else [], id
     )
     # Gets the citations and adds them to the generated text
     citations = get_citations(response, resolved_urls)
@@ -130,7 +326,7 @@ def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
 
     return {
         "sources_gathered": sources_gathered,
-        "search_query": [state["search_query"]],
+        "search_query": [search_query],
         "web_research_result": [modified_text],
     }
 
@@ -152,7 +348,37 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     configurable = Configuration.from_runnable_config(config)
     # Increment the research loop count and get the reasoning model
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
-    reasoning_model = state.get("reasoning_model") or configurable.reasoning_model
+    reasoning_model = state.get("reasoning_model") or configurable.reflection_model
+
+    # No time for another loop: go straight to the answer
+    remaining = time_left(
+        state.get("deadline_at"), configurable.deadline_reserve_seconds
+    )
+    if remaining is not None and remaining <= 0:
+        record_deadline_event(
+            "loop_skipped", research_loop_count=state["research_loop_count"]
+        )
+        return {
+            "is_sufficient": False,
+            "knowledge_gap": "",
+            "follow_up_queries": [],
+            "research_loop_count": state["research_loop_count"],
+            "number_of_ran_queries": len(state["search_query"]),
+        }
+
+    # Skip the reasoning model when the research obviously covers the question
+    coverage = score_coverage(
+        latest_question(state["messages"]), state["web_research_result"]
+    )
+    if coverage.score >= configurable.reflection_skip_threshold:
+        record_reflection("skipped", coverage.score)
+        return {
+            "is_sufficient": True,
+            "knowledge_gap": "",
+            "follow_up_queries": [],
+            "research_loop_count": state["research_loop_count"],
+            "number_of_ran_queries": len(state["search_query"]),
+        }
 
     # Format the prompt
     current_date = get_current_date()
@@ -161,19 +387,41 @@ def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
         research_topic=get_research_topic(state["messages"]),
         summaries="\n\n---\n\n".join(state["web_research_result"]),
     )
-    # init Reasoning Model
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=1.0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+    # Try the cheap model first when a cascade is configured
+    cascade = run_cascade(
+        "reflection",
+        configurable.reflection_cascade_model,
+        reasoning_model,
+        lambda model: structured_output(
+            get_chat_model(
+                model, temperature=1.0, cache=configurable.reflection_cache, batch=True
+            ),
+            Reflection,
+            configurable.structured_output_retries,
+        ).invoke(formatted_prompt),
+        lambda result: check_reflection(
+            result, coverage.score, configurable.reflection_cascade_min_coverage
+        ),
+        formatted_prompt,
+    )
+    result = cascade.value
+    record_reflection(
+        "llm_sufficient" if result.is_sufficient else "llm_insufficient", coverage.score
     )
-    result = llm.with_structured_output(Reflection).invoke(formatted_prompt)
+
+    # Never pay twice for a search: drop follow-ups this run already ran successfully
+    failed = {error["search_query"] for error in state.get("research_errors") or []}
+    seen = {normalize_query(q) for q in state["search_query"] if q not in failed}
+    follow_up_queries = []
+    for query in result.follow_up_queries:
+        if normalize_query(query) not in seen:
+            seen.add(normalize_query(query))
+            follow_up_queries.append(query)
 
     return {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": follow_up_queries,
         "research_loop_count": state["research_loop_count"],
         "number_of_ran_queries": len(state["search_query"]),
     }
@@ -201,7 +449,15 @@ def evaluate_research(
         if state.get("max_research_loops") is not None
         else configurable.max_research_loops
     )
-    if state["is_sufficient"] or state["research_loop_count"] >= max_research_loops:
+    remaining = time_left(
+        state.get("deadline_at"), configurable.deadline_reserve_seconds
+    )
+    if (
+        state["is_sufficient"]
+        or state["research_loop_count"] >= max_research_loops
+        or (remaining is not None and remaining <= 0)
+        or not state["follow_up_queries"]
+    ):
         return "finalize_answer"
     else:
         return [
@@ -210,6 +466,7 @@ def evaluate_research(
                 {
                     "search_query": follow_up_query,
                     "id": state["number_of_ran_queries"] + int(idx),
+                    "deadline_at": state.get("deadline_at"),
                 },
             )
             for idx, follow_up_query in enumerate(state["follow_up_queries"])
@@ -230,55 +487,99 @@ def finalize_answer(state: OverallState, config: RunnableConfig):
         Dictionary with state update, including running_summary key containing the formatted final summary with sources
     """
     configurable = Configuration.from_runnable_config(config)
-    reasoning_model = state.get("reasoning_model") or configurable.reasoning_model
+    reasoning_model = state.get("reasoning_model") or configurable.answer_model
+
+    # Record what made it into the answer when the run has a deadline
+    deadline_report = None
+    if state.get("deadline_at") is not None:
+        dropped = state.get("dropped_research") or []
+        deadline_report = {
+            "deadline_seconds": configurable.research_deadline_seconds,
+            "seconds_left_at_finalize": round(time_left(state["deadline_at"]), 3),
+            "included": list(state["search_query"]),
+            "dropped": dropped,
+        }
+        if dropped:
+            record_deadline_event("partial_answer", dropped=len(dropped))
+
+    # Condense large research sets in parallel chunks before writing the answer
+    research_topic = get_research_topic(state["messages"])
+    summaries = state["web_research_result"]
+    if estimate_tokens("".join(summaries)) > configurable.map_reduce_threshold_tokens:
+        summaries = condense_summaries(
+            summaries,
+            research_topic,
+            model=configurable.map_reduce_model or configurable.query_generator_model,
+            chunk_tokens=configurable.map_reduce_chunk_tokens,
+            target_tokens=configurable.map_reduce_threshold_tokens,
+            concurrency=configurable.map_reduce_concurrency,
+            cache=configurable.answer_cache,
+        )
 
     # Format the prompt
     current_date = get_current_date()
     formatted_prompt = answer_instructions.format(
         current_date=current_date,
-        research_topic=get_research_topic(state["messages"]),
-        summaries="\n---\n\n".join(state["web_research_result"]),
+        research_topic=research_topic,
+        summaries="\n---\n\n".join(summaries),
     )
 
-    # init Reasoning Model, default to Gemini 2.5 Flash
-    llm = ChatGoogleGenerativeAI(
-        model=reasoning_model,
-        temperature=0,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
-    )
-    result = llm.invoke(formatted_prompt)
+    # Reasoning Model, default to Gemini 2.5 Flash, after the cheap model of a cascade
+    result = run_cascade(
+        "finalize_answer",
+        configurable.answer_cascade_model,
+        reasoning_model,
+        lambda model: get_chat_model(
+            model, temperature=0, cache=configurable.answer_cache
+        ).invoke(formatted_prompt),
+        lambda message: check_answer(
+            message.content,
+            state["sources_gathered"],
+            configurable.answer_cascade_min_citations,
+            configurable.answer_cascade_words_per_source,
+        ),
+        formatted_prompt,
+    ).value
 
     # Replace the short urls with the original urls and add all used urls to the sources_gathered
-    unique_sources = []
-    for source in state["sources_gathered"]:
-        if source["short_url"] in result.content:
-            result.content = result.content.replace(
-                source["short_url"], source["value"]
-            )
-            unique_sources.append(source)
+    content, unique_sources = restore_short_urls(
+        result.content, state["sources_gathered"]
+    )
 
-    return {
-        "messages": [AIMessage(content=result.content)],
+    update = {
+        "messages": [AIMessage(content=content)],
         "sources_gathered": unique_sources,
     }
+    # Index this turn's research for follow-up questions in the thread
+    if configurable.knowledge_store_enabled:
+        store = KnowledgeStore.from_state(state.get("knowledge_store"))
+        if store.add_results(state["web_research_result"], state["sources_gathered"]):
+            update["knowledge_store"] = store.to_state()
+    if deadline_report is not None:
+        update["deadline_report"] = deadline_report
+    return update
 
 
 # Create our Agent Graph
 builder = StateGraph(OverallState, config_schema=Configuration)
 
 # Define the nodes we will cycle between
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("reflection", reflection)
-builder.add_node("finalize_answer", finalize_answer)
+builder.add_node("generate_query", scheduled(instrument_node(generate_query), RESEARCH))
+builder.add_node("retrieve_knowledge", instrument_node(retrieve_knowledge))
+builder.add_node("web_research", scheduled(instrument_node(web_research), RESEARCH))
+builder.add_node("reflection", scheduled(instrument_node(reflection), RESEARCH))
+builder.add_node(
+    "finalize_answer", scheduled(instrument_node(finalize_answer), RESEARCH)
+)
 
 # Set the entrypoint as `generate_query`
 # This means that this node is the first one called
 builder.add_edge(START, "generate_query")
+# Answer what the thread's earlier research covers without searching again
+builder.add_edge("generate_query", "retrieve_knowledge")
 # Add conditional edge to continue with search queries in a parallel branch
 builder.add_conditional_edges(
-    "generate_query", continue_to_web_research, ["web_research"]
+    "retrieve_knowledge", continue_to_web_research, ["web_research", "reflection"]
 )
 # Reflect on the web research
 builder.add_edge("web_research", "reflection")
@@ -289,4 +590,4 @@ builder.add_conditional_edges(
 # Finalize the answer
 builder.add_edge("finalize_answer", END)
 
-deep_researcher_graph = builder.compile(name="pro-search-agent")
+deep_researcher_graph = instrument_graph(builder.compile(name="pro-search-agent"))
@@ -0,0 +1,153 @@
+"""Hedged requests to cut the latency tail of grounded searches.
+
+If a call has not returned after the ``hedge_percentile`` of the recent
+latencies of its model, a duplicate request is issued and whichever returns
+first wins. The losing request cannot be interrupted mid-flight; it is
+abandoned and its result discarded.
+
+Every request runs in a thread of its own, started at once rather than queued
+for a shared pool, so the hedge delay counts from the start of the request,
+and an abandoned request only holds its own thread until it returns.
+
+Hedges are capped at ``hedge_max_rate`` of the recent requests per model, so a
+latency regression cannot double the load on the API. Counters at
+``GET /metrics``: ``hedge_requests_total`` by model and event (``issued``,
+``won``, ``lost``, ``over_budget``).
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Deque, Dict, TypeVar
+
+from telemetry import get_metrics, run_profiled
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding windows of recent call latencies and hedges, per model."""
+
+    def __init__(self, window: int = 200):
+        """Keep the last ``window`` latencies and hedge decisions of each model."""
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._hedged: Dict[str, Deque[bool]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        """Record the latency of one completed call."""
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, model: str, q: float, min_samples: int = 20) -> float | None:
+        """Return the ``q``-th percentile latency, or None without enough samples."""
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        rank = min(len(samples) - 1, max(0, round(q / 100 * (len(samples) - 1))))
+        return samples[rank]
+
+    def start_request(self, model: str) -> None:
+        """Count a request in the hedge-rate window."""
+        with self._lock:
+            self._hedged.setdefault(model, deque(maxlen=self.window)).append(False)
+
+    def try_hedge(self, model: str, max_rate: float) -> bool:
+        """Mark the latest request as hedged if the hedge rate allows it."""
+        with self._lock:
+            window = self._hedged.setdefault(model, deque(maxlen=self.window))
+            if not window or (sum(window) + 1) / len(window) > max_rate:
+                return False
+            # Flag the most recent unhedged request
+            for idx in range(len(window) - 1, -1, -1):
+                if not window[idx]:
+                    window[idx] = True
+                    break
+            return True
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Return the process-wide latency tracker."""
+    return _tracker
+
+
+def _count(model: str, event: str) -> None:
+    get_metrics().counter(
+        "hedge_requests_total", "Hedged duplicate requests by model and event"
+    ).inc(model=model, event=event)
+
+
+def _start(func: Callable[[], T], model: str) -> Future:
+    """Run ``func`` in a thread of its own and return the future of its result."""
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def run() -> None:
+        future.set_running_or_notify_cancel()
+        start = time.perf_counter()
+        try:
+            result = run_profiled(func)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        _tracker.record(model, time.perf_counter() - start)
+        future.set_result(result)
+
+    threading.Thread(target=context.run, args=(run,), name="hedge", daemon=True).start()
+    return future
+
+
+def hedged_call(
+    func: Callable[[], T],
+    model: str,
+    enabled: bool = True,
+    percentile: float = 95.0,
+    max_rate: float = 0.1,
+    min_samples: int = 20,
+) -> T:
+    """Call ``func``, issuing one duplicate if it is slower than usual.
+
+    Args:
+        func: The request; it must be safe to run twice
+        model: Model name the latency statistics are kept for
+        enabled: Without hedging the call only feeds the latency statistics
+        percentile: Latency percentile after which the duplicate is issued
+        max_rate: Maximum fraction of recent requests that may be hedged
+        min_samples: Latencies needed before hedging starts
+    """
+    delay = _tracker.percentile(model, percentile, min_samples) if enabled else None
+    if delay is None:
+        start = time.perf_counter()
+        result = func()
+        _tracker.record(model, time.perf_counter() - start)
+        return result
+
+    _tracker.start_request(model)
+    primary = _start(func, model)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+    if not _tracker.try_hedge(model, max_rate):
+        _count(model, "over_budget")
+        return primary.result()
+
+    _count(model, "issued")
+    hedge = _start(func, model)
+    pending = {primary, hedge}
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                # The other request is abandoned; its thread ends with it
+                _count(model, "won" if future is hedge else "lost")
+                return future.result()
+            error = future.exception()
+    raise error
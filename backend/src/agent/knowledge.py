@@ -0,0 +1,177 @@
+"""Thread-scoped index of prior research for follow-up questions.
+
+``finalize_answer`` splits every ``web_research_result`` of the turn into
+snippets, keeping their citation short urls and sources, and adds them to the
+``knowledge_store`` channel. The store is part of the graph state, so it is
+persisted with the thread by the checkpointer.
+
+The store is opt-in (``knowledge_store_enabled``). On the next turn, ``retrieve_knowledge`` looks up each generated query in the
+store before any search runs. The snippets are ranked by cosine similarity of
+hashed bag-of-words vectors (NumPy, no embedding calls); a query counts as
+covered when the top snippets contain ``knowledge_coverage_threshold`` of its
+key terms. Only uncovered queries are sent to ``web_research``. Term coverage
+is a weak signal, since a query can share its key terms with research about
+something else, so skipped searches are a trade of accuracy for latency.
+
+Counters at ``GET /metrics``: ``knowledge_queries_total`` by ``outcome``
+(``covered``, ``searched``).
+"""
+
+import base64
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from agent.map_reduce import SHORT_URL_PATTERN
+from agent.sufficiency import key_terms
+from telemetry import get_metrics
+
+DIMENSIONS = 512
+
+# Snippets are cut at sentence ends once they reach this many characters
+_SNIPPET_CHARS = 400
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# Citation links; their urls would otherwise dominate every snippet's terms
+_LINK = re.compile(r"\]\([^)]*\)")
+
+
+def embed(text: str, dimensions: int = DIMENSIONS) -> np.ndarray:
+    """Return the L2-normalized hashed bag-of-words vector of ``text``."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for term in key_terms(_LINK.sub("]", text)):
+        digest = zlib.crc32(term.encode("utf-8"))
+        vector[digest % dimensions] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def split_snippets(text: str, max_chars: int = _SNIPPET_CHARS) -> List[str]:
+    """Split a research summary into snippets of whole sentences."""
+    snippets, current = [], ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if current and len(current) + len(sentence) > max_chars:
+            snippets.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        snippets.append(current)
+    return snippets
+
+
+@dataclass
+class Match:
+    """Snippets retrieved for one query and how well they cover it."""
+
+    query: str
+    coverage: float
+    snippets: List[Dict[str, Any]]
+
+
+class KnowledgeStore:
+    """Snippets of prior research with their vectors, stored in graph state."""
+
+    def __init__(
+        self,
+        snippets: List[Dict[str, Any]] | None = None,
+        vectors: np.ndarray | None = None,
+        dimensions: int = DIMENSIONS,
+    ):
+        """Create a store from stored snippets and their vectors."""
+        self.dimensions = dimensions
+        self.snippets = list(snippets or [])
+        self.vectors = (
+            vectors
+            if vectors is not None
+            else np.zeros((0, dimensions), dtype=np.float32)
+        )
+        self._texts = {snippet["text"] for snippet in self.snippets}
+
+    def __len__(self) -> int:
+        """Return the number of snippets."""
+        return len(self.snippets)
+
+    @classmethod
+    def from_state(cls, data: Dict[str, Any] | None) -> "KnowledgeStore":
+        """Load the store from its ``knowledge_store`` state value."""
+        if not data:
+            return cls()
+        dimensions = data["dimensions"]
+        vectors = np.frombuffer(
+            base64.b64decode(data["vectors"]), dtype=np.float16
+        ).astype(np.float32)
+        return cls(data["snippets"], vectors.reshape(-1, dimensions), dimensions)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Return the store as a JSON-serializable state value."""
+        return {
+            "dimensions": self.dimensions,
+            # float16 halves the checkpoint size at no cost for ranking
+            "vectors": base64.b64encode(
+                self.vectors.astype(np.float16).tobytes()
+            ).decode("ascii"),
+            "snippets": self.snippets,
+        }
+
+    def add_results(
+        self, results: Sequence[str], sources_gathered: Sequence[Dict[str, Any]]
+    ) -> int:
+        """Index research summaries with the sources they cite.
+
+        Args:
+            results: ``web_research_result`` summaries with citation short urls
+            sources_gathered: Sources of the summaries, keyed by ``short_url``
+
+        Returns:
+            The number of snippets added; known snippets are skipped
+        """
+        sources_by_url: Dict[str, Dict[str, Any]] = {}
+        for source in sources_gathered:
+            sources_by_url.setdefault(source["short_url"], source)
+
+        new_snippets, new_vectors = [], []
+        for result in results:
+            for text in split_snippets(result):
+                if text in self._texts:
+                    continue
+                self._texts.add(text)
+                # Whole short urls only: ".../id/1-1" must not match ".../id/1-10"
+                cited = set(SHORT_URL_PATTERN.findall(text))
+                new_snippets.append(
+                    {
+                        "text": text,
+                        "sources": [
+                            source
+                            for short_url, source in sources_by_url.items()
+                            if short_url in cited
+                        ],
+                    }
+                )
+                new_vectors.append(embed(text, self.dimensions))
+        if new_snippets:
+            self.snippets.extend(new_snippets)
+            self.vectors = np.vstack([self.vectors, np.stack(new_vectors)])
+        return len(new_snippets)
+
+    def search(self, query: str, top_k: int = 4) -> Match:
+        """Return the ``top_k`` snippets most similar to ``query``."""
+        terms = key_terms(query)
+        if not len(self) or not terms:
+            return Match(query, 0.0, [])
+        scores = self.vectors @ embed(query, self.dimensions)
+        top = np.argsort(-scores)[:top_k]
+        snippets = [self.snippets[i] for i in top if scores[i] > 0]
+        found = set(
+            key_terms(_LINK.sub("]", " ".join(snippet["text"] for snippet in snippets)))
+        )
+        coverage = sum(1 for term in terms if term in found) / len(terms)
+        return Match(query, round(coverage, 4), snippets)
+
+
+def record_knowledge_query(outcome: str) -> None:
+    """Count a generated query answered from the store (``covered``) or searched."""
+    get_metrics().counter(
+        "knowledge_queries_total", "Research queries by knowledge store outcome"
+    ).inc(outcome=outcome)
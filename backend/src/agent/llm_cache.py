@@ -0,0 +1,273 @@
+"""Exact-match response cache for deterministic chat-model calls.
+
+:func:`agent.models.get_chat_model` attaches the process-wide cache to the
+models it creates when the call is deterministic (temperature 0), unless a
+node's ``*_cache`` configuration field opts in or out explicitly.
+
+The cache plugs into LangChain's ``BaseCache`` hook, so entries are keyed by
+the serialized messages and the model's ``llm_string``: model name,
+temperature and every bound call option, including tools and the
+structured-output schema. Messages are normalized first: ids, usage and
+response metadata are never sent to the model, and cache hits rewrite the
+usage of the returned message, which would otherwise change the key of every
+later call in the conversation. Cached generations are LangChain-serialized,
+so tool calls and structured outputs round-trip exactly. Every hit returns a
+copy whose message has a new id, so that repeated turns answered from the
+cache are appended to the history rather than replacing each other.
+
+Backends, configured from the environment:
+
+* ``LLM_CACHE_ENABLED`` (default true) turns the cache off altogether;
+* ``LLM_CACHE_SIZE`` (default 1024) entries are kept in an in-memory LRU;
+* ``LLM_CACHE_DB``, when set, persists entries to a local SQLite database
+  behind the LRU.
+
+Counters at ``GET /metrics``: ``llm_cache_requests_total`` by ``result``
+(``hit``, ``miss``) and ``backend``.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+from typing import Any, Sequence, Tuple
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import LC_ID_PREFIX, BaseMessage
+
+from telemetry import get_metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    prompt TEXT NOT NULL,
+    llm_string TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (prompt, llm_string)
+)
+"""
+
+
+# Message fields that are not part of what the model sees
+_VOLATILE_FIELDS = ("id", "usage_metadata", "response_metadata")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Return a digest of the serialized ``prompt`` without volatile message fields."""
+    try:
+        messages = json.loads(prompt)
+        for message in messages:
+            for field in _VOLATILE_FIELDS:
+                message.get("kwargs", {}).pop(field, None)
+        prompt = json.dumps(messages, sort_keys=True)
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _count(result: str, backend: str) -> None:
+    get_metrics().counter(
+        "llm_cache_requests_total", "Chat-model response cache lookups by result"
+    ).inc(result=result, backend=backend)
+
+
+def _fresh_generations(generations: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    """Copy cached generations, giving each message a new id.
+
+    LangChain writes the message it returns back into the generation, and
+    ``add_messages`` treats messages with the same id as replacements.
+    """
+    fresh = []
+    for generation in generations:
+        message = getattr(generation, "message", None)
+        if isinstance(message, BaseMessage):
+            message = message.model_copy(
+                update={"id": f"{LC_ID_PREFIX}-{uuid.uuid4()}"}
+            )
+            generation = generation.model_copy(update={"message": message})
+        fresh.append(generation)
+    return fresh
+
+
+class LRUCache(BaseCache):
+    """Thread-safe in-memory cache keeping the ``maxsize`` most recent entries."""
+
+    def __init__(self, maxsize: int = 1024):
+        """Create an empty cache of at most ``maxsize`` entries."""
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Tuple[str, str], RETURN_VAL_TYPE] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Return the cached generations and mark them most recently used."""
+        key = (prompt, llm_string)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        return value
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[(prompt, llm_string)] = return_val
+            self._entries.move_to_end((prompt, llm_string))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return len(self._entries)
+
+
+class SqliteCache(BaseCache):
+    """Persistent cache in a local SQLite database in WAL mode."""
+
+    def __init__(self, path: str):
+        """Open (or create) the cache database at ``path``."""
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Return the deserialized generations of an entry, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations FROM llm_cache WHERE prompt = ? AND llm_string = ?",
+                (prompt, llm_string),
+            ).fetchone()
+        if row is None:
+            return None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(row[0], allowed_objects="core")
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Serialize and store the generations, replacing an existing entry."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)",
+                (prompt, llm_string, dumps(list(return_val)), time.time()),
+            )
+
+    def clear(self, **kwargs: Any) -> None:
+        """Delete every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache(BaseCache):
+    """An in-memory LRU in front of optional persistent caches.
+
+    Backends are keyed by the digests of the normalized prompt and the
+    ``llm_string``. Hits in a persistent cache are promoted to the LRU.
+    """
+
+    def __init__(self, memory: LRUCache, persistent: Sequence[BaseCache] = ()):
+        """Put ``memory`` in front of the ``persistent`` caches."""
+        self.memory = memory
+        self.persistent = list(persistent)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> Tuple[str, str]:
+        return (
+            normalize_prompt(prompt),
+            hashlib.sha256(llm_string.encode("utf-8")).hexdigest(),
+        )
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Return copies of the cached generations, with new message ids."""
+        prompt, llm_string = self._key(prompt, llm_string)
+        value = self.memory.lookup(prompt, llm_string)
+        if value is not None:
+            _count("hit", "memory")
+            return _fresh_generations(value)
+        for cache in self.persistent:
+            value = cache.lookup(prompt, llm_string)
+            if value is not None:
+                _count("hit", type(cache).__name__)
+                self.memory.update(prompt, llm_string, value)
+                return _fresh_generations(value)
+        _count("miss", "all")
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations in every backend."""
+        prompt, llm_string = self._key(prompt, llm_string)
+        self.memory.update(prompt, llm_string, return_val)
+        for cache in self.persistent:
+            cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Clear every backend."""
+        self.memory.clear()
+        for cache in self.persistent:
+            cache.clear()
+
+
+_cache: ResponseCache | None = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def create_llm_cache(
+    enabled: bool | None = None,
+    size: int | None = None,
+    path: str | None = None,
+) -> ResponseCache | None:
+    """Create the response cache, configured from the environment by default.
+
+    Args:
+        enabled: Whether to cache at all (``LLM_CACHE_ENABLED``, default true)
+        size: Entries kept in memory (``LLM_CACHE_SIZE``, default 1024)
+        path: SQLite database persisting the entries (``LLM_CACHE_DB``, unset
+            keeps the cache in memory only)
+    """
+    if enabled is None:
+        enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    if not enabled:
+        return None
+    size = size if size is not None else int(os.getenv("LLM_CACHE_SIZE", "1024"))
+    path = path if path is not None else os.getenv("LLM_CACHE_DB")
+    return ResponseCache(LRUCache(size), [SqliteCache(path)] if path else [])
+
+
+def get_llm_cache() -> ResponseCache | None:
+    """Return the process-wide response cache, or None when caching is off."""
+    global _cache, _configured
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                _cache = create_llm_cache()
+                _configured = True
+    return _cache
+
+
+def set_llm_cache(cache: ResponseCache | None) -> None:
+    """Replace the process-wide response cache; None turns caching off."""
+    global _cache, _configured
+    with _cache_lock:
+        _cache = cache
+        _configured = True
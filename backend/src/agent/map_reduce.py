@@ -0,0 +1,130 @@
+"""Map-reduce answers for research runs with many results.
+
+Past ``map_reduce_threshold_tokens`` of gathered ``web_research_result``
+summaries, ``finalize_answer`` no longer puts every summary in one prompt.
+The summaries are grouped into chunks of at most ``map_reduce_chunk_tokens``
+and each chunk is condensed in parallel (map), keeping its citation short urls.
+The answer is then written from the condensed summaries (reduce), and the
+short urls are restored to the original urls as before.
+
+A condensed chunk that lost every citation of its input is replaced by the
+input itself, so that sources can still be cited, and so is a chunk whose
+condensing call failed. Counters at ``GET /metrics``:
+``map_reduce_chunks_total`` by outcome (``condensed``, ``kept_original``,
+``failed``).
+"""
+
+import logging
+import re
+from typing import List, Sequence
+
+from agent.models import get_chat_model
+from agent.prompts import condense_instructions, get_current_date
+from telemetry import get_metrics
+
+logger = logging.getLogger(__name__)
+
+SHORT_URL_PATTERN = re.compile(r"https://vertexaisearch\.cloud\.google\.com/id/[\w\-]+")
+
+# Condensing rounds before the reduce step runs regardless of size
+_MAX_ROUNDS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the tokens of ``text`` (4 chars per token)."""
+    return len(text) // 4
+
+
+def chunk_by_tokens(summaries: Sequence[str], max_tokens: int) -> List[List[str]]:
+    """Group ``summaries`` in order into chunks of at most ``max_tokens``.
+
+    A summary larger than ``max_tokens`` forms a chunk on its own.
+    """
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def condense_summaries(
+    summaries: Sequence[str],
+    research_topic: str,
+    model: str,
+    chunk_tokens: int,
+    target_tokens: int,
+    concurrency: int = 4,
+    cache: bool | None = None,
+) -> List[str]:
+    """Condense ``summaries`` chunk by chunk until they fit in ``target_tokens``.
+
+    Args:
+        summaries: The research summaries, with citation short urls
+        research_topic: The user's question the summaries are condensed for
+        model: Chat model used for condensing
+        chunk_tokens: Maximum tokens of summaries per condensing prompt
+        target_tokens: Total tokens the condensed summaries should fit in
+        concurrency: Maximum number of chunks condensed at the same time
+        cache: Whether to use the response cache, see :func:`agent.models.get_chat_model`
+
+    Returns:
+        The condensed summaries, one per chunk of the last round
+    """
+    llm = get_chat_model(model, temperature=0, cache=cache, batch=True)
+    chunks_total = get_metrics().counter(
+        "map_reduce_chunks_total",
+        "Chunks condensed by the map-reduce answer, by outcome",
+    )
+    max_words = max(50, chunk_tokens // 8)
+    current = list(summaries)
+    for _ in range(_MAX_ROUNDS):
+        if estimate_tokens("".join(current)) <= target_tokens or len(current) <= 1:
+            break
+        chunks = [
+            "\n---\n\n".join(chunk) for chunk in chunk_by_tokens(current, chunk_tokens)
+        ]
+        prompts = [
+            condense_instructions.format(
+                current_date=get_current_date(),
+                research_topic=research_topic,
+                summaries=chunk,
+                max_words=max_words,
+            )
+            for chunk in chunks
+        ]
+        responses = llm.batch(
+            prompts, config={"max_concurrency": concurrency}, return_exceptions=True
+        )
+
+        condensed = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                # One failed chunk must not cost the answer every other branch
+                chunks_total.inc(outcome="failed")
+                logger.warning(
+                    f"Condensing a chunk failed, keeping the original: {response}"
+                )
+                condensed.append(chunk)
+                continue
+            text = str(response.content)
+            cited = set(SHORT_URL_PATTERN.findall(chunk))
+            kept = cited & set(SHORT_URL_PATTERN.findall(text))
+            if cited and not kept:
+                chunks_total.inc(outcome="kept_original")
+                logger.warning(
+                    "Condensed chunk lost its citations, keeping the original"
+                )
+                condensed.append(chunk)
+            else:
+                chunks_total.inc(outcome="condensed")
+                condensed.append(text)
+        current = condensed
+    return current
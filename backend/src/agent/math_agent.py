@@ -2,12 +2,16 @@ import os
 
 from dotenv import load_dotenv
 from langchain_core.runnables import RunnableConfig
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 
+from agent.compaction import make_compact_history_node
 from agent.configuration import MathAgentConfiguration
+from agent.models import get_chat_model
+from agent.scheduler import INTERACTIVE, scheduled
 from agent.state import MathAgentState
+from telemetry import instrument_graph, instrument_node
+from tools.cache import awrap_tool_call, wrap_tool_call
 from tools.calculator import calculator_tool
 
 load_dotenv()
@@ -43,11 +47,8 @@ def call_model(state: MathAgentState, config: RunnableConfig) -> MathAgentState:
     configurable = MathAgentConfiguration.from_runnable_config(config)
 
     # Initialize Gemini model with tools
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.math_model,
-        temperature=configurable.temperature,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+    llm = get_chat_model(
+        configurable.math_model, configurable.temperature, cache=configurable.math_cache
     )
 
     # Bind the calculator tool to the model
@@ -76,17 +77,24 @@ Always explain your approach when solving problems, and show the calculation ste
 
 
 # Create the tool node with our calculator tool
-tool_node = ToolNode([calculator_tool])
+tool_node = ToolNode(
+    [calculator_tool], wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call
+)
 
 # Create the Math Agent Graph
 builder = StateGraph(MathAgentState, config_schema=MathAgentConfiguration)
 
 # Define the nodes we will cycle between
-builder.add_node("call_model", call_model)
+builder.add_node(
+    "compact_history",
+    instrument_node(make_compact_history_node(MathAgentConfiguration, "math_model")),
+)
+builder.add_node("call_model", scheduled(instrument_node(call_model), INTERACTIVE))
 builder.add_node("tools", tool_node)
 
-# Set the entrypoint as `call_model`
-builder.add_edge(START, "call_model")
+# Compact long histories before `call_model`
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "call_model")
 
 # Add conditional edges from call_model
 builder.add_conditional_edges(
@@ -103,4 +111,4 @@ builder.add_conditional_edges(
 builder.add_edge("tools", "call_model")
 
 # Compile the graph
-math_agent_graph = builder.compile(name="math-agent")
+math_agent_graph = instrument_graph(builder.compile(name="math-agent"))
@@ -2,12 +2,17 @@ import os
 
 from dotenv import load_dotenv
 from langchain_core.runnables import RunnableConfig
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, START, StateGraph
 from langgraph.prebuilt import ToolNode
 
+from agent.compaction import make_compact_history_node
 from agent.configuration import MathAgentConfiguration
+from agent.models import get_chat_model
+from agent.scheduler import INTERACTIVE, scheduled
 from agent.state import MathAgentState
+from config.mcp_config import MCPConfiguration
+from telemetry import instrument_graph, instrument_node
+from tools.cache import awrap_tool_call, wrap_tool_call
 from tools.calculator import calculator_tool
 from tools.mcp_loader import get_mcp_tools_sync
 
@@ -19,6 +24,9 @@ if os.getenv("GEMINI_API_KEY") is None:
 # Load all tools at module level (graph build time)
 local_tools = [calculator_tool]
 mcp_tools = get_mcp_tools_sync()
+if MCPConfiguration.get_enabled_servers() and not mcp_tools:
+    # Reported by the graph registry instead of serving an agent without them
+    raise RuntimeError("No tools could be loaded from the enabled MCP servers")
 
 print("mcp_tools", mcp_tools)
 
@@ -38,11 +46,8 @@ def call_model(state: MathAgentState, config: RunnableConfig) -> MathAgentState:
     """Generate responses and decide whether to use tools."""
     configurable = MathAgentConfiguration.from_runnable_config(config)
 
-    llm = ChatGoogleGenerativeAI(
-        model=configurable.math_model,
-        temperature=configurable.temperature,
-        max_retries=2,
-        api_key=os.getenv("GEMINI_API_KEY"),
+    llm = get_chat_model(
+        configurable.math_model, configurable.temperature, cache=configurable.math_cache
     )
 
     model_with_tools = llm.bind_tools(all_tools)
@@ -57,16 +62,23 @@ def call_model(state: MathAgentState, config: RunnableConfig) -> MathAgentState:
 
 
 # Create tool node with all available tools
-tool_node = ToolNode(all_tools)
+tool_node = ToolNode(
+    all_tools, wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call
+)
 
 # Build the graph
 builder = StateGraph(MathAgentState, config_schema=MathAgentConfiguration)
-builder.add_node("call_model", call_model)
+builder.add_node(
+    "compact_history",
+    instrument_node(make_compact_history_node(MathAgentConfiguration, "math_model")),
+)
+builder.add_node("call_model", scheduled(instrument_node(call_model), INTERACTIVE))
 builder.add_node("tools", tool_node)
-builder.add_edge(START, "call_model")
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "call_model")
 builder.add_conditional_edges(
     "call_model", should_continue, {"tools": "tools", END: END}
 )
 builder.add_edge("tools", "call_model")
 
-mcp_agent_graph = builder.compile(name="mcp-agent")
+mcp_agent_graph = instrument_graph(builder.compile(name="mcp-agent"))
@@ -0,0 +1,108 @@
+"""Factories for the Gemini clients used by the graph nodes.
+
+Nodes obtain their clients through these helpers instead of instantiating
+``ChatGoogleGenerativeAI`` or ``google.genai.Client`` directly, which gives the
+benchmark suite a single place to substitute recorded fakes. Setting
+``GEMINI_BASE_URL`` points both clients at another endpoint, e.g. the fake
+Gemini server of ``python -m benchmarks.fake_gemini_server``.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from langchain_core.language_models import BaseChatModel
+
+from agent.batching import BatchingChatModel, get_batcher
+from agent.llm_cache import get_llm_cache
+
+_chat_model_factory: Callable[..., BaseChatModel] | None = None
+_genai_client: Any | None = None
+
+
+def get_chat_model(
+    model: str,
+    temperature: float,
+    max_retries: int = 2,
+    cache: bool | None = None,
+    batch: bool = False,
+) -> BaseChatModel:
+    """Create the LangChain chat model used by a node.
+
+    Args:
+        model: Name of the Gemini model
+        temperature: Sampling temperature
+        max_retries: Maximum number of retries on transient API errors
+        cache: Whether to serve repeated calls from the response cache
+            (:mod:`agent.llm_cache`). None caches deterministic calls only,
+            i.e. at temperature 0.
+        batch: Whether concurrent calls may be sent together by the
+            micro-batcher (:mod:`agent.batching`), when ``LLM_BATCH_ENABLED``
+
+    Returns:
+        A chat model instance
+    """
+    if _chat_model_factory is not None:
+        llm = _chat_model_factory(
+            model=model, temperature=temperature, max_retries=max_retries
+        )
+    else:
+        # Imported lazily: the Gemini SDKs dominate the package import time
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        llm = ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            max_retries=max_retries,
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url=os.getenv("GEMINI_BASE_URL") or None,
+        )
+    batcher = get_batcher() if batch else None
+    if batcher is not None:
+        # Cache lookups happen on the wrapper, before a call joins a batch
+        llm.cache = False
+        llm = BatchingChatModel(inner=llm, batcher=batcher)
+    if cache is None:
+        cache = temperature == 0
+    response_cache = get_llm_cache() if cache else None
+    # False rather than None, so that no global LangChain cache is used either
+    llm.cache = response_cache if response_cache is not None else False
+    return llm
+
+
+def get_genai_client() -> Any:
+    """Return the shared ``google.genai`` client used for grounded search."""
+    global _genai_client
+    if _genai_client is None:
+        from google.genai import Client, types
+
+        base_url = os.getenv("GEMINI_BASE_URL")
+        _genai_client = Client(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            http_options=types.HttpOptions(base_url=base_url) if base_url else None,
+        )
+    return _genai_client
+
+
+@contextmanager
+def override_models(
+    chat_model_factory: Callable[..., BaseChatModel] | None = None,
+    genai_client: Any | None = None,
+) -> Iterator[None]:
+    """Temporarily replace the chat model factory and/or the genai client.
+
+    Args:
+        chat_model_factory: Callable accepting ``model``, ``temperature`` and
+            ``max_retries`` keyword arguments and returning a chat model
+        genai_client: Object exposing ``models.generate_content``
+    """
+    global _chat_model_factory, _genai_client
+    previous = (_chat_model_factory, _genai_client)
+    if chat_model_factory is not None:
+        _chat_model_factory = chat_model_factory
+    if genai_client is not None:
+        _genai_client = genai_client
+    try:
+        yield
+    finally:
+        _chat_model_factory, _genai_client = previous
@@ -111,3 +111,39 @@ Conversation Context:
 Current User Message: {current_message}
 
 Please respond naturally and helpfully to the user's message."""
+
+compaction_instructions = """Summarize the earlier part of a conversation between a user and an AI assistant so that the assistant can continue the conversation without the original messages.
+
+Instructions:
+- Keep every fact, number, decision, user preference and open question that may matter later.
+- Keep the results of tool calls (calculations, file contents, search results) only as far as they were used in the conversation.
+- If the transcript starts with a previous summary, merge it into the new summary.
+- Write concise plain text, at most {max_words} words.
+
+Transcript:
+{transcript}"""
+
+condense_instructions = """Condense the following research summaries into the facts that help answer the user's question.
+
+Instructions:
+- The current date is {current_date}.
+- Keep every fact, number and date relevant to the user's question; drop repetition and unrelated details.
+- Keep the markdown citation links exactly as they appear (e.g. [source](https://vertexaisearch.cloud.google.com/id/1-0)) next to the facts they support. Never invent, shorten or merge links.
+- Write concise plain text, at most {max_words} words.
+
+User Context:
+- {research_topic}
+
+Summaries:
+{summaries}"""
+
+router_instructions = """Choose the agent that should answer the user's latest message.
+
+Agents:
+- deep_researcher: questions that need current facts, statistics or comparisons from web sources, with citations.
+- chatbot: greetings, general knowledge, explanations, advice and everything else.
+- math_agent: calculations and math problems.
+- mcp_agent: reading, writing or listing files in the workspace, or searching the web with Brave.
+
+Conversation:
+{conversation}"""
@@ -0,0 +1,133 @@
+"""Lazy registry of the agent graphs.
+
+Graph modules are only imported, and their graphs compiled, the first time a
+graph is requested. A graph whose module fails to import (for example because
+its API key or MCP servers are misconfigured) is reported as unhealthy without
+affecting the other graphs.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Graph name -> "module:attribute", mirroring langgraph.json
+GRAPHS: Dict[str, str] = {
+    "deep_researcher": "agent.deep_researcher:deep_researcher_graph",
+    "batch_researcher": "agent.batch_researcher:batch_researcher_graph",
+    "chatbot": "agent.chatbot_graph:chatbot_graph",
+    "math_agent": "agent.math_agent:math_agent_graph",
+    "mcp_agent": "agent.mcp_agent:mcp_agent_graph",
+    "router": "agent.router:router_graph",
+}
+
+
+class GraphUnavailableError(RuntimeError):
+    """Raised when a registered graph failed to load."""
+
+
+@dataclass
+class _Entry:
+    path: str
+    graph: Any | None = None
+    error: str | None = None
+    load_seconds: float | None = None
+
+
+class GraphRegistry:
+    """Compile graphs on first use and track their health."""
+
+    def __init__(self, graphs: Dict[str, str]):
+        """Register ``graphs``, a mapping of names to ``module:attribute`` paths."""
+        self._entries = {name: _Entry(path) for name, path in graphs.items()}
+        self._locks = {name: threading.Lock() for name in graphs}
+
+    def names(self) -> list[str]:
+        """Return the registered graph names."""
+        return list(self._entries)
+
+    def get(self, name: str) -> Any:
+        """Return the compiled graph, importing its module on first use.
+
+        Raises:
+            KeyError: If no graph is registered under ``name``
+            GraphUnavailableError: If the graph failed to load
+        """
+        entry = self._entries[name]
+        if entry.graph is None and entry.error is None:
+            with self._locks[name]:
+                if entry.graph is None and entry.error is None:
+                    self._load(name, entry)
+        if entry.graph is None:
+            raise GraphUnavailableError(f"Graph '{name}' is unavailable: {entry.error}")
+        return entry.graph
+
+    def reload(self, name: str) -> Any:
+        """Forget a previous load failure and try loading the graph again."""
+        entry = self._entries[name]
+        with self._locks[name]:
+            entry.error = None
+        return self.get(name)
+
+    def _load(self, name: str, entry: _Entry) -> None:
+        module_name, attribute = entry.path.split(":")
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+            entry.graph = getattr(module, attribute)
+            # agent.chatbot_graph is both a submodule and a graph; keep
+            # `from agent import chatbot_graph` returning the graph
+            package = sys.modules.get(module_name.rpartition(".")[0])
+            if isinstance(getattr(package, attribute, None), ModuleType):
+                setattr(package, attribute, entry.graph)
+        except Exception as e:
+            entry.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Failed to load graph '{name}': {entry.error}")
+        finally:
+            entry.load_seconds = round(time.perf_counter() - start, 4)
+        if entry.graph is not None:
+            logger.info(f"Loaded graph '{name}' in {entry.load_seconds:.3f}s")
+
+    def health(self, load: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Report the status of every graph.
+
+        Args:
+            load: Load graphs that have not been requested yet before reporting
+
+        Returns:
+            Mapping of graph name to a dict with ``status`` ("ok", "error" or
+            "not_loaded"), ``error`` and ``load_seconds``
+        """
+        report = {}
+        for name, entry in self._entries.items():
+            if load:
+                try:
+                    self.get(name)
+                except GraphUnavailableError:
+                    pass
+            if entry.graph is not None:
+                status = "ok"
+            elif entry.error is not None:
+                status = "error"
+            else:
+                status = "not_loaded"
+            report[name] = {
+                "status": status,
+                "error": entry.error,
+                "load_seconds": entry.load_seconds,
+            }
+        return report
+
+
+registry = GraphRegistry(GRAPHS)
+
+
+def get_graph(name: str) -> Any:
+    """Return a compiled graph from the default registry."""
+    return registry.get(name)
@@ -0,0 +1,80 @@
+"""Retry with exponential backoff for individual research branches."""
+
+import logging
+import random
+import time
+from typing import Callable, TypeVar
+
+from agent.deadline import call_time_left
+from telemetry import get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying; other 4xx errors are the caller's fault
+_RETRYABLE_STATUS = {408, 429}
+
+
+class EmptySearchResponse(RuntimeError):
+    """Raised when a grounded search returns no candidate or no text."""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether retrying the call that raised ``error`` may succeed.
+
+    API errors carry an HTTP ``code`` (``google.genai.errors.APIError``) or
+    ``status_code``; client errors other than timeouts and rate limits are
+    permanent. Everything else (network errors, empty responses, server
+    errors) is treated as transient.
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int) and 400 <= code < 500:
+        return code in _RETRYABLE_STATUS
+    return not isinstance(error, (TypeError, ValueError, KeyError, AttributeError))
+
+
+def retry_with_backoff(
+    func: Callable[[], T],
+    attempts: int = 3,
+    backoff: float = 1.0,
+    max_backoff: float = 8.0,
+    name: str = "call",
+    sleep: Callable[[float], None] | None = None,
+) -> T:
+    """Call ``func``, retrying transient errors with exponential backoff and jitter.
+
+    Args:
+        func: The call to make
+        attempts: Total number of attempts
+        backoff: Delay before the first retry in seconds, doubled on each retry
+        max_backoff: Upper bound of a single delay
+        name: Label of the ``retries_total`` metric
+        sleep: Sleep function, for tests and simulations
+
+    No retry starts once the deadline of an enclosing
+    :func:`~agent.deadline.call_with_deadline` would pass during the delay.
+
+    Raises:
+        The last error when every attempt failed or the error is permanent
+    """
+    sleep = sleep or time.sleep
+    for attempt in range(1, max(1, attempts) + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= attempts or not is_transient(e):
+                raise
+            # Full jitter keeps parallel branches from retrying in lockstep
+            delay = random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1)))
+            left = call_time_left()
+            if left is not None and left <= delay:
+                raise
+            get_metrics().counter("retries_total", "Retried calls by name").inc(
+                name=name
+            )
+            logger.warning(
+                f"{name} failed (attempt {attempt}/{attempts}), retrying in {delay:.2f}s: {e}"
+            )
+            sleep(delay)
+    raise AssertionError("unreachable")
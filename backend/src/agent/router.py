@@ -0,0 +1,235 @@
+"""Front-door router that sends each message to the agent best suited to it.
+
+``route_request`` classifies the latest user message with the local rules of
+:mod:`agent.routing`: no model call for greetings, arithmetic or file requests
+that would otherwise start a deep research run. When the rules are unsure and
+``router_model_fallback`` is on, ``classify_with_model`` asks the small
+``router_model`` instead. The chosen graph runs as a subgraph with the
+conversation and its new messages are added to the router's thread.
+
+``router_force_agent`` or a leading ``/research``, ``/chat``, ``/math`` or
+``/mcp`` forces the agent. An agent whose graph fails to load falls back to
+the chatbot.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, START, StateGraph
+
+from agent.compaction import make_compact_history_node
+from agent.configuration import Configuration, RouterConfiguration
+from agent.models import get_chat_model
+from agent.prompts import router_instructions
+from agent.registry import GraphUnavailableError, get_graph
+from agent.routing import (
+    ROUTES,
+    RouteDecision,
+    classify_message,
+    estimated_calls,
+    record_route,
+    strip_command,
+)
+from agent.scheduler import INTERACTIVE, scheduled
+from agent.state import RouterState
+from agent.structured_output import structured_output
+from agent.tools_and_schemas import RouteChoice
+from telemetry import instrument_graph, instrument_node
+
+load_dotenv()
+
+if os.getenv("GEMINI_API_KEY") is None:
+    raise ValueError("GEMINI_API_KEY is not set")
+
+logger = logging.getLogger(__name__)
+
+
+def _latest_user_message(state: RouterState) -> HumanMessage | None:
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            return message
+    return None
+
+
+def _finish(decision: RouteDecision, config: RunnableConfig) -> Dict[str, Any]:
+    initial_queries = Configuration.from_runnable_config(
+        config
+    ).number_of_initial_queries
+    saved = record_route(decision, initial_queries)
+    logger.info(
+        f"Routed to {decision.route} by {decision.method} "
+        f"(confidence {decision.confidence:.2f}, ~{saved} calls saved): {decision.reason}"
+    )
+    return {
+        "route": {
+            "agent": decision.route,
+            "method": decision.method,
+            "confidence": decision.confidence,
+            "scores": decision.scores,
+            "reason": decision.reason,
+            "estimated_calls": estimated_calls(decision.route, initial_queries),
+            "saved_calls": saved,
+        }
+    }
+
+
+def route_request(state: RouterState, config: RunnableConfig) -> RouterState:
+    """LangGraph node that picks an agent for the latest user message.
+
+    Args:
+        state: Current graph state containing the conversation messages
+        config: Configuration for the runnable, including the forced agent
+
+    Returns:
+        Dictionary with state update, including the ``route`` decision and the
+        message without its slash command; a decision with method
+        ``uncertain`` is completed by ``classify_with_model``
+    """
+    configurable = RouterConfiguration.from_runnable_config(config)
+    if configurable.router_force_agent:
+        if configurable.router_force_agent not in ROUTES:
+            raise ValueError(
+                f"Unknown router_force_agent '{configurable.router_force_agent}', "
+                f"expected one of {', '.join(ROUTES)}"
+            )
+        decision = RouteDecision(
+            configurable.router_force_agent, "override", 1.0, {}, "router_force_agent"
+        )
+        return _finish(decision, config)
+
+    message = _latest_user_message(state)
+    text = str(message.content) if message is not None else ""
+    decision = classify_message(text)
+    if decision.method == "override":
+        # The agents should not see the slash command
+        stripped = HumanMessage(content=strip_command(text), id=message.id)
+        return {"messages": [stripped], **_finish(decision, config)}
+    if (
+        decision.method == "rules"
+        and configurable.router_model_fallback
+        and decision.confidence < configurable.router_min_confidence
+    ):
+        return {
+            "route": {
+                "agent": decision.route,
+                "method": "uncertain",
+                "confidence": decision.confidence,
+                "scores": decision.scores,
+            }
+        }
+    return _finish(decision, config)
+
+
+def classify_with_model(state: RouterState, config: RunnableConfig) -> RouterState:
+    """LangGraph node that asks the router model to pick an agent.
+
+    Args:
+        state: Current graph state containing the conversation messages and
+            the uncertain rule-based ``route``
+        config: Configuration for the runnable, including the router model
+
+    Returns:
+        Dictionary with state update, including the final ``route`` decision
+    """
+    configurable = RouterConfiguration.from_runnable_config(config)
+    llm = get_chat_model(configurable.router_model, 0.0)
+    conversation = "\n".join(
+        f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}"
+        for message in state["messages"][-4:]
+    )
+    choice = structured_output(llm, RouteChoice).invoke(
+        router_instructions.format(conversation=conversation)
+    )
+    route = state["route"]
+    decision = RouteDecision(
+        choice.agent, "model", route["confidence"], route["scores"], choice.reason
+    )
+    return _finish(decision, config)
+
+
+def needs_model(state: RouterState) -> str:
+    """LangGraph routing function that sends uncertain routes to the router model."""
+    route = state["route"]
+    return "classify_with_model" if route["method"] == "uncertain" else route["agent"]
+
+
+def select_agent(state: RouterState) -> str:
+    """LangGraph routing function that sends the conversation to the chosen agent."""
+    return state["route"]["agent"]
+
+
+def _agent_graph(name: str) -> Any:
+    try:
+        return get_graph(name)
+    except GraphUnavailableError as e:
+        logger.warning(f"{e}; falling back to the chatbot")
+        return get_graph("chatbot")
+
+
+def _new_messages(state: RouterState, result: Dict[str, Any]) -> RouterState:
+    known = {message.id for message in state["messages"]}
+    return {
+        "messages": [
+            message for message in result["messages"] if message.id not in known
+        ]
+    }
+
+
+def make_agent_node(name: str) -> RunnableLambda:
+    """Build a node that runs the ``name`` graph as a subgraph of the router.
+
+    The node runs the subgraph with ``ainvoke`` when the router is run
+    asynchronously, as the server does: the MCP agent's tools are coroutines
+    and cannot be called from a synchronous run.
+    """
+
+    def run_agent(state: RouterState, config: RunnableConfig) -> RouterState:
+        graph = _agent_graph(name)
+        return _new_messages(
+            state, graph.invoke({"messages": state["messages"]}, config)
+        )
+
+    async def arun_agent(state: RouterState, config: RunnableConfig) -> RouterState:
+        # Loading a graph imports its module, so keep it off the event loop
+        graph = await asyncio.to_thread(_agent_graph, name)
+        result = await graph.ainvoke({"messages": state["messages"]}, config)
+        return _new_messages(state, result)
+
+    for func in (run_agent, arun_agent):
+        func.__name__ = name
+        func.__doc__ = f"LangGraph node that answers with the {name} graph."
+    return RunnableLambda(
+        instrument_node(run_agent), afunc=instrument_node(arun_agent), name=name
+    )
+
+
+# Create the Router Graph
+builder = StateGraph(RouterState, config_schema=RouterConfiguration)
+
+builder.add_node(
+    "compact_history",
+    instrument_node(make_compact_history_node(RouterConfiguration, "router_model")),
+)
+builder.add_node("route_request", instrument_node(route_request))
+builder.add_node(
+    "classify_with_model", scheduled(instrument_node(classify_with_model), INTERACTIVE)
+)
+# The agents' own model nodes take scheduler slots
+for agent in ROUTES:
+    builder.add_node(agent, make_agent_node(agent))
+
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "route_request")
+builder.add_conditional_edges(
+    "route_request", needs_model, ["classify_with_model", *ROUTES]
+)
+builder.add_conditional_edges("classify_with_model", select_agent, list(ROUTES))
+for agent in ROUTES:
+    builder.add_edge(agent, END)
+
+router_graph = instrument_graph(builder.compile(name="router"))
@@ -0,0 +1,158 @@
+"""Local classification of incoming messages for the router graph.
+
+:func:`classify_message` scores the latest user message for each agent with
+keyword and regex features. It is free and deterministic; the router only asks
+a small model when the best two scores are too close to call and
+``router_model_fallback`` is on.
+
+A message starting with ``/research``, ``/chat``, ``/math`` or ``/mcp`` forces
+the agent, as does the ``router_force_agent`` configurable.
+
+Every decision is counted in ``router_decisions_total`` by ``route`` and
+``method`` (``override``, ``rules``, ``model``), and the model calls saved
+against sending the message to the deep researcher in
+``router_saved_calls_total`` (``GET /metrics``).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict
+
+from telemetry import get_metrics
+
+ROUTES = ("deep_researcher", "chatbot", "math_agent", "mcp_agent")
+
+COMMANDS = {
+    "/research": "deep_researcher",
+    "/chat": "chatbot",
+    "/math": "math_agent",
+    "/mcp": "mcp_agent",
+}
+
+# Rough model calls of one turn per agent; the deep researcher adds one search
+# per initial query
+ESTIMATED_CALLS = {
+    "deep_researcher": 3,
+    "chatbot": 1,
+    "math_agent": 2,
+    "mcp_agent": 2,
+}
+
+_ARITHMETIC = re.compile(r"\d\s*(?:[-+*/^%×÷]|\*\*)\s*\(?\s*[\d.]")
+_MATH_WORDS = re.compile(
+    r"\b(?:calculate|compute|evaluate|solve|sqrt|square root|cube root|factorial|"
+    r"derivative|integral|logarithm|log|sin|cos|tan|percent(?:age)? of|"
+    r"how much is|what is \d+|sum of|product of|divided by|times|plus|minus|"
+    r"power|squared|cubed|equation|multiply|divide)\b",
+    re.IGNORECASE,
+)
+_FILE_WORDS = re.compile(
+    r"\b(?:files?|folders?|director(?:y|ies)|path|read|write|open|save|list|"
+    r"workspace|repo(?:sitory)?|brave)\b|\.(?:txt|md|py|json|csv|yaml|yml)\b|[~/]\w+/",
+    re.IGNORECASE,
+)
+_RESEARCH_WORDS = re.compile(
+    r"\b(?:research|latest|recent|current|today|news|compare|comparison|versus|vs\.?|"
+    r"trends?|statistics|market|report|analy[sz]e|analysis|sources?|citations?|"
+    r"evidence|who won|how many|how much did|how fast|forecast|grow(?:th|n)?|grew|"
+    r"fall|fell|rise|rose|released?|announced|prices?|revenue|sales|stocks?|"
+    r"last year|this year|elections?|olympics|medals?)\b",
+    re.IGNORECASE,
+)
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+_CHAT_WORDS = re.compile(
+    r"^\s*(?:hi|hello|hey|thanks|thank you|good (?:morning|evening|night)|"
+    r"how are you|who are you|what can you do|tell me a joke|bye)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RouteDecision:
+    """The agent chosen for a message and why."""
+
+    route: str
+    method: str
+    confidence: float
+    scores: Dict[str, float]
+    reason: str = ""
+
+
+def parse_command(text: str) -> str | None:
+    """Return the agent forced by a leading slash command, if any."""
+    word = text.strip().split(maxsplit=1)[0].lower() if text.strip() else ""
+    return COMMANDS.get(word)
+
+
+def strip_command(text: str) -> str:
+    """Return ``text`` without its leading slash command."""
+    if parse_command(text) is None:
+        return text
+    parts = text.strip().split(maxsplit=1)
+    return parts[1] if len(parts) > 1 else ""
+
+
+def score_message(text: str) -> Dict[str, float]:
+    """Score how well each agent fits ``text``, each between 0 and 1."""
+    words = len(text.split())
+    math = 0.0
+    if _ARITHMETIC.search(text):
+        math += 0.6
+    math += 0.3 * min(2, len(_MATH_WORDS.findall(text)))
+    mcp = 0.3 * min(3, len(_FILE_WORDS.findall(text)))
+    research = 0.2 * min(4, len(_RESEARCH_WORDS.findall(text)))
+    if _YEAR.search(text):
+        research += 0.2
+    if words > 25:
+        research += 0.2
+    chat = 0.3
+    if _CHAT_WORDS.search(text):
+        chat += 0.6
+    if words <= 6:
+        chat += 0.1
+    return {
+        "deep_researcher": round(min(1.0, research), 4),
+        "chatbot": round(min(1.0, chat), 4),
+        "math_agent": round(min(1.0, math), 4),
+        "mcp_agent": round(min(1.0, mcp), 4),
+    }
+
+
+def classify_message(text: str) -> RouteDecision:
+    """Pick an agent for ``text`` from its keyword and regex features.
+
+    The confidence is the margin between the best and second-best scores.
+    """
+    command = parse_command(text)
+    if command is not None:
+        return RouteDecision(command, "override", 1.0, {}, "slash command")
+    scores = score_message(text)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (route, best), (_, second) = ranked[0], ranked[1]
+    return RouteDecision(
+        route, "rules", round(best - second, 4), scores, f"highest score {best:.2f}"
+    )
+
+
+def estimated_calls(route: str, initial_queries: int = 3) -> int:
+    """Return the estimated model calls and searches of one turn of ``route``."""
+    calls = ESTIMATED_CALLS.get(route, 1)
+    return calls + initial_queries if route == "deep_researcher" else calls
+
+
+def record_route(decision: RouteDecision, initial_queries: int = 3) -> int:
+    """Count a routing decision; return the calls saved against deep research."""
+    saved = max(
+        0,
+        estimated_calls("deep_researcher", initial_queries)
+        - estimated_calls(decision.route, initial_queries),
+    )
+    metrics = get_metrics()
+    metrics.counter(
+        "router_decisions_total", "Router decisions by route and method"
+    ).inc(route=decision.route, method=decision.method)
+    metrics.counter(
+        "router_saved_calls_total",
+        "Estimated model calls and searches saved against deep research",
+    ).inc(saved, route=decision.route)
+    return saved
@@ -0,0 +1,264 @@
+"""Priority- and fairness-aware admission of model-calling node executions.
+
+Interactive graphs (``chatbot``, ``math_agent``, ``mcp_agent``) share the
+Gemini quota with research graphs whose fan-out can issue dozens of calls at
+once. Nodes wrapped with :func:`scheduled` take a slot of the process-wide
+:class:`Scheduler` before they run:
+
+* at most ``SCHEDULER_MAX_CONCURRENCY`` scheduled nodes run at the same time
+  (0, the default, admits everything immediately);
+* at most ``SCHEDULER_TENANT_LIMIT`` of them per tenant, the ``tenant_id``
+  configurable or else the ``thread_id`` (0 for no limit);
+* at most ``SCHEDULER_CLASS_LIMITS`` of them per priority class, which keeps
+  slots free for interactive turns when research saturates the rest;
+* waiting executions are admitted by weighted fair queuing over
+  (priority class, tenant) flows, with the class weights of
+  ``SCHEDULER_WEIGHTS``. Interactive turns get most of the slots during a
+  research burst without starving research.
+
+A run's priority class comes from its graph, or from the ``priority``
+configurable. Metrics at ``GET /metrics``: ``scheduler_queue_depth`` and
+``scheduler_running`` gauges and the ``scheduler_wait_seconds`` histogram, by
+priority class.
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from langgraph.config import get_config
+
+from telemetry import get_metrics
+
+INTERACTIVE = "interactive"
+RESEARCH = "research"
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 8.0, RESEARCH: 1.0}
+
+_WAIT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+@dataclass
+class _Waiter:
+    priority: str
+    tenant: str
+    start_tag: float
+    finish_tag: float
+    seq: int
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class Scheduler:
+    """Admission control with priority classes, tenant caps and fair queuing.
+
+    Args:
+        max_concurrency: Slots shared by every scheduled execution; 0 or less
+            admits everything immediately
+        weights: Share of the slots per priority class under contention
+        tenant_limit: Slots a single tenant may hold at once; 0 for no limit
+        class_limits: Slots each priority class may hold at once
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        weights: Dict[str, float] | None = None,
+        tenant_limit: int = 0,
+        class_limits: Dict[str, int] | None = None,
+    ):
+        """Create a scheduler; ``max_concurrency`` 0 admits every call at once."""
+        self.max_concurrency = max_concurrency
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.tenant_limit = tenant_limit
+        self.class_limits = dict(class_limits or {})
+        self._cond = threading.Condition()
+        self._waiters: List[_Waiter] = []
+        self._running = 0
+        self._running_by_tenant: Dict[str, int] = {}
+        self._running_by_class: Dict[str, int] = {}
+        # Weighted fair queuing state: last finish tag per flow and virtual time
+        self._flow_finish: Dict[Tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether calls are admitted through the slots."""
+        return self.max_concurrency > 0
+
+    def _eligible(self, waiter: _Waiter) -> bool:
+        if (
+            self.tenant_limit
+            and self._running_by_tenant.get(waiter.tenant, 0) >= self.tenant_limit
+        ):
+            return False
+        limit = self.class_limits.get(waiter.priority)
+        return limit is None or self._running_by_class.get(waiter.priority, 0) < limit
+
+    def _next(self) -> _Waiter | None:
+        """Return the waiter to admit next, if a slot is free."""
+        if self._running >= self.max_concurrency:
+            return None
+        candidates = [w for w in self._waiters if self._eligible(w)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (w.finish_tag, w.seq))
+
+    @contextmanager
+    def slot(self, priority: str = RESEARCH, tenant: str = "default") -> Iterator[None]:
+        """Hold a slot for the duration of the ``with`` block."""
+        if not self.enabled:
+            yield
+            return
+
+        metrics = get_metrics()
+        depth = metrics.gauge("scheduler_queue_depth", "Executions waiting for a slot")
+        running = metrics.gauge("scheduler_running", "Executions holding a slot")
+        with self._cond:
+            flow = (priority, tenant)
+            start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+            finish = start + 1.0 / self.weights.get(priority, 1.0)
+            self._flow_finish[flow] = finish
+            waiter = _Waiter(priority, tenant, start, finish, next(self._seq))
+            self._waiters.append(waiter)
+            depth.inc(priority=priority)
+            while self._next() is not waiter:
+                self._cond.wait()
+            self._waiters.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._running += 1
+            self._running_by_tenant[tenant] = self._running_by_tenant.get(tenant, 0) + 1
+            self._running_by_class[priority] = (
+                self._running_by_class.get(priority, 0) + 1
+            )
+            depth.dec(priority=priority)
+            running.inc(priority=priority)
+            # Another slot may still be free for the next waiter
+            self._cond.notify_all()
+        metrics.histogram(
+            "scheduler_wait_seconds",
+            "Time executions waited for a scheduler slot",
+            buckets=_WAIT_BUCKETS,
+        ).observe(time.perf_counter() - waiter.enqueued_at, priority=priority)
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._running_by_tenant[tenant] -= 1
+                if not self._running_by_tenant[tenant]:
+                    del self._running_by_tenant[tenant]
+                self._running_by_class[priority] -= 1
+                if not self._waiters:
+                    self._flow_finish.clear()
+                running.dec(priority=priority)
+                self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the running and waiting executions per priority class."""
+        with self._cond:
+            waiting: Dict[str, int] = {}
+            for waiter in self._waiters:
+                waiting[waiter.priority] = waiting.get(waiter.priority, 0) + 1
+            return {
+                "max_concurrency": self.max_concurrency,
+                "running": self._running,
+                "waiting": waiting,
+            }
+
+
+def create_scheduler(
+    max_concurrency: int | None = None,
+    weights: Dict[str, float] | None = None,
+    tenant_limit: int | None = None,
+    class_limits: Dict[str, int] | None = None,
+) -> Scheduler:
+    """Create a scheduler, configured from the environment by default.
+
+    Args:
+        max_concurrency: Shared slots (``SCHEDULER_MAX_CONCURRENCY``, default 0)
+        weights: Priority class weights (``SCHEDULER_WEIGHTS`` as JSON, default
+            ``{"interactive": 8, "research": 1}``)
+        tenant_limit: Slots per tenant (``SCHEDULER_TENANT_LIMIT``, default 0)
+        class_limits: Slots per priority class (``SCHEDULER_CLASS_LIMITS`` as
+            JSON, default no limits)
+    """
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("SCHEDULER_MAX_CONCURRENCY", "0"))
+    if weights is None:
+        weights = json.loads(os.getenv("SCHEDULER_WEIGHTS") or "{}")
+    if tenant_limit is None:
+        tenant_limit = int(os.getenv("SCHEDULER_TENANT_LIMIT", "0"))
+    if class_limits is None:
+        class_limits = json.loads(os.getenv("SCHEDULER_CLASS_LIMITS") or "{}")
+    return Scheduler(max_concurrency, weights, tenant_limit, class_limits)
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = create_scheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler: Scheduler) -> None:
+    """Replace the process-wide scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def scheduled(func: Callable[..., Any], priority: str) -> Callable[..., Any]:
+    """Wrap a node function so that it runs in a slot of the scheduler.
+
+    Args:
+        func: The node function
+        priority: Default priority class of the node, overridden by the
+            ``priority`` configurable
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        scheduler = get_scheduler()
+        if not scheduler.enabled:
+            return func(*args, **kwargs)
+        try:
+            configurable = get_config().get("configurable") or {}
+        except RuntimeError:
+            # Called outside of a graph run
+            configurable = {}
+        tenant = str(
+            configurable.get("tenant_id") or configurable.get("thread_id") or "default"
+        )
+        with scheduler.slot(configurable.get("priority") or priority, tenant):
+            return func(*args, **kwargs)
+
+    return wrapper
@@ -7,6 +7,8 @@ from typing import TypedDict
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
+from agent.compaction import add_messages_with_compaction
+
 
 class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
@@ -17,18 +19,51 @@ class OverallState(TypedDict):
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    deadline_at: float
+    dropped_research: Annotated[list, operator.add]
+    deadline_report: dict
+    research_errors: Annotated[list, operator.add]
+    query_list: list
+    knowledge_store: dict
 
 
 class ChatbotState(TypedDict):
     """State for basic chatbot functionality."""
 
-    messages: Annotated[list, add_messages]
+    messages: Annotated[list, add_messages_with_compaction]
 
 
 class MathAgentState(TypedDict):
     """State for math agent functionality."""
 
-    messages: Annotated[list, add_messages]
+    messages: Annotated[list, add_messages_with_compaction]
+
+
+class RouterState(TypedDict):
+    """State for the front-door router."""
+
+    messages: Annotated[list, add_messages_with_compaction]
+    route: dict
+
+
+class BatchResearchState(TypedDict):
+    """State for researching several questions in one run."""
+
+    questions: list[str]
+    question_queries: list[list[str]]
+    searches: list[dict]
+    search_results: Annotated[list, operator.add]
+    answers: list[dict]
+    # Questions whose planning or answer failed, without failing the batch
+    question_errors: Annotated[list, operator.add]
+
+
+class BatchSearchState(TypedDict):
+    """State of one deduplicated search of a batch."""
+
+    search_query: str
+    id: int
+    key: str
 
 
 class ReflectionState(TypedDict):
@@ -37,6 +72,9 @@ class ReflectionState(TypedDict):
     follow_up_queries: Annotated[list, operator.add]
     research_loop_count: int
     number_of_ran_queries: int
+    # Read by evaluate_research, whose state is limited to this schema
+    max_research_loops: int
+    deadline_at: float
 
 
 class Query(TypedDict):
@@ -51,6 +89,7 @@ class QueryGenerationState(TypedDict):
 class WebSearchState(TypedDict):
     search_query: str
     id: str
+    deadline_at: float
 
 
 @dataclass(kw_only=True)
@@ -0,0 +1,361 @@
+"""Structured model outputs with local repair before any re-request.
+
+``with_structured_output`` fails on the small mistakes models make in JSON:
+a trailing comma (as in the example of ``query_writer_instructions``), a
+fenced code block, a missing ``rationale``, a single query instead of a list.
+:func:`structured_output` parses the raw response itself when LangChain's
+parser gives up:
+
+1. the arguments of the schema's tool call, of a malformed tool call, or the
+   JSON in the text of the response are repaired (:func:`repair_json`):
+   fences and surrounding prose, comments, trailing commas, single quotes,
+   unquoted keys, Python literals and truncated output;
+2. the values are coerced to the schema (:func:`coerce_to_schema`): missing
+   text fields default to empty, a string becomes a one-item list, ``"true"``
+   a boolean, ``"Math"`` the ``math_agent`` choice;
+3. only an output that still does not validate is requested again, with the
+   parse error appended to the prompt, up to ``retries`` times. That includes
+   a missing or empty list of queries, which the schemas reject.
+
+Counters at ``GET /metrics``: ``structured_output_total`` by ``schema`` and
+``outcome`` (``valid``, ``repaired``, ``failed``), and
+``structured_output_retries_total`` by ``schema``.
+"""
+
+import json
+import logging
+import re
+import typing
+from typing import Any, Dict, List, Tuple, Type
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import (
+    Runnable,
+    RunnableConfig,
+    RunnableLambda,
+    RunnableSequence,
+)
+from pydantic import BaseModel, ValidationError
+
+from telemetry import get_metrics
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_TRUE = {"true", "yes", "y", "1"}
+_FALSE = {"false", "no", "n", "0"}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a structured output can neither be parsed nor repaired."""
+
+
+def _extract(text: str) -> str:
+    """Return the JSON part of a response: inside a fence, from the first bracket."""
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        raise StructuredOutputError("No JSON object in the response")
+    return text[min(starts) :].translate(_SMART_QUOTES)
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index]
+
+
+def repair_json(text: str) -> Any:
+    """Parse the first JSON value in ``text``, repairing common mistakes.
+
+    Raises:
+        StructuredOutputError: If the value cannot be repaired
+    """
+    try:
+        return json.loads(text)
+    except (TypeError, json.JSONDecodeError):
+        pass
+    text = _extract(text)
+    out: List[str] = []
+    closers: List[str] = []
+    quote: str | None = None
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if quote is not None:
+            if c == "\\" and i + 1 < n:
+                # JSON has no \' escape
+                out.append("'" if text[i + 1] == "'" else text[i : i + 2])
+                i += 2
+                continue
+            if c == quote:
+                out.append('"')
+                quote = None
+            elif c == '"':
+                out.append('\\"')
+            elif c == "\n":
+                out.append("\\n")
+            else:
+                out.append(c)
+            i += 1
+            continue
+        if c in "\"'":
+            quote = c
+            out.append('"')
+        elif c in "{[":
+            closers.append("}" if c == "{" else "]")
+            out.append(c)
+        elif c in "}]":
+            _drop_trailing_comma(out)
+            out.append(closers.pop() if closers else c)
+            if not closers:
+                break
+        elif text.startswith("//", i) or c == "#":
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        elif c.isalpha() or c == "_":
+            word = _WORD.match(text, i).group(0)
+            rest = text[i + len(word) :].lstrip()
+            if rest.startswith(":"):
+                out.append(json.dumps(word))
+            else:
+                out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(c)
+        i += 1
+    # Truncated output: close the open string and brackets
+    if quote is not None:
+        out.append('"')
+    while closers:
+        _drop_trailing_comma(out)
+        out.append(closers.pop())
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Unrepairable JSON: {e}") from e
+
+
+def _coerce_value(annotation: Any, value: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        (item,) = typing.get_args(annotation) or (Any,)
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        return [_coerce_value(item, element) for element in value]
+    if origin is typing.Literal:
+        choices = typing.get_args(annotation)
+        if value in choices or not isinstance(value, str):
+            return value
+        wanted = value.strip().lower().replace(" ", "_").replace("-", "_")
+        matches = [choice for choice in choices if str(choice).lower() == wanted]
+        if not matches:
+            matches = [
+                choice for choice in choices if wanted and wanted in str(choice).lower()
+            ]
+        return matches[0] if len(matches) == 1 else value
+    if annotation is str:
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return "; ".join(str(element) for element in value)
+        return value if isinstance(value, str) else json.dumps(value)
+    if annotation is bool and isinstance(value, str):
+        word = value.strip().lower()
+        return True if word in _TRUE else False if word in _FALSE else value
+    return value
+
+
+def _empty_value(annotation: Any) -> Any:
+    """Return the value of a missing field, or ``...`` if it cannot be guessed.
+
+    Only free text defaults to empty: a missing list is more likely the sign
+    of a truncated or wrong answer than an empty one, and is requested again.
+    """
+    return "" if annotation is str else ...
+
+
+def coerce_to_schema(schema: Type[BaseModel], data: Any) -> BaseModel:
+    """Validate ``data`` against ``schema`` after coercing it field by field.
+
+    Raises:
+        StructuredOutputError: If the coerced data is still invalid
+    """
+    fields = schema.model_fields
+    if isinstance(data, dict) and set(data) == {schema.__name__}:
+        data = data[schema.__name__]
+    if isinstance(data, list):
+        # A bare list answers a schema with a single list field
+        list_fields = [
+            name
+            for name, field in fields.items()
+            if typing.get_origin(field.annotation) in (list, List)
+        ]
+        if len(list_fields) == 1:
+            data = {list_fields[0]: data}
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"Expected an object, got {type(data).__name__}")
+
+    keys = {str(key).strip().lower(): key for key in data}
+    values: Dict[str, Any] = {}
+    for name, field in fields.items():
+        key = name if name in data else keys.get(name.lower())
+        if key is not None:
+            values[name] = _coerce_value(field.annotation, data[key])
+        elif field.is_required():
+            value = _empty_value(field.annotation)
+            if value is not ...:
+                values[name] = value
+    try:
+        return schema.model_validate(values)
+    except ValidationError as e:
+        raise StructuredOutputError(
+            f"Invalid {schema.__name__}: {e.error_count()} errors"
+        ) from e
+
+
+def repair_output(schema: Type[BaseModel], raw: BaseMessage) -> BaseModel:
+    """Recover an instance of ``schema`` from a raw model response.
+
+    The arguments of the schema's tool call come first, then the arguments of
+    malformed tool calls, then the text of the response.
+
+    Raises:
+        StructuredOutputError: If no candidate can be repaired
+    """
+    candidates: List[Any] = []
+    if isinstance(raw, AIMessage):
+        candidates += [
+            call["args"] for call in raw.tool_calls if call["name"] == schema.__name__
+        ]
+        candidates += [call.get("args") or "" for call in raw.invalid_tool_calls]
+    if isinstance(raw.content, str):
+        candidates.append(raw.content)
+    else:
+        candidates.append(
+            "".join(
+                part if isinstance(part, str) else str(part.get("text", ""))
+                for part in raw.content
+            )
+        )
+    error: Exception = StructuredOutputError("Empty response")
+    for candidate in candidates:
+        try:
+            data = repair_json(candidate) if isinstance(candidate, str) else candidate
+            return coerce_to_schema(schema, data)
+        except StructuredOutputError as e:
+            error = e
+    raise error
+
+
+def _retry_input(input: Any, error: str) -> Any:
+    """Append the parse error of the last response to the prompt."""
+    note = (
+        f"Your previous answer could not be parsed ({error}). Answer again with "
+        "only the requested structured output."
+    )
+    if isinstance(input, str):
+        return f"{input}\n\n{note}"
+    if isinstance(input, list):
+        return [*input, HumanMessage(content=note)]
+    return input
+
+
+def _settle(
+    schema: Type[BaseModel], parser: Runnable, raw: BaseMessage
+) -> Tuple[BaseModel | None, str, str]:
+    """Return the parsed response, how it was obtained and the last error."""
+    try:
+        parsed = parser.invoke(raw)
+        if parsed is not None:
+            return parsed, "valid", ""
+    except Exception:
+        pass
+    try:
+        return repair_output(schema, raw), "repaired", ""
+    except StructuredOutputError as e:
+        return None, "failed", str(e)
+
+
+def _record(schema: Type[BaseModel], outcome: str, attempt: int) -> None:
+    metrics = get_metrics()
+    metrics.counter(
+        "structured_output_total", "Structured outputs by schema and outcome"
+    ).inc(schema=schema.__name__, outcome=outcome)
+    if attempt:
+        metrics.counter(
+            "structured_output_retries_total",
+            "Structured outputs requested again after a failed repair",
+        ).inc(attempt, schema=schema.__name__)
+
+
+def structured_output(
+    llm: BaseChatModel, schema: Type[BaseModel], retries: int = 1
+) -> Runnable:
+    """Return ``llm.with_structured_output(schema)`` with local repair.
+
+    Args:
+        llm: The chat model
+        schema: Pydantic model of the output
+        retries: Requests made again when an output cannot be repaired
+
+    Returns:
+        A runnable returning instances of ``schema``
+
+    Raises:
+        StructuredOutputError: From the runnable, if no response could be
+            parsed
+    """
+    # The integration's own binding (tools or a JSON schema) and parser,
+    # called one after the other so that the raw response stays available
+    chain = llm.with_structured_output(schema)
+    if not isinstance(chain, RunnableSequence):
+        raise TypeError(f"Unexpected structured output runnable {type(chain).__name__}")
+    model = (
+        chain.first if len(chain.steps) == 2 else RunnableSequence(*chain.steps[:-1])
+    )
+    parser = chain.last
+
+    def invoke(input: Any, config: RunnableConfig) -> BaseModel:
+        for attempt in range(retries + 1):
+            parsed, outcome, error = _settle(
+                schema, parser, model.invoke(input, config)
+            )
+            if parsed is not None:
+                _record(schema, outcome, attempt)
+                return parsed
+            logger.warning(f"Unparseable {schema.__name__} output: {error}")
+            input = _retry_input(input, error)
+        _record(schema, "failed", retries)
+        raise StructuredOutputError(f"No valid {schema.__name__} output: {error}")
+
+    async def ainvoke(input: Any, config: RunnableConfig) -> BaseModel:
+        for attempt in range(retries + 1):
+            parsed, outcome, error = _settle(
+                schema, parser, await model.ainvoke(input, config)
+            )
+            if parsed is not None:
+                _record(schema, outcome, attempt)
+                return parsed
+            logger.warning(f"Unparseable {schema.__name__} output: {error}")
+            input = _retry_input(input, error)
+        _record(schema, "failed", retries)
+        raise StructuredOutputError(f"No valid {schema.__name__} output: {error}")
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"{schema.__name__}Output")
@@ -0,0 +1,145 @@
+"""Local coverage scoring used to skip the LLM reflection when research is enough.
+
+The score compares the key terms and entities of the user's question with the
+gathered ``web_research_result`` summaries and rewards densely cited
+summaries. It is cheap and deterministic; ``reflection`` skips the reasoning
+model when the score reaches ``reflection_skip_threshold``. The threshold is
+off (above 1.0) by default, in every profile, and opted into per run: the
+score exceeds 0.9 for nearly every run, so it does not tell sufficient
+research apart yet.
+
+Every reflection records its outcome and coverage score in the
+``reflection_total`` counter and ``reflection_coverage_score`` histogram
+(``GET /metrics``). Comparing the scores of ``llm_sufficient`` and
+``llm_insufficient`` outcomes shows where the threshold can safely go.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from langchain_core.messages import AnyMessage, HumanMessage
+
+from telemetry import get_metrics
+
+_STOPWORDS = frozenset(
+    """a about above after again against all am an and any are as at be because
+    been before being below between both but by can could did do does doing down
+    during each few for from further had has have having how i if in into is it
+    its itself just last let me more most my no nor not now of off on once only or
+    other our out over own same should so some such than that the their them then
+    there these they this those through to too under until up very was we were
+    what when where which while who whom why will with would you your yes tell
+    explain describe give show find know much many""".split()
+)
+
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'\-]*")
+_CITATION = re.compile(r"\]\(https?://")
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
+# Citations per sentence at which the citation component saturates
+_TARGET_CITATION_DENSITY = 0.5
+
+_SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0)
+
+
+@dataclass
+class CoverageReport:
+    """Components of the coverage score, each between 0 and 1."""
+
+    score: float
+    term_coverage: float
+    entity_coverage: float
+    citation_density: float
+
+
+def _stem(word: str) -> str:
+    word = word.lower().rstrip("'")
+    if len(word) > 3 and word.endswith("s"):
+        word = word[:-1]
+    return word[:5]
+
+
+def key_terms(text: str) -> List[str]:
+    """Return the stemmed content words of ``text``."""
+    terms = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if len(lowered) < 3 or lowered in _STOPWORDS:
+            continue
+        stem = _stem(lowered)
+        if stem not in terms:
+            terms.append(stem)
+    return terms
+
+
+def entities(text: str) -> List[str]:
+    """Return capitalized words and numbers of ``text`` (names, places, years)."""
+    found = []
+    for idx, word in enumerate(_WORD.findall(text)):
+        is_number = any(char.isdigit() for char in word)
+        is_name = word[0].isupper() and (idx > 0 or word.lower() not in _STOPWORDS)
+        if (is_number or is_name) and word.lower() not in _STOPWORDS:
+            if word.lower() not in found:
+                found.append(word.lower())
+    return found
+
+
+def latest_question(messages: Sequence[AnyMessage]) -> str:
+    """Return the content of the last user message."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return str(message.content)
+    return str(messages[-1].content) if messages else ""
+
+
+def score_coverage(question: str, summaries: Sequence[str]) -> CoverageReport:
+    """Score how well ``summaries`` cover ``question``.
+
+    The score weights key-term coverage (0.5), entity coverage (0.3) and
+    citation density (0.2). Without entities in the question, term coverage
+    takes their weight.
+    """
+    text = "\n".join(summaries)
+    if not text.strip():
+        return CoverageReport(0.0, 0.0, 0.0, 0.0)
+
+    summary_stems = {_stem(word) for word in _WORD.findall(text)}
+    lowered = text.lower()
+
+    terms = key_terms(question)
+    term_coverage = (
+        sum(1 for term in terms if term in summary_stems) / len(terms) if terms else 1.0
+    )
+    names = entities(question)
+    entity_coverage = (
+        sum(1 for name in names if name in lowered) / len(names) if names else 1.0
+    )
+    sentences = max(1, len(_SENTENCE_END.findall(text)))
+    citation_density = min(
+        1.0, len(_CITATION.findall(text)) / sentences / _TARGET_CITATION_DENSITY
+    )
+
+    if names:
+        score = 0.5 * term_coverage + 0.3 * entity_coverage + 0.2 * citation_density
+    else:
+        score = 0.8 * term_coverage + 0.2 * citation_density
+    return CoverageReport(
+        score=round(score, 4),
+        term_coverage=round(term_coverage, 4),
+        entity_coverage=round(entity_coverage, 4),
+        citation_density=round(citation_density, 4),
+    )
+
+
+def record_reflection(outcome: str, score: float) -> None:
+    """Record a reflection outcome (``skipped``, ``llm_sufficient``, ``llm_insufficient``)."""
+    metrics = get_metrics()
+    metrics.counter("reflection_total", "Reflection decisions by outcome").inc(
+        outcome=outcome
+    )
+    metrics.histogram(
+        "reflection_coverage_score",
+        "Local coverage score of the research at reflection time, by outcome",
+        buckets=_SCORE_BUCKETS,
+    ).observe(score, outcome=outcome)
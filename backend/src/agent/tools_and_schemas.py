@@ -1,11 +1,14 @@
-from typing import List
+"""Schemas of the structured outputs the agents ask the models for."""
 
-from pydantic import BaseModel, Field
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, model_validator
 
 
 class SearchQueryList(BaseModel):
     query: List[str] = Field(
-        description="A list of search queries to be used for web research."
+        min_length=1,
+        description="A list of search queries to be used for web research.",
     )
     rationale: str = Field(
         description="A brief explanation of why these queries are relevant to the research topic."
@@ -20,5 +23,23 @@ class Reflection(BaseModel):
         description="A description of what information is missing or needs clarification."
     )
     follow_up_queries: List[str] = Field(
-        description="A list of follow-up queries to address the knowledge gap."
+        default_factory=list,
+        description="A list of follow-up queries to address the knowledge gap.",
+    )
+
+    @model_validator(mode="after")
+    def _check_follow_up_queries(self) -> "Reflection":
+        if not self.is_sufficient and not self.follow_up_queries:
+            raise ValueError(
+                "follow_up_queries is required when is_sufficient is false"
+            )
+        return self
+
+
+class RouteChoice(BaseModel):
+    """The router's choice of agent for the latest message."""
+
+    agent: Literal["deep_researcher", "chatbot", "math_agent", "mcp_agent"] = Field(
+        description="The agent best suited to answer the user's latest message."
     )
+    reason: str = Field(description="A short explanation of the choice.")
@@ -1,4 +1,7 @@
-from typing import Any, Dict, List
+"""Helpers for messages, citations and search queries."""
+
+import re
+from typing import Any, Dict, List, Tuple
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
 
@@ -23,7 +26,7 @@ def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
     Ensures each original URL gets a consistent shortened form while maintaining uniqueness.
     """
     prefix = "https://vertexaisearch.cloud.google.com/id/"
-    urls = [site.web.uri for site in urls_to_resolve]
+    urls = [site.web.uri for site in urls_to_resolve or [] if site.web]
 
     # Create a dictionary that maps each unique URL to its first occurrence index
     resolved_map = {}
@@ -115,7 +118,7 @@ def get_citations(response, resolved_urls_map):
     ):
         return citations
 
-    for support in candidate.grounding_metadata.grounding_supports:
+    for support in candidate.grounding_metadata.grounding_supports or []:
         citation = {}
 
         # Ensure segment information is present
@@ -153,10 +156,34 @@ def get_citations(response, resolved_urls_map):
                             "value": chunk.web.uri,
                         }
                     )
-                except (IndexError, AttributeError, NameError):
+                except (IndexError, AttributeError, NameError, TypeError):
                     # Handle cases where chunk, web, uri, or resolved_map might be problematic
                     # For simplicity, we'll just skip adding this particular segment link
                     # In a production system, you might want to log this.
                     pass
         citations.append(citation)
     return citations
+
+
+def restore_short_urls(
+    text: str, sources_gathered: List[Dict[str, Any]]
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Replace the short urls in a generated answer with the original urls.
+
+    Returns:
+        The text with original urls and the sources that were cited in it
+    """
+    unique_sources = []
+    for source in sources_gathered:
+        if source["short_url"] in text:
+            text = text.replace(source["short_url"], source["value"])
+            unique_sources.append(source)
+    return text, unique_sources
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so that reworded duplicates compare equal.
+
+    Case, punctuation, word order and repeated words are ignored.
+    """
+    return " ".join(sorted(set(re.findall(r"\w+", query.casefold()))))
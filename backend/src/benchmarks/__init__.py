@@ -0,0 +1 @@
+"""Offline benchmarks of the agent graphs against fake Gemini clients."""
@@ -0,0 +1,408 @@
+r"""Offline tuning of the deep researcher configuration.
+
+Replays the fixture research questions through ``deep_researcher`` with the
+fake Gemini clients for every configuration of a search space, and scores
+each configuration on
+
+* latency: mean wall time of a run over ``--repeats`` runs per question.
+  The fake models sleep according to ``--latency``, scaled by the relative
+  speed of the model they stand in for (``MODEL_SPEED``), so slower models
+  cost latency;
+* tokens: mean input plus output tokens of the chat-model calls of a run,
+  and their estimated cost (:func:`agent.cascade.estimate_cost`), which
+  tells the models apart;
+* quality: the mean of the research coverage of the question
+  (:func:`agent.sufficiency.score_coverage`), the share of answer sentences
+  citing a source and the share of the reference answer's key terms found in
+  the answer (fixture ``references``).
+
+The Pareto-optimal configurations, those no other configuration beats on one
+objective without losing on another, are written to ``--output-dir`` as
+``pareto-NN.json`` (``{"configurable": ...}`` for a run config or an
+assistant) and ``pareto-NN.env`` (environment variables), fastest first.
+Latencies within ``--latency-tolerance`` of each other count as equal, so
+that sampling noise alone does not put a configuration on the front::
+
+    python -m benchmarks.autotune --output-dir tuned
+    python -m benchmarks.autotune --search random --samples 24 \\
+        --set number_of_initial_queries=1,3,5 --set max_research_loops=1,2,3
+
+With the recorded fixtures the models answer alike, so quality only varies
+with the amount of research; recorded responses of the real models make the
+model choices count.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from langchain_core.callbacks import BaseCallbackHandler  # noqa: E402
+
+from agent.cascade import estimate_cost  # noqa: E402
+from agent.configuration import Configuration  # noqa: E402
+from agent.llm_cache import set_llm_cache  # noqa: E402
+from agent.models import override_models  # noqa: E402
+from agent.registry import get_graph  # noqa: E402
+from agent.sufficiency import score_coverage  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeChatGoogleGenerativeAI,
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+)
+
+DEFAULT_SPACE: Dict[str, List[Any]] = {
+    "number_of_initial_queries": [1, 2, 3, 5],
+    "max_research_loops": [1, 2, 3],
+    "query_generator_model": ["gemini-2.0-flash", "gemini-2.5-flash"],
+    "reflection_model": ["gemini-2.0-flash", "gemini-2.5-flash", "gemini-2.5-pro"],
+    "answer_model": ["gemini-2.5-flash", "gemini-2.5-pro"],
+}
+
+# Latency of the models relative to gemini-2.5-flash; versioned names use
+# the factor of the longest matching name
+MODEL_SPEED: Dict[str, float] = {
+    "gemini-2.0-flash-lite": 0.5,
+    "gemini-2.0-flash": 0.6,
+    "gemini-2.5-flash-lite": 0.6,
+    "gemini-2.5-flash": 1.0,
+    "gemini-2.5-pro": 2.5,
+}
+
+# Objectives of the Pareto front: metric and whether higher is better
+OBJECTIVES: Tuple[Tuple[str, bool], ...] = (
+    ("latency_s", False),
+    ("tokens", False),
+    ("cost_usd", False),
+    ("quality", True),
+)
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_LINK = re.compile(r"\]\(https?://[^)]+\)")
+
+
+def model_speed(model: str) -> float:
+    """Return the relative latency of ``model``; 1.0 for unknown models."""
+    names = [name for name in MODEL_SPEED if model.startswith(name)]
+    return MODEL_SPEED[max(names, key=len)] if names else 1.0
+
+
+def model_latency_factory(fixtures: Fixtures, preset: str, scale: float, seed: int):
+    """Return a fake chat model factory whose latency depends on the model."""
+    profiles: Dict[str, LatencyProfile] = {}
+    lock = threading.Lock()
+
+    def factory(model: str, temperature: float, max_retries: int = 2):
+        with lock:
+            if model not in profiles:
+                profiles[model] = LatencyProfile.preset(
+                    preset, scale * model_speed(model), seed
+                )
+        return FakeChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            max_retries=max_retries,
+            fixtures=fixtures,
+            latency=profiles[model],
+        )
+
+    return factory
+
+
+class UsageRecorder(BaseCallbackHandler):
+    """Sum the token usage and estimated cost of the chat-model calls of a run."""
+
+    def __init__(self):
+        """Start with no recorded usage."""
+        self.tokens = 0
+        self.cost = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        """Add the token usage and estimated cost of a chat-model call."""
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                model = (getattr(message, "response_metadata", None) or {}).get(
+                    "model_name", ""
+                )
+                with self._lock:
+                    self.calls += 1
+                    self.tokens += usage.get("total_tokens", 0)
+                    self.cost += estimate_cost(
+                        model,
+                        usage.get("input_tokens", 0),
+                        usage.get("output_tokens", 0),
+                    )
+
+
+def citation_coverage(answer: str) -> float:
+    """Return the share of the answer's sentences that cite a source."""
+    sentences = [sentence for sentence in _SENTENCE.split(answer) if sentence.strip()]
+    if not sentences:
+        return 0.0
+    return sum(1 for sentence in sentences if _LINK.search(sentence)) / len(sentences)
+
+
+def score_answer(
+    question: str, output: Dict[str, Any], reference: str | None
+) -> Dict[str, float]:
+    """Return the quality proxies of a research run and their mean."""
+    answer = str(output["messages"][-1].content) if output.get("messages") else ""
+    scores = {
+        "research_coverage": score_coverage(
+            question, output.get("web_research_result") or []
+        ).score,
+        "citation_coverage": citation_coverage(answer),
+    }
+    if reference:
+        # Share of the reference's key terms that the answer contains
+        scores["reference_overlap"] = score_coverage(reference, [answer]).term_coverage
+    scores["quality"] = sum(scores.values()) / len(scores)
+    return scores
+
+
+def space_points(
+    space: Dict[str, Sequence[Any]], search: str, samples: int, seed: int
+) -> List[Dict[str, Any]]:
+    """Return the configurations of a grid sweep, or a random sample of them."""
+    keys = sorted(space)
+    grid = [
+        dict(zip(keys, values))
+        for values in itertools.product(*(space[key] for key in keys))
+    ]
+    if search == "random" and samples < len(grid):
+        return random.Random(seed).sample(grid, samples)
+    return grid
+
+
+def evaluate(
+    graph: Any,
+    point: Dict[str, Any],
+    questions: Sequence[str],
+    references: Dict[str, str],
+    repeats: int,
+) -> Dict[str, Any]:
+    """Run every question ``repeats`` times with the configuration ``point``."""
+    latencies: List[float] = []
+    tokens: List[int] = []
+    costs: List[float] = []
+    scores: List[Dict[str, float]] = []
+    errors = 0
+    for _ in range(repeats):
+        for question in questions:
+            recorder = UsageRecorder()
+            start = time.perf_counter()
+            try:
+                output = graph.invoke(
+                    {"messages": [{"role": "user", "content": question}]},
+                    {"configurable": point, "callbacks": [recorder]},
+                )
+            except Exception as e:
+                sys.stderr.write(f"{point} failed on '{question}': {e}\n")
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            tokens.append(recorder.tokens)
+            costs.append(recorder.cost)
+            scores.append(score_answer(question, output, references.get(question)))
+
+    def mean(values: Sequence[float]) -> float:
+        return sum(values) / len(values) if values else float("nan")
+
+    return {
+        "config": point,
+        "runs": len(latencies),
+        "errors": errors,
+        "latency_s": round(mean(latencies), 4),
+        "tokens": round(mean(tokens), 1),
+        "cost_usd": round(mean(costs), 6),
+        **{
+            name: round(mean([score[name] for score in scores]), 4)
+            for name in (scores[0] if scores else {})
+        },
+    }
+
+
+def dominates(
+    a: Dict[str, Any], b: Dict[str, Any], tolerances: Dict[str, float] | None = None
+) -> bool:
+    """Whether ``a`` is at least as good as ``b`` on every objective and better on one.
+
+    Args:
+        a: A scored configuration
+        b: Another scored configuration
+        tolerances: Relative difference under which the values of a metric
+            count as equal, e.g. ``{"latency_s": 0.05}``
+    """
+    better = False
+    for metric, higher in OBJECTIVES:
+        x, y = (a[metric], b[metric]) if higher else (b[metric], a[metric])
+        if abs(x - y) <= (tolerances or {}).get(metric, 0.0) * max(abs(x), abs(y)):
+            continue
+        if x < y:
+            return False
+        better = True
+    return better
+
+
+def pareto_front(
+    results: Sequence[Dict[str, Any]], tolerances: Dict[str, float] | None = None
+) -> List[Dict[str, Any]]:
+    """Return the error-free results no other result dominates, fastest first."""
+    valid = [result for result in results if not result["errors"] and result["runs"]]
+    front = [
+        result
+        for result in valid
+        if not any(
+            dominates(other, result, tolerances)
+            for other in valid
+            if other is not result
+        )
+    ]
+    return sorted(front, key=lambda result: result["latency_s"])
+
+
+def write_configs(front: Sequence[Dict[str, Any]], directory: str) -> List[str]:
+    """Write every front configuration as a run config and an environment file."""
+    os.makedirs(directory, exist_ok=True)
+    names = []
+    for i, result in enumerate(front, start=1):
+        name = f"pareto-{i:02d}"
+        scores = ", ".join(f"{metric}={result[metric]}" for metric, _ in OBJECTIVES)
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"configurable": result["config"]}, f, indent=2)
+            f.write("\n")
+        with open(os.path.join(directory, f"{name}.env"), "w", encoding="utf-8") as f:
+            f.write(f"# benchmarks.autotune: {scores}\n")
+            for key, value in sorted(result["config"].items()):
+                value = json.dumps(value) if isinstance(value, bool) else value
+                f.write(f"{key.upper()}={value}\n")
+        names.append(name)
+    return names
+
+
+def parse_values(item: str) -> Tuple[str, List[Any]]:
+    """Parse a ``FIELD=V1,V2`` search dimension; values are JSON when they parse as such."""
+    key, _, values = item.partition("=")
+    parsed = []
+    for value in values.split(","):
+        try:
+            parsed.append(json.loads(value))
+        except json.JSONDecodeError:
+            parsed.append(value)
+    return key, parsed
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the configuration autotuner."""
+    parser = argparse.ArgumentParser(
+        description="Deep researcher configuration autotuner"
+    )
+    parser.add_argument("--space", help="JSON file mapping fields to candidate values")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="FIELD=V1,V2",
+        help="Candidate values of a field (repeatable, replaces the default space)",
+    )
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--samples", type=int, default=24, help="Random search size")
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Runs of every question per configuration",
+    )
+    parser.add_argument(
+        "--latency-tolerance",
+        type=float,
+        default=0.05,
+        help="Relative latency difference treated as noise on the Pareto front",
+    )
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="autotune", help="Pareto config files")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    space: Dict[str, List[Any]] = dict(DEFAULT_SPACE)
+    if args.space:
+        with open(args.space, encoding="utf-8") as f:
+            space = json.load(f)
+    if args.set:
+        space = dict(parse_values(item) for item in args.set)
+    unknown = sorted(set(space) - set(Configuration.model_fields))
+    if unknown:
+        parser.error(f"Unknown Configuration fields: {', '.join(unknown)}")
+
+    fixtures = Fixtures.load()
+    questions = fixtures.questions("deep_researcher")
+    references = fixtures.references("deep_researcher")
+    points = space_points(space, args.search, args.samples, args.seed)
+    # Every run should reach the emulated API
+    set_llm_cache(None)
+
+    results = []
+    with override_models(
+        chat_model_factory=model_latency_factory(
+            fixtures, args.latency, args.latency_scale, args.seed
+        ),
+        genai_client=FakeGenaiClient(
+            fixtures, LatencyProfile.preset(args.latency, args.latency_scale, args.seed)
+        ),
+    ):
+        graph = get_graph("deep_researcher")
+        for i, point in enumerate(points, start=1):
+            result = evaluate(graph, point, questions, references, args.repeats)
+            results.append(result)
+            sys.stderr.write(
+                f"[{i}/{len(points)}] latency={result['latency_s']:.3f}s "
+                f"tokens={result['tokens']:.0f} quality={result.get('quality', 0):.3f} "
+                f"{point}\n"
+            )
+
+    front = pareto_front(results, {"latency_s": args.latency_tolerance})
+    names = write_configs(front, args.output_dir)
+    sys.stderr.write(
+        f"{len(front)} Pareto-optimal configurations in {args.output_dir}:\n"
+    )
+    for name, result in zip(names, front):
+        sys.stderr.write(
+            f"  {name} latency={result['latency_s']:.3f}s tokens={result['tokens']:.0f} "
+            f"cost=${result['cost_usd']:.4f} quality={result['quality']:.3f}\n"
+        )
+
+    output = json.dumps(
+        {
+            "meta": {**vars(args), "space": space},
+            "results": results,
+            "pareto": [dict(result, file=name) for name, result in zip(names, front)],
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
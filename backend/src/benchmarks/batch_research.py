@@ -0,0 +1,129 @@
+r"""Compare one batch researcher run with independent deep researcher runs.
+
+Researches the same N questions both ways against the recorded fake Gemini
+clients and reports wall time, LLM calls, searches and tokens::
+
+    python -m benchmarks.batch_research --questions 20 --concurrency 4 \
+        --latency realistic --latency-scale 0.1
+
+The batch researcher does a single research pass per question, so the
+independent runs are compared with ``max_research_loops`` set to 0 by default
+(``--research-loops`` changes that).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from agent.models import override_models  # noqa: E402
+from agent.registry import get_graph  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from telemetry import InMemorySpanExporter, configure_tracing  # noqa: E402
+
+
+def usage(spans: List[Any]) -> Dict[str, int]:
+    """Count LLM calls, searches and tokens in the recorded spans."""
+    llm = [span for span in spans if span.kind == "llm"]
+    return {
+        "llm_calls": sum(1 for span in llm if span.name != "google_search"),
+        "searches": sum(1 for span in llm if span.name == "google_search"),
+        "input_tokens": sum(span.attributes.get("input_tokens") or 0 for span in llm),
+        "output_tokens": sum(span.attributes.get("output_tokens") or 0 for span in llm),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the batch research benchmark."""
+    parser = argparse.ArgumentParser(description="Batch vs. independent research runs")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--research-loops", type=int, default=0)
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=0.1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures.load()
+    latency = LatencyProfile.preset(args.latency, scale=args.latency_scale)
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter)
+
+    pool = fixtures.questions("deep_researcher")
+    questions = [
+        f"{pool[i % len(pool)]} (part {i // len(pool) + 1})"
+        if i >= len(pool)
+        else pool[i]
+        for i in range(args.questions)
+    ]
+
+    report: Dict[str, Any] = {"meta": vars(args)}
+    with override_models(
+        chat_model_factory=fake_chat_model_factory(fixtures, latency),
+        genai_client=FakeGenaiClient(fixtures, latency),
+    ):
+        research = get_graph("deep_researcher")
+        batch = get_graph("batch_researcher")
+
+        def run_one(question: str) -> None:
+            research.invoke(
+                {
+                    "messages": [{"role": "user", "content": question}],
+                    "max_research_loops": args.research_loops,
+                }
+            )
+
+        exporter.clear()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(run_one, questions))
+        report["independent"] = {
+            "wall_s": round(time.perf_counter() - start, 4),
+            **usage(exporter.clear()),
+        }
+
+        start = time.perf_counter()
+        batch.invoke(
+            {"questions": questions},
+            {
+                "configurable": {
+                    "batch_planning_concurrency": args.concurrency,
+                    "batch_answer_concurrency": args.concurrency,
+                }
+            },
+        )
+        report["batch"] = {
+            "wall_s": round(time.perf_counter() - start, 4),
+            **usage(exporter.clear()),
+        }
+
+    for key in ("wall_s", "llm_calls", "searches", "input_tokens"):
+        independent, batched = report["independent"][key], report["batch"][key]
+        ratio = f"{batched / independent:.2f}x" if independent else "-"
+        sys.stderr.write(
+            f"{key:<14} independent={independent:<10} batch={batched:<10} {ratio}\n"
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
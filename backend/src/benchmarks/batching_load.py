@@ -0,0 +1,141 @@
+"""Throughput of micro-batched chat-model calls at high concurrency.
+
+``--concurrency`` callers issue ``--calls`` structured-output calls (the
+``reflection`` shape) through :func:`agent.models.get_chat_model` against the
+local fake batch server (:mod:`benchmarks.fake_batch_server`), once per
+maximum batch size::
+
+    python -m benchmarks.batching_load --calls 512 --concurrency 64 --batch-sizes 1,8,32
+
+Batch size 1 sends every call as its own request, i.e. no batching. The
+``multiplex`` row sends every call at once, without a window, to the
+in-process fake model under the same quota, which is what batching does
+without a batch endpoint. The report has calls per second, call latency percentiles and the
+mean batch size of each configuration.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from agent.batching import (  # noqa: E402
+    HttpBatchBackend,
+    MicroBatcher,
+    MultiplexBackend,
+    set_batcher,
+)
+from agent.llm_cache import set_llm_cache  # noqa: E402
+from agent.models import get_chat_model, override_models  # noqa: E402
+from agent.tools_and_schemas import Reflection  # noqa: E402
+from benchmarks.fake_batch_server import start_fake_batch_server  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.stats import summarize_latencies  # noqa: E402
+
+
+def run_calls(calls: int, concurrency: int, model: str) -> Dict[str, Any]:
+    """Issue ``calls`` reflection-shaped calls from ``concurrency`` threads."""
+
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        llm = get_chat_model(model, temperature=1.0, batch=True)
+        llm.with_structured_output(Reflection).invoke(
+            f"Is the research on topic {i} sufficient? Summaries: finding {i}."
+        )
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(call, range(calls)))
+    elapsed = time.perf_counter() - start
+    return {
+        "wall_seconds": round(elapsed, 3),
+        "calls_per_second": round(calls / elapsed, 1),
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the batching benchmark."""
+    parser = argparse.ArgumentParser(description="Micro-batching throughput")
+    parser.add_argument("--calls", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-sizes", default="1,8,32", help="Comma-separated sizes")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=0.1)
+    parser.add_argument("--request-overhead-ms", type=float, default=40.0)
+    parser.add_argument("--item-ms", type=float, default=2.0)
+    parser.add_argument(
+        "--quota", type=int, default=8, help="Concurrent requests served"
+    )
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures.load()
+    # Every call should reach the emulated API
+    set_llm_cache(None)
+    server = start_fake_batch_server(
+        fixtures=fixtures,
+        latency=LatencyProfile.preset(args.latency, args.latency_scale, args.seed),
+        request_overhead_ms=args.request_overhead_ms,
+        item_ms=args.item_ms,
+        max_concurrency=args.quota,
+    )
+    backend = HttpBatchBackend(server.url, max_connections=args.concurrency)
+
+    report: Dict[str, Any] = {"meta": vars(args), "configurations": {}}
+    with override_models(chat_model_factory=fake_chat_model_factory(fixtures)):
+        for size in (int(size) for size in args.batch_sizes.split(",")):
+            set_batcher(MicroBatcher(backend, args.window_ms, size))
+            requests_before = server.requests
+            result = run_calls(args.calls, args.concurrency, args.model)
+            result["mean_batch_size"] = round(
+                args.calls / max(1, server.requests - requests_before), 1
+            )
+            report["configurations"][f"http:{size}"] = result
+            sys.stderr.write(
+                f"http batch<={size:<3} {result['calls_per_second']:>7.1f} calls/s "
+                f"p50={result['latency_ms']['p50']:.0f}ms "
+                f"mean batch={result['mean_batch_size']}\n"
+            )
+
+    # Without a batch endpoint: each call is sent at once, as a request of its own
+    latency = LatencyProfile.preset(
+        args.latency, args.latency_scale, args.seed, max_concurrency=args.quota
+    )
+    with override_models(chat_model_factory=fake_chat_model_factory(fixtures, latency)):
+        set_batcher(MicroBatcher(MultiplexBackend(args.concurrency), args.window_ms))
+        result = run_calls(args.calls, args.concurrency, args.model)
+        report["configurations"]["multiplex"] = result
+        sys.stderr.write(
+            f"multiplex        {result['calls_per_second']:>7.1f} calls/s "
+            f"p50={result['latency_ms']['p50']:.0f}ms\n"
+        )
+    set_batcher(None)
+    server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Crash-recovery check for the write-behind checkpointer.
+
+Starts a child process that runs deep researcher threads against a
+write-behind SQLite checkpointer and reports each finished run. After
+``--kill-after`` finished runs, the child flushes the ``--kill-at-checkpoint``-th
+checkpoint of the next thread, reports it and stops in the middle of the run,
+where it is killed with SIGKILL. A fresh process then verifies that:
+
+* every checkpoint in the database deserializes;
+* every run the child reported as finished has its final checkpoint;
+* the interrupted thread, and any other thread the crash cut short, resumes
+  from its last checkpoint and completes.
+
+The check fails, with exit status 1, when no thread was resumed, since
+recovery was then not exercised::
+
+    python -m benchmarks.checkpoint_recovery --durability batched --kill-after 5
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Any, List, Tuple
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from langchain_core.runnables import RunnableConfig  # noqa: E402
+from langgraph.checkpoint.base import (  # noqa: E402
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+)
+
+from agent.models import override_models  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.scenarios import SCENARIOS  # noqa: E402
+from checkpointing import (  # noqa: E402
+    DURABILITY_MODES,
+    SqliteCheckpointSaver,
+    WriteBehindCheckpointSaver,
+    attach_checkpointer,
+)
+
+FINISHED = "finished "
+KILL_POINT = "kill point"
+
+
+class _KillPointSaver(WriteBehindCheckpointSaver):
+    """Stop the run of ``thread_id`` once its ``checkpoints``-th checkpoint is flushed."""
+
+    def __init__(self, *args: Any, thread_id: str, checkpoints: int, **kwargs: Any):
+        """Create the saver; other arguments go to the write-behind saver."""
+        super().__init__(*args, **kwargs)
+        self.kill_thread = thread_id
+        self.kill_checkpoints = checkpoints
+        self._count = 0
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Buffer a checkpoint, blocking for the kill at the kill point."""
+        result = super().put(config, checkpoint, metadata, new_versions)
+        if config["configurable"]["thread_id"] == self.kill_thread:
+            self._count += 1
+            if self._count == self.kill_checkpoints:
+                self.flush()
+                sys.stdout.write(f"{KILL_POINT}\n")
+                sys.stdout.flush()
+                threading.Event().wait()
+        return result
+
+
+def _fakes(latency: str):
+    fixtures = Fixtures.load()
+    profile = LatencyProfile.preset(latency)
+    return fixtures, override_models(
+        chat_model_factory=fake_chat_model_factory(fixtures, profile),
+        genai_client=FakeGenaiClient(fixtures, profile),
+    )
+
+
+def child(
+    path: str,
+    durability: str,
+    flush_interval_ms: float,
+    latency: str,
+    kill_after: int,
+    kill_at_checkpoint: int,
+) -> None:
+    """Run threads until the kill point, printing a line after each finished run."""
+    fixtures, fakes = _fakes(latency)
+    saver = _KillPointSaver(
+        SqliteCheckpointSaver(path),
+        flush_interval=flush_interval_ms / 1000,
+        durability=durability,
+        thread_id=f"thread-{kill_after}",
+        checkpoints=kill_at_checkpoint,
+    )
+    scenario = SCENARIOS["deep_researcher"]
+    with fakes:
+        graph = attach_checkpointer(scenario.load_graph(), saver)
+        i = 0
+        while True:
+            graph.invoke(
+                scenario.make_input(fixtures, i),
+                {"configurable": {"thread_id": f"thread-{i}"}},
+            )
+            sys.stdout.write(f"{FINISHED}thread-{i}\n")
+            sys.stdout.flush()
+            i += 1
+
+
+def verify(path: str, finished: List[str], started: int) -> Tuple[List[str], int]:
+    """Check the database left behind by the killed child.
+
+    Returns:
+        The failures found and the number of threads resumed after the crash
+    """
+    failures, resumed = [], 0
+    saver = SqliteCheckpointSaver(path)
+    try:
+        for checkpoint_tuple in saver.list(None):
+            pass
+    except Exception as e:
+        failures.append(f"checkpoint failed to deserialize: {e}")
+
+    fixtures, fakes = _fakes("none")
+    with fakes:
+        graph = attach_checkpointer(SCENARIOS["deep_researcher"].load_graph(), saver)
+        for i in range(started):
+            thread_id = f"thread-{i}"
+            config = {"configurable": {"thread_id": thread_id}}
+            state = graph.get_state(config)
+            if thread_id in finished:
+                if state.next or not state.values.get("messages"):
+                    failures.append(
+                        f"{thread_id} finished but its final checkpoint is missing"
+                    )
+                continue
+            if not state.values:
+                # Killed before the first flush of this thread: nothing to resume
+                continue
+            resumed += 1
+            try:
+                if state.next:
+                    graph.invoke(None, config)
+                else:
+                    # The input checkpoint was not persisted yet; start over
+                    graph.invoke(
+                        SCENARIOS["deep_researcher"].make_input(fixtures, i), config
+                    )
+                state = graph.get_state(config)
+                if state.next or len(state.values.get("messages", [])) < 2:
+                    failures.append(f"{thread_id} did not complete after resuming")
+            except Exception as e:
+                failures.append(f"{thread_id} failed to resume: {e}")
+    saver.close()
+    return failures, resumed
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the crash-recovery check."""
+    parser = argparse.ArgumentParser(description="Write-behind crash recovery check")
+    parser.add_argument("--durability", default="batched", choices=DURABILITY_MODES)
+    parser.add_argument("--flush-interval-ms", type=float, default=50)
+    parser.add_argument(
+        "--kill-after", type=int, default=5, help="Finished runs before SIGKILL"
+    )
+    parser.add_argument(
+        "--kill-at-checkpoint",
+        type=int,
+        default=3,
+        help="Flushed checkpoints of the next thread before SIGKILL",
+    )
+    parser.add_argument("--latency", default="fast", help="Fake Gemini latency preset")
+    parser.add_argument("--child", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(
+            args.child,
+            args.durability,
+            args.flush_interval_ms,
+            args.latency,
+            args.kill_after,
+            args.kill_at_checkpoint,
+        )
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.checkpoint_recovery",
+                "--child",
+                path,
+                "--durability",
+                args.durability,
+                "--flush-interval-ms",
+                str(args.flush_interval_ms),
+                "--latency",
+                args.latency,
+                "--kill-after",
+                str(args.kill_after),
+                "--kill-at-checkpoint",
+                str(args.kill_at_checkpoint),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        finished, killed = [], False
+        for line in process.stdout:
+            if line.startswith(FINISHED):
+                finished.append(line[len(FINISHED) :].strip())
+                if len(finished) > args.kill_after:
+                    # The run ended with fewer checkpoints than the kill point
+                    break
+            elif line.strip() == KILL_POINT:
+                killed = True
+                break
+        # The child is blocked at the kill point: no run finishes meanwhile
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+        failures, resumed = verify(path, finished, started=len(finished) + 1)
+        if not killed:
+            failures.append(
+                f"thread-{args.kill_after} did not reach checkpoint "
+                f"{args.kill_at_checkpoint} before finishing or exiting"
+            )
+        elif not resumed:
+            failures.append("no interrupted thread was resumed")
+
+    sys.stdout.write(
+        f"durability={args.durability} finished={len(finished)} "
+        f"resumed={resumed} failures={len(failures)}\n"
+    )
+    for failure in failures:
+        sys.stdout.write(f"  {failure}\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Checkpoint write throughput: direct SQLite saver vs. write-behind saver.
+
+Records the checkpoint operations of one deep researcher run, then replays
+them for many threads from several worker threads against each saver, and
+finally measures end-to-end graph runs with each saver attached::
+
+    python -m benchmarks.checkpoints --threads 200 --concurrency 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from langgraph.checkpoint.base import BaseCheckpointSaver  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+
+from agent.models import override_models  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.scenarios import SCENARIOS  # noqa: E402
+from benchmarks.stats import summarize_latencies  # noqa: E402
+from checkpointing import (  # noqa: E402
+    SqliteCheckpointSaver,
+    WriteBehindCheckpointSaver,
+    attach_checkpointer,
+)
+
+Operation = Tuple[str, tuple]
+
+
+class _RecordingSaver(InMemorySaver):
+    """In-memory saver that records every write operation."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.operations: List[Operation] = []
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self.operations.append(("put", (config, checkpoint, metadata, new_versions)))
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.operations.append(("put_writes", (config, writes, task_id, task_path)))
+        return super().put_writes(config, writes, task_id, task_path)
+
+
+def _with_thread(config: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return {
+        **config,
+        "configurable": {**config["configurable"], "thread_id": thread_id},
+    }
+
+
+def record_operations(graph: Any, scenario_input: Dict[str, Any]) -> List[Operation]:
+    """Run the graph once and return its checkpoint write operations."""
+    recorder = _RecordingSaver()
+    graph.copy(update={"checkpointer": recorder}).invoke(
+        scenario_input, {"configurable": {"thread_id": "recording"}}
+    )
+    return recorder.operations
+
+
+def replay(
+    saver: BaseCheckpointSaver,
+    operations: List[Operation],
+    threads: int,
+    concurrency: int,
+    on_thread_end: Callable[[], None] | None = None,
+) -> Dict[str, Any]:
+    """Replay ``operations`` for ``threads`` thread ids and time each thread."""
+
+    def replay_thread(i: int) -> float:
+        thread_id = f"replay-{i}"
+        start = time.perf_counter()
+        for kind, (config, *rest) in operations:
+            getattr(saver, kind)(_with_thread(config, thread_id), *rest)
+        if on_thread_end is not None:
+            on_thread_end()
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(replay_thread, range(threads)))
+    if on_thread_end is not None:
+        on_thread_end()
+    wall = time.perf_counter() - wall_start
+    total_ops = len(operations) * threads
+    return {
+        "operations": total_ops,
+        "wall_s": round(wall, 4),
+        "ops_per_s": round(total_ops / wall, 1),
+        "per_thread_ms": summarize_latencies(latencies),
+    }
+
+
+def run_graphs(
+    graph: Any,
+    saver: BaseCheckpointSaver,
+    fixtures: Fixtures,
+    runs: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Run the deep researcher ``runs`` times with ``saver`` attached."""
+    scenario = SCENARIOS["deep_researcher"]
+    graph = attach_checkpointer(graph, saver)
+
+    def run_once(i: int) -> float:
+        start = time.perf_counter()
+        graph.invoke(
+            scenario.make_input(fixtures, i),
+            {"configurable": {"thread_id": f"run-{i}"}},
+        )
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(run_once, range(runs)))
+    wall = time.perf_counter() - wall_start
+    return {
+        "runs": runs,
+        "wall_s": round(wall, 4),
+        "runs_per_s": round(runs / wall, 2),
+        "latency_ms": summarize_latencies(latencies),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the checkpoint throughput benchmark."""
+    parser = argparse.ArgumentParser(description="Checkpoint write throughput")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"]
+    )
+    parser.add_argument("--flush-interval-ms", type=float, default=50)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures.load()
+    latency = LatencyProfile.preset("none")
+    report: Dict[str, Any] = {"meta": vars(args)}
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        override_models(
+            chat_model_factory=fake_chat_model_factory(fixtures, latency),
+            genai_client=FakeGenaiClient(fixtures, latency),
+        ),
+    ):
+        graph = SCENARIOS["deep_researcher"].load_graph()
+        operations = record_operations(
+            graph, SCENARIOS["deep_researcher"].make_input(fixtures, 0)
+        )
+        report["meta"]["operations_per_run"] = len(operations)
+
+        def make_savers():
+            yield (
+                "direct",
+                SqliteCheckpointSaver(
+                    os.path.join(tmp, f"direct-{time.monotonic_ns()}.db"),
+                    args.synchronous,
+                ),
+            )
+            for durability in ("batched", "interrupt"):
+                yield (
+                    f"write_behind_{durability}",
+                    WriteBehindCheckpointSaver(
+                        SqliteCheckpointSaver(
+                            os.path.join(tmp, f"{durability}-{time.monotonic_ns()}.db"),
+                            args.synchronous,
+                        ),
+                        flush_interval=args.flush_interval_ms / 1000,
+                        durability=durability,
+                    ),
+                )
+
+        report["replay"] = {}
+        for name, saver in make_savers():
+            # Each replayed thread is a run, flushed at its end
+            on_end = getattr(saver, "flush", None)
+            result = replay(saver, operations, args.threads, args.concurrency, on_end)
+            if isinstance(saver, WriteBehindCheckpointSaver):
+                result["flush_stats"] = saver.stats()
+            saver.close()
+            report["replay"][name] = result
+            sys.stderr.write(f"replay {name:<24} {result['ops_per_s']:>10.1f} ops/s\n")
+
+        report["graph_runs"] = {}
+        for name, saver in make_savers():
+            result = run_graphs(graph, saver, fixtures, args.runs, args.concurrency)
+            if isinstance(saver, WriteBehindCheckpointSaver):
+                result["flush_stats"] = saver.stats()
+            saver.close()
+            report["graph_runs"][name] = result
+            sys.stderr.write(
+                f"graph  {name:<24} {result['runs_per_s']:>10.2f} runs/s\n"
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
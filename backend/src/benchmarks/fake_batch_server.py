@@ -0,0 +1,178 @@
+"""Local stand-in for a batch endpoint of the model provider.
+
+Answers ``POST /v1/batch`` in the format of :class:`agent.batching.HttpBatchBackend`
+with the fake Gemini chat model and the fixtures, and emulates the costs that
+make batching pay off:
+
+* every HTTP request costs ``--request-overhead-ms`` (connection, auth,
+  admission), however many calls it carries;
+* a request then takes as long as its slowest call, plus ``--item-ms`` per
+  call for the shared work of the batch;
+* at most ``--max-concurrency`` requests are served at a time, like a
+  requests-per-project quota; more requests queue.
+
+Run it and point the backend at it::
+
+    python -m benchmarks.fake_batch_server --port 8765
+    LLM_BATCH_ENABLED=true LLM_BATCH_URL=http://127.0.0.1:8765/v1/batch ...
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.load import dumpd, loads
+
+from benchmarks.fake_gemini import Fixtures, LatencyProfile, fake_chat_model_factory
+
+logger = logging.getLogger(__name__)
+
+
+class FakeBatchServer(ThreadingHTTPServer):
+    """HTTP server answering batches of chat-model calls from the fixtures.
+
+    Args:
+        address: Host and port to listen on; port 0 picks a free port
+        fixtures: Recorded responses of the fake chat model
+        latency: Latency of each call of a batch
+        request_overhead_ms: Fixed cost of every request
+        item_ms: Added cost of every call in a request
+        max_concurrency: Requests served at the same time; 0 for no limit
+    """
+
+    daemon_threads = True
+    # Many benchmark clients connect at once
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        fixtures: Fixtures,
+        latency: LatencyProfile | None = None,
+        request_overhead_ms: float = 40.0,
+        item_ms: float = 2.0,
+        max_concurrency: int = 8,
+    ):
+        """Create a server on ``address`` answering from ``fixtures``."""
+        super().__init__(address, _BatchHandler)
+        self.factory = fake_chat_model_factory(fixtures)
+        self.latency = latency
+        self.request_overhead = request_overhead_ms / 1000
+        self.item_cost = item_ms / 1000
+        self._quota = (
+            threading.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.calls = 0
+
+    @property
+    def url(self) -> str:
+        """Return the batch endpoint of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/batch"
+
+    def answer(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer every call of a batch request, after the emulated delay."""
+        model = self.factory(model=body["model"], temperature=0)
+        responses = []
+        kinds = []
+        for request in body["requests"]:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", LangChainBetaWarning)
+                    messages = loads(
+                        json.dumps(request["messages"]), allowed_objects="core"
+                    )
+                kwargs = request.get("kwargs") or {}
+                result = model._generate(messages, request.get("stop"), **kwargs)
+                responses.append({"generations": dumpd(result.generations)})
+                kinds.append("structured" if kwargs.get("tools") else "chat")
+            except Exception as e:
+                responses.append({"error": f"{type(e).__name__}: {e}"})
+        delay = self.request_overhead + self.item_cost * len(kinds)
+        if self.latency is not None:
+            delay += max((self.latency.sample(kind) for kind in kinds), default=0.0)
+        if self._quota is None:
+            time.sleep(delay)
+        else:
+            with self._quota:
+                time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            self.calls += len(body["requests"])
+        return {"responses": responses}
+
+
+class _BatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        if self.path != "/v1/batch":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("content-length", "0"))
+            body = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send(400, {"error": f"Invalid request: {e}"})
+            return
+        self._send(200, self.server.answer(body))
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+def start_fake_batch_server(**kwargs: Any) -> FakeBatchServer:
+    """Start a :class:`FakeBatchServer` on a free local port in a daemon thread."""
+    server = FakeBatchServer(("127.0.0.1", 0), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    """Entry point of the fake batch server."""
+    parser = argparse.ArgumentParser(
+        description="Fake batch endpoint for the chat models"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--request-overhead-ms", type=float, default=40.0)
+    parser.add_argument("--item-ms", type=float, default=2.0)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = FakeBatchServer(
+        (args.host, args.port),
+        Fixtures.load(),
+        LatencyProfile.preset(args.latency, args.latency_scale),
+        args.request_overhead_ms,
+        args.item_ms,
+        args.max_concurrency,
+    )
+    sys.stdout.write(f"Serving batches at {server.url}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
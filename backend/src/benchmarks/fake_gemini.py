@@ -0,0 +1,352 @@
+"""Deterministic stand-ins for the Gemini clients used by the graphs.
+
+:class:`FakeChatGoogleGenerativeAI` replaces ``ChatGoogleGenerativeAI`` and
+:class:`FakeGenaiClient` replaces ``google.genai.Client``. Both replay responses
+from a fixture file (``fixtures/gemini.json`` by default) and sleep according
+to a configurable latency distribution, so graph runs can be benchmarked
+offline and reproducibly.
+
+Fixture selection is keyed on a CRC32 of the prompt, so the same input always
+replays the same recorded response. Grounded search fixtures are stored in the
+shape produced by ``GenerateContentResponse.model_dump(mode="json")``, which
+means a real response can be recorded by dumping it into the ``search`` list.
+"""
+
+import asyncio
+import json
+import math
+import pathlib
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from google.genai import types
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+DEFAULT_FIXTURES = pathlib.Path(__file__).parent / "fixtures" / "gemini.json"
+
+SHORT_URL_PATTERN = re.compile(r"https://vertexaisearch\.cloud\.google\.com/id/\d+-\d+")
+
+
+@dataclass
+class LatencyDistribution:
+    """Latency distribution of a single kind of call.
+
+    Attributes:
+        distribution: "constant", "uniform" or "lognormal"
+        median_ms: Median (or constant) latency in milliseconds
+        spread: Uniform half-width as a fraction of the median, or the sigma
+            of the underlying normal for the lognormal distribution
+        tail_probability: Probability that a call is a 5-10x outlier
+    """
+
+    distribution: str = "constant"
+    median_ms: float = 0.0
+    spread: float = 0.0
+    tail_probability: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        if self.tail_probability and rng.random() < self.tail_probability:
+            return self.median_ms * rng.uniform(5, 10) / 1000
+        if self.distribution == "uniform":
+            low = self.median_ms * (1 - self.spread)
+            high = self.median_ms * (1 + self.spread)
+            return max(0.0, rng.uniform(low, high)) / 1000
+        if self.distribution == "lognormal":
+            return rng.lognormvariate(math.log(self.median_ms), self.spread) / 1000
+        return self.median_ms / 1000
+
+
+@dataclass
+class LatencyProfile:
+    """Latency distributions per call kind ("chat", "structured", "search").
+
+    ``max_concurrency`` emulates an API quota: synchronous calls beyond it
+    queue until an earlier call returns.
+    """
+
+    chat: LatencyDistribution = field(default_factory=LatencyDistribution)
+    structured: LatencyDistribution = field(default_factory=LatencyDistribution)
+    search: LatencyDistribution = field(default_factory=LatencyDistribution)
+    seed: int = 0
+    max_concurrency: int = 0
+
+    def __post_init__(self):
+        """Seed the sampler and create the concurrency quota."""
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._quota = (
+            threading.Semaphore(self.max_concurrency)
+            if self.max_concurrency > 0
+            else None
+        )
+
+    def sample(self, kind: str) -> float:
+        """Draw a latency in seconds for the given call kind."""
+        with self._lock:
+            return getattr(self, kind).sample(self._rng)
+
+    def wait(self, kind: str) -> None:
+        """Sleep for one call of the given kind, within the quota."""
+        if self._quota is None:
+            time.sleep(self.sample(kind))
+            return
+        with self._quota:
+            time.sleep(self.sample(kind))
+
+    @classmethod
+    def preset(
+        cls, name: str, scale: float = 1.0, seed: int = 0, max_concurrency: int = 0
+    ) -> "LatencyProfile":
+        """Build one of the named presets, with medians multiplied by ``scale``."""
+        presets = {
+            "none": (0, 0, 0, 0.0, 0.0),
+            "fast": (8, 5, 25, 0.3, 0.0),
+            "realistic": (800, 600, 2500, 0.5, 0.0),
+            # A few calls take 5-10x the median, as seen for grounded search
+            "heavy_tail": (800, 600, 2500, 0.3, 0.05),
+        }
+        if name not in presets:
+            raise ValueError(
+                f"Unknown latency preset '{name}', expected one of {list(presets)}"
+            )
+        chat, structured, search, sigma, tail = presets[name]
+        return cls(
+            chat=LatencyDistribution("lognormal", chat * scale, sigma),
+            structured=LatencyDistribution("lognormal", structured * scale, sigma),
+            search=LatencyDistribution("lognormal", search * scale, sigma, tail),
+            seed=seed,
+            max_concurrency=max_concurrency,
+        )
+
+
+class Fixtures:
+    """Recorded responses loaded from a JSON fixture file."""
+
+    def __init__(self, data: Dict[str, Any]):
+        """Wrap the parsed fixture file ``data``."""
+        self.data = data
+
+    @classmethod
+    def load(cls, path: pathlib.Path | None = None) -> "Fixtures":
+        """Load fixtures from ``path`` (defaults to the bundled file)."""
+        with open(path or DEFAULT_FIXTURES, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def pick(self, key: str, text: str) -> Any:
+        """Deterministically select a recorded entry for the given prompt."""
+        entries = self.data[key]
+        return entries[zlib.crc32(text.encode("utf-8")) % len(entries)]
+
+    def questions(self, scenario: str) -> List[str]:
+        """Return the benchmark questions for a scenario."""
+        return self.data["questions"][scenario]
+
+    def references(self, scenario: str) -> Dict[str, str]:
+        """Return the reference answers of a scenario's questions, by question."""
+        return self.data.get("references", {}).get(scenario, {})
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+
+class FakeChatGoogleGenerativeAI(BaseChatModel):
+    """Replay-based stand-in for ``ChatGoogleGenerativeAI``.
+
+    Structured output (``SearchQueryList``, ``Reflection``) and tool calls
+    (``calculator_tool``) are answered with tool-call messages built from the
+    fixtures; plain prompts get a recorded text answer. When the prompt
+    contains citation short URLs, the answer cites some of them so that the
+    URL restoration in ``finalize_answer`` is exercised.
+    """
+
+    model: str = "gemini-2.0-flash"
+    temperature: float | None = None
+    max_retries: int = 2
+    fixtures: Any = None
+    latency: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "temperature": self.temperature}
+
+    def bind_tools(self, tools: List[Any], *, tool_choice: Any = None, **kwargs: Any):
+        """Bind tools in OpenAI format, like the real integration does."""
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, kind = self._respond(messages, kwargs.get("tools") or [])
+        if self.latency is not None:
+            self.latency.wait(kind)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message, kind = self._respond(messages, kwargs.get("tools") or [])
+        if self.latency is not None:
+            await asyncio.sleep(self.latency.sample(kind))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _respond(
+        self, messages: List[BaseMessage], tools: List[Dict[str, Any]]
+    ) -> "tuple[AIMessage, str]":
+        prompt = _prompt_text(messages)
+        tool_names = [tool["function"]["name"] for tool in tools]
+        for name in tool_names:
+            if name in self.fixtures.data and name not in ("search", "answer"):
+                args = dict(self.fixtures.pick(name, prompt))
+                if name == "SearchQueryList":
+                    match = re.search(r"more than (\d+) queries", prompt)
+                    if match:
+                        args["query"] = args["query"][: max(1, int(match.group(1)))]
+                return self._tool_call_message(name, args, prompt), "structured"
+
+        if "calculator_tool" in tool_names:
+            last = messages[-1]
+            if isinstance(last, ToolMessage):
+                human = next(
+                    (m for m in reversed(messages) if isinstance(m, HumanMessage)),
+                    last,
+                )
+                entry = self.fixtures.pick("math", str(human.content))
+                content = entry["answer"].format(result=last.content)
+                return self._text_message(content, prompt), "chat"
+            entry = self.fixtures.pick("math", str(last.content))
+            message = self._tool_call_message(
+                "calculator_tool", {"expression": entry["expression"]}, prompt
+            )
+            return message, "structured"
+
+        short_urls = list(dict.fromkeys(SHORT_URL_PATTERN.findall(prompt)))
+        if short_urls:
+            template = self.fixtures.pick("answer", prompt)
+            parts = template.split("{citations}")
+            content = parts[0]
+            for idx, part in enumerate(parts[1:]):
+                url = short_urls[idx % len(short_urls)]
+                content += f" [source]({url})" + part
+            return self._text_message(content, prompt), "chat"
+
+        return self._text_message(self.fixtures.pick("chat", prompt), prompt), "chat"
+
+    def _tool_call_message(
+        self, name: str, args: Dict[str, Any], prompt: str
+    ) -> AIMessage:
+        call_id = f"call_{zlib.crc32((name + prompt).encode('utf-8')):08x}"
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": call_id}],
+            usage_metadata=self._usage(prompt, json.dumps(args)),
+            response_metadata={"model_name": self.model, "finish_reason": "STOP"},
+        )
+
+    def _text_message(self, content: str, prompt: str) -> AIMessage:
+        return AIMessage(
+            content=content,
+            usage_metadata=self._usage(prompt, content),
+            response_metadata={"model_name": self.model, "finish_reason": "STOP"},
+        )
+
+    @staticmethod
+    def _usage(prompt: str, output: str) -> Dict[str, int]:
+        input_tokens = _estimate_tokens(prompt)
+        output_tokens = _estimate_tokens(output)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+
+class _FakeModels:
+    def __init__(self, fixtures: Fixtures, latency: LatencyProfile | None):
+        self._fixtures = fixtures
+        self._latency = latency
+
+    def _response(self, contents: Any) -> types.GenerateContentResponse:
+        entry = self._fixtures.pick("search", str(contents))
+        return types.GenerateContentResponse.model_validate(entry)
+
+    def generate_content(
+        self, *, model: str, contents: Any, config: Any = None
+    ) -> types.GenerateContentResponse:
+        """Return a recorded grounded-search response."""
+        if self._latency is not None:
+            self._latency.wait("search")
+        return self._response(contents)
+
+
+class _FakeAsyncModels(_FakeModels):
+    async def generate_content(
+        self, *, model: str, contents: Any, config: Any = None
+    ) -> types.GenerateContentResponse:
+        """Return a recorded grounded-search response."""
+        if self._latency is not None:
+            await asyncio.sleep(self._latency.sample("search"))
+        return self._response(contents)
+
+
+class FakeGenaiClient:
+    """Replay-based stand-in for ``google.genai.Client``."""
+
+    def __init__(
+        self,
+        fixtures: Fixtures | None = None,
+        latency: LatencyProfile | None = None,
+    ):
+        """Replay ``fixtures`` (the bundled ones by default) with ``latency``."""
+        fixtures = fixtures or Fixtures.load()
+        self.models = _FakeModels(fixtures, latency)
+        self.aio = type("_FakeAio", (), {})()
+        self.aio.models = _FakeAsyncModels(fixtures, latency)
+
+
+def fake_chat_model_factory(
+    fixtures: Fixtures | None = None, latency: LatencyProfile | None = None
+):
+    """Return a factory suitable for :func:`agent.models.override_models`."""
+    fixtures = fixtures or Fixtures.load()
+
+    def factory(model: str, temperature: float, max_retries: int = 2):
+        return FakeChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            max_retries=max_retries,
+            fixtures=fixtures,
+            latency=latency,
+        )
+
+    return factory
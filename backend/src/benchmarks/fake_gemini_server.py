@@ -0,0 +1,375 @@
+"""Local HTTP stand-in for the Gemini API, for load tests of a deployment.
+
+Serves ``POST /v1beta/models/{model}:generateContent`` and
+``:streamGenerateContent?alt=sse`` in the wire format of the Gemini REST API,
+answering from the fixtures like the fake chat model of
+:mod:`benchmarks.fake_gemini`:
+
+* requests with the ``googleSearch`` tool get a recorded grounded-search
+  response, grounding metadata included;
+* structured output (``responseJsonSchema``) and function declarations get
+  the recorded arguments, as JSON text or a ``functionCall``;
+* other prompts get a recorded text answer.
+
+Responses take ``--latency`` per call kind; streamed responses send their
+first chunk after ``--ttft-fraction`` of it and the rest in ``--chunks``
+chunks. At most ``--max-concurrency`` calls are served at a time, like an API
+quota, and ``--error-rate`` of the calls fail with 429 or 503.
+
+Point the backend at it with ``GEMINI_BASE_URL``::
+
+    python -m benchmarks.fake_gemini_server --port 8766
+    GEMINI_BASE_URL=http://127.0.0.1:8766 GEMINI_API_KEY=fake langgraph dev
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+from benchmarks.fake_gemini import FakeChatGoogleGenerativeAI, Fixtures, LatencyProfile
+
+logger = logging.getLogger(__name__)
+
+_PATH = re.compile(
+    r"^/v1(?:beta|alpha)?/models/([^/:]+):(generateContent|streamGenerateContent)"
+)
+
+
+def to_camel(value: Any) -> Any:
+    """Convert the snake_case keys of a recorded response to the wire format."""
+    if isinstance(value, dict):
+        return {
+            re.sub(r"_([a-z])", lambda m: m.group(1).upper(), key): to_camel(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [to_camel(item) for item in value]
+    return value
+
+
+def _text(parts: List[Dict[str, Any]]) -> str:
+    return "".join(part.get("text", "") for part in parts)
+
+
+def to_messages(body: Dict[str, Any]) -> List[BaseMessage]:
+    """Convert the ``contents`` of a request to LangChain messages."""
+    messages: List[BaseMessage] = []
+    system = (body.get("systemInstruction") or {}).get("parts")
+    if system:
+        messages.append(SystemMessage(content=_text(system)))
+    for content in body.get("contents") or []:
+        parts = content.get("parts") or []
+        calls = [part["functionCall"] for part in parts if "functionCall" in part]
+        results = [
+            part["functionResponse"] for part in parts if "functionResponse" in part
+        ]
+        if content.get("role") == "model":
+            messages.append(
+                AIMessage(
+                    content=_text(parts),
+                    tool_calls=[
+                        {
+                            "name": call["name"],
+                            "args": call.get("args") or {},
+                            "id": call["name"],
+                        }
+                        for call in calls
+                    ],
+                )
+            )
+        elif results:
+            for result in results:
+                response = result.get("response") or {}
+                messages.append(
+                    ToolMessage(
+                        content=str(
+                            response.get("output", response.get("result", response))
+                        ),
+                        tool_call_id=result.get("name", ""),
+                    )
+                )
+        else:
+            messages.append(HumanMessage(content=_text(parts)))
+    return messages
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """HTTP server answering Gemini API calls from the fixtures.
+
+    Args:
+        address: Host and port to listen on; port 0 picks a free port
+        fixtures: Recorded responses
+        latency: Latency per call kind ("chat", "structured", "search")
+        max_concurrency: Calls served at the same time; 0 for no limit
+        chunks: Chunks of a streamed text response
+        ttft_fraction: Share of a streamed call's latency before its first chunk
+        error_rate: Share of calls answered with a transient error
+        seed: Seed of the error injection
+    """
+
+    daemon_threads = True
+    request_queue_size = 512
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        fixtures: Fixtures,
+        latency: LatencyProfile | None = None,
+        max_concurrency: int = 0,
+        chunks: int = 8,
+        ttft_fraction: float = 0.3,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """Create a server on ``address`` answering from ``fixtures``."""
+        super().__init__(address, _GeminiHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.chunks = max(1, chunks)
+        self.ttft_fraction = ttft_fraction
+        self.error_rate = error_rate
+        self._quota = (
+            threading.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        """Return the base url to point ``GEMINI_BASE_URL`` at."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> Dict[str, int]:
+        """Return the calls served so far by kind, and failed ones as ``error``."""
+        with self._lock:
+            return dict(self.calls)
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def injected_error(self) -> Tuple[int, str] | None:
+        """Return the status of an injected error for the current call, if any."""
+        with self._lock:
+            if self.error_rate <= 0 or self._rng.random() >= self.error_rate:
+                return None
+            return self._rng.choice(((429, "RESOURCE_EXHAUSTED"), (503, "UNAVAILABLE")))
+
+    def respond(
+        self, model: str, body: Dict[str, Any], pieces: int = 1
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Return the response chunks of a call and its kind.
+
+        Text answers are split into up to ``pieces`` chunks.
+        """
+        messages = to_messages(body)
+        prompt = "\n".join(str(message.content) for message in messages)
+        tools = body.get("tools") or []
+        if any("googleSearch" in tool or "google_search" in tool for tool in tools):
+            return [to_camel(self.fixtures.pick("search", prompt))], "search"
+
+        declared = [
+            {"function": {"name": declaration["name"]}}
+            for tool in tools
+            for declaration in tool.get("functionDeclarations") or []
+        ]
+        config = body.get("generationConfig") or {}
+        schema = config.get("responseJsonSchema") or config.get("responseSchema")
+        if schema and schema.get("title"):
+            declared.append({"function": {"name": schema["title"]}})
+
+        fake = FakeChatGoogleGenerativeAI(model=model, fixtures=self.fixtures)
+        message, kind = fake._respond(messages, declared)
+        if schema and message.tool_calls:
+            # Structured output answers with JSON text, not a function call
+            chunks = [[{"text": json.dumps(message.tool_calls[0]["args"])}]]
+        elif message.tool_calls:
+            chunks = [
+                [
+                    {"functionCall": {"name": call["name"], "args": call["args"]}}
+                    for call in message.tool_calls
+                ]
+            ]
+        else:
+            words = re.findall(r"\S+\s*", str(message.content)) or [""]
+            size = -(-len(words) // max(1, pieces))
+            chunks = [
+                [{"text": "".join(words[i : i + size])}]
+                for i in range(0, len(words), size)
+            ]
+
+        usage = message.usage_metadata or {}
+        responses = [
+            {
+                "candidates": [
+                    {"content": {"role": "model", "parts": parts}, "index": 0}
+                ],
+                "modelVersion": model,
+            }
+            for parts in chunks
+        ]
+        responses[-1]["candidates"][0]["finishReason"] = "STOP"
+        responses[-1]["usageMetadata"] = {
+            "promptTokenCount": usage.get("input_tokens", 0),
+            "candidatesTokenCount": usage.get("output_tokens", 0),
+            "totalTokenCount": usage.get("total_tokens", 0),
+        }
+        return responses, kind
+
+    def serve_call(
+        self, model: str, body: Dict[str, Any], stream: bool
+    ) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """Yield the delay before each response chunk of a call, and the chunk."""
+        chunks, kind = self.respond(model, body, self.chunks if stream else 1)
+        self._count(kind)
+        delay = self.latency.sample(kind) if self.latency is not None else 0.0
+        if len(chunks) == 1:
+            yield delay, chunks[0]
+            return
+        first = delay * self.ttft_fraction
+        rest = (delay - first) / (len(chunks) - 1)
+        for i, chunk in enumerate(chunks):
+            yield first if i == 0 else rest, chunk
+
+    def acquire(self) -> None:
+        """Wait for a slot of the emulated quota."""
+        if self._quota is not None:
+            self._quota.acquire()
+
+    def release(self) -> None:
+        """Free a slot of the emulated quota."""
+        if self._quota is not None:
+            self._quota.release()
+
+
+class _GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        match = _PATH.match(self.path)
+        if not match:
+            self._send_error(404, "NOT_FOUND", f"Unknown path {self.path}")
+            return
+        model, method = match.groups()
+        try:
+            length = int(self.headers.get("content-length", "0"))
+            body = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_error(400, "INVALID_ARGUMENT", str(e))
+            return
+        server: FakeGeminiServer = self.server
+        error = server.injected_error()
+        if error is not None:
+            server._count("error")
+            self._send_error(error[0], error[1], "Injected error")
+            return
+
+        stream = method == "streamGenerateContent"
+        server.acquire()
+        try:
+            if not stream:
+                ((delay, response),) = server.serve_call(model, body, False)
+                time.sleep(delay)
+                self._send_json(200, response)
+                return
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("transfer-encoding", "chunked")
+            self.end_headers()
+            for delay, chunk in server.serve_call(model, body, True):
+                time.sleep(delay)
+                self._write_chunk(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            self._write_chunk(b"")
+        finally:
+            server.release()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, code: int, status: str, message: str) -> None:
+        error = {"code": code, "message": message, "status": status}
+        self._send_json(code, {"error": error})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+def start_fake_gemini_server(**kwargs: Any) -> FakeGeminiServer:
+    """Start a :class:`FakeGeminiServer` on a free local port in a daemon thread."""
+    server = FakeGeminiServer(("127.0.0.1", kwargs.pop("port", 0)), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_server_arguments(
+    parser: argparse.ArgumentParser, latency_scale: float = 1.0
+) -> None:
+    """Add the options of the fake Gemini server to ``parser``."""
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=latency_scale)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="Emulated quota")
+    parser.add_argument(
+        "--chunks", type=int, default=8, help="Chunks per streamed answer"
+    )
+    parser.add_argument("--ttft-fraction", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def server_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Return the :class:`FakeGeminiServer` arguments of parsed options."""
+    return {
+        "fixtures": Fixtures.load(),
+        "latency": LatencyProfile.preset(args.latency, args.latency_scale, args.seed),
+        "max_concurrency": args.max_concurrency,
+        "chunks": args.chunks,
+        "ttft_fraction": args.ttft_fraction,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+
+
+def main() -> None:
+    """Entry point of the fake Gemini server."""
+    parser = argparse.ArgumentParser(description="Fake Gemini API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer((args.host, args.port), **server_options(args))
+    sys.stdout.write(f"Serving the fake Gemini API at {server.url}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
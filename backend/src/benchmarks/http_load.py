@@ -0,0 +1,340 @@
+"""End-to-end HTTP load test of a deployment against a fake Gemini API.
+
+Starts the fake Gemini server (:mod:`benchmarks.fake_gemini_server`), points
+the backend at it through ``GEMINI_BASE_URL`` and drives runs of each graph
+through the LangGraph HTTP API (``POST /runs/wait``, or ``/runs/stream`` with
+``--stream``) at ramped concurrency: ``--stages`` closed-loop clients per
+stage, each starting a new run as soon as its previous one returns, for
+``--stage-seconds``::
+
+    # Start `langgraph dev` with the fake API and load it
+    python -m benchmarks.http_load --start-api --graph chatbot --graph deep_researcher
+
+    # Load a running deployment started with GEMINI_BASE_URL=http://127.0.0.1:8766
+    python -m benchmarks.http_load --api-url http://127.0.0.1:2024 --gemini-port 8766
+
+For every graph and stage the report has throughput, run latency percentiles
+(and time to the first streamed message), the error rate and the Gemini calls
+served. Per graph it names the saturation point, the concurrency after which
+throughput grows by less than ``--min-gain``, and the collapse point, the
+first concurrency with an error rate above ``--max-error-rate`` or a p95
+latency above ``--collapse-factor`` times that of the first stage.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+import httpx
+
+from benchmarks.fake_gemini import Fixtures
+from benchmarks.fake_gemini_server import (
+    add_server_arguments,
+    server_options,
+    start_fake_gemini_server,
+)
+from benchmarks.scenarios import SCENARIOS
+from benchmarks.stats import summarize_latencies
+
+DEFAULT_API_COMMAND = (
+    "langgraph dev --no-browser --no-reload --host 127.0.0.1 --port {port}"
+)
+BACKEND_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+def start_api(
+    command: str, port: int, gemini_url: str, timeout: float
+) -> subprocess.Popen:
+    """Start the API server with ``command`` and wait until it answers ``GET /ok``."""
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": gemini_url,
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "load-test-fake-key"),
+        "MCP_FILESYSTEM_ENABLED": "false",
+        "MCP_BRAVE_SEARCH_ENABLED": "false",
+        # Every run should reach the fake API
+        "LLM_CACHE_ENABLED": "false",
+    }
+    process = subprocess.Popen(
+        shlex.split(command.format(port=port)),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/ok"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"API server not ready at {url} after {timeout}s")
+
+
+async def run_once(
+    client: httpx.AsyncClient, graph: str, payload: Dict[str, Any], stream: bool
+) -> Dict[str, Any]:
+    """Run a graph once through the API; return its latency, outcome and first message time."""
+    body = {"assistant_id": graph, **payload}
+    start = time.perf_counter()
+    first: float | None = None
+    error: str | None = None
+    try:
+        if stream:
+            body["stream_mode"] = ["messages-tuple", "values"]
+            async with client.stream("POST", "/runs/stream", json=body) as response:
+                if response.status_code >= 400:
+                    error = f"HTTP {response.status_code}"
+                async for line in response.aiter_lines():
+                    if line.startswith("event: messages") and first is None:
+                        first = time.perf_counter() - start
+                    elif line.startswith("event: error"):
+                        error = "run error"
+        else:
+            response = await client.post("/runs/wait", json=body)
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}"
+            elif isinstance(response.json(), dict) and "__error__" in response.json():
+                error = "run error"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return {"latency": time.perf_counter() - start, "first": first, "error": error}
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    graph: str,
+    fixtures: Fixtures,
+    concurrency: int,
+    seconds: float,
+    stream: bool,
+) -> List[Dict[str, Any]]:
+    """Run ``concurrency`` closed-loop clients for ``seconds``; return every run."""
+    scenario = SCENARIOS[graph]
+    deadline = time.perf_counter() + seconds
+    results: List[Dict[str, Any]] = []
+
+    async def loop(worker: int) -> None:
+        i = worker
+        while time.perf_counter() < deadline:
+            payload = {
+                "input": scenario.make_input(fixtures, i),
+                "config": {"configurable": scenario.config},
+            }
+            results.append(await run_once(client, scenario.graph, payload, stream))
+            i += concurrency
+
+    await asyncio.gather(*(loop(worker) for worker in range(concurrency)))
+    return results
+
+
+def summarize_stage(
+    concurrency: int,
+    results: Sequence[Dict[str, Any]],
+    wall: float,
+    calls: Dict[str, int],
+) -> Dict[str, Any]:
+    """Return the throughput, latencies and error rate of a stage."""
+    ok = [result for result in results if result["error"] is None]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["error"] is not None:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+    firsts = [result["first"] for result in ok if result["first"] is not None]
+    return {
+        "concurrency": concurrency,
+        "runs": len(results),
+        "errors": errors,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+        "latency_ms": summarize_latencies([result["latency"] for result in ok]),
+        "first_message_ms": summarize_latencies(firsts) if firsts else None,
+        "gemini_calls": calls,
+    }
+
+
+def find_saturation(
+    stages: Sequence[Dict[str, Any]],
+    min_gain: float,
+    collapse_factor: float,
+    max_error_rate: float,
+) -> Dict[str, Any]:
+    """Return the peak throughput, saturation point and collapse point of a ramp."""
+    if not stages:
+        return {}
+    peak = max(stages, key=lambda stage: stage["throughput_rps"])
+    saturation = None
+    for previous, stage in zip(stages, stages[1:]):
+        if stage["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            saturation = previous["concurrency"]
+            break
+    baseline_p95 = stages[0]["latency_ms"].get("p95") or 0.0
+    collapse = None
+    for stage in stages:
+        p95 = stage["latency_ms"].get("p95") or 0.0
+        if stage["error_rate"] > max_error_rate or (
+            baseline_p95 and p95 > collapse_factor * baseline_p95
+        ):
+            collapse = stage["concurrency"]
+            break
+    return {
+        "peak_throughput_rps": peak["throughput_rps"],
+        "peak_concurrency": peak["concurrency"],
+        "saturation_concurrency": saturation,
+        "collapse_concurrency": collapse,
+    }
+
+
+def _call_delta(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {kind: count - before.get(kind, 0) for kind, count in after.items()}
+
+
+async def load_graph(
+    api_url: str, graph: str, fixtures: Fixtures, server: Any, args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Ramp the concurrency of one graph's runs and report every stage."""
+    stages = []
+    limits = httpx.Limits(max_connections=max(args.stages) + 8)
+    async with httpx.AsyncClient(
+        base_url=api_url, timeout=args.timeout, limits=limits
+    ) as client:
+        # Warm up the graph, its imports and the connection outside the timing
+        scenario = SCENARIOS[graph]
+        await run_once(
+            client,
+            scenario.graph,
+            {
+                "input": scenario.make_input(fixtures, 0),
+                "config": {"configurable": scenario.config},
+            },
+            args.stream,
+        )
+        for concurrency in args.stages:
+            before = server.stats() if server is not None else {}
+            start = time.perf_counter()
+            results = await run_stage(
+                client, graph, fixtures, concurrency, args.stage_seconds, args.stream
+            )
+            wall = time.perf_counter() - start
+            calls = _call_delta(server.stats(), before) if server is not None else {}
+            stage = summarize_stage(concurrency, results, wall, calls)
+            stages.append(stage)
+            sys.stderr.write(
+                f"{graph:<17} c={concurrency:<4} {stage['throughput_rps']:>8.2f} runs/s "
+                f"p50={stage['latency_ms'].get('p50', 0):.0f}ms "
+                f"p95={stage['latency_ms'].get('p95', 0):.0f}ms "
+                f"errors={stage['error_rate']:.1%}\n"
+            )
+            if stage["error_rate"] >= args.abort_error_rate:
+                sys.stderr.write(f"{graph}: stopping the ramp, error rate too high\n")
+                break
+    return {
+        "stages": stages,
+        "saturation": find_saturation(
+            stages, args.min_gain, args.collapse_factor, args.max_error_rate
+        ),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the HTTP load harness."""
+    parser = argparse.ArgumentParser(
+        description="HTTP load test against a fake Gemini API"
+    )
+    parser.add_argument(
+        "--graph",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Graph to load (repeatable, defaults to all)",
+    )
+    parser.add_argument(
+        "--stages",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1, 2, 4, 8, 16, 32],
+        help="Comma-separated concurrency of each stage",
+    )
+    parser.add_argument("--stage-seconds", type=float, default=20.0)
+    parser.add_argument("--stream", action="store_true", help="Use /runs/stream")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds per run")
+    parser.add_argument("--min-gain", type=float, default=0.1)
+    parser.add_argument("--collapse-factor", type=float, default=3.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--abort-error-rate", type=float, default=0.5)
+    parser.add_argument("--api-url", default="http://127.0.0.1:2024")
+    parser.add_argument(
+        "--start-api",
+        action="store_true",
+        help="Start the API server pointed at the fake",
+    )
+    parser.add_argument("--api-command", default=DEFAULT_API_COMMAND)
+    parser.add_argument("--api-port", type=int, default=2024)
+    parser.add_argument("--api-start-timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--gemini-port",
+        type=int,
+        default=0,
+        help="Port of the fake Gemini server; 0 picks a free one",
+    )
+    parser.add_argument(
+        "--no-gemini-server",
+        action="store_true",
+        help="Use a fake Gemini server started separately",
+    )
+    add_server_arguments(parser, latency_scale=0.1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    if not args.no_gemini_server:
+        server = start_fake_gemini_server(port=args.gemini_port, **server_options(args))
+        sys.stderr.write(f"Fake Gemini API at {server.url}\n")
+    api = None
+    api_url = args.api_url
+    if args.start_api:
+        if server is None:
+            parser.error("--start-api needs the fake Gemini server")
+        api = start_api(
+            args.api_command, args.api_port, server.url, args.api_start_timeout
+        )
+        api_url = f"http://127.0.0.1:{args.api_port}"
+
+    fixtures = Fixtures.load()
+    report: Dict[str, Any] = {"meta": vars(args), "graphs": {}}
+    try:
+        for graph in args.graph or sorted(SCENARIOS):
+            report["graphs"][graph] = asyncio.run(
+                load_graph(api_url, graph, fixtures, server, args)
+            )
+            sys.stderr.write(f"{graph}: {report['graphs'][graph]['saturation']}\n")
+    finally:
+        if api is not None:
+            api.terminate()
+            api.wait(timeout=30)
+        if server is not None:
+            server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
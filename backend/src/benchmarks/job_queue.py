@@ -0,0 +1,119 @@
+"""Throughput of the background job queue by worker count.
+
+Queues ``--jobs`` deep researcher jobs and runs them with pools of each
+``--workers`` size against the fake Gemini clients::
+
+    python -m benchmarks.job_queue --jobs 24 --workers 1,2,4,8
+
+The report has the wall time, jobs per second and job latency percentiles of
+each pool size.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from agent.llm_cache import set_llm_cache  # noqa: E402
+from agent.models import override_models  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.stats import summarize_latencies  # noqa: E402
+from jobs import FINISHED, JobStore, JobWorkerPool  # noqa: E402
+
+
+async def run_pool(
+    fixtures: Fixtures, workers: int, jobs: int, directory: str
+) -> Dict[str, Any]:
+    """Run ``jobs`` deep researcher jobs with a pool of ``workers``."""
+    store = JobStore(os.path.join(directory, f"jobs-{workers}.sqlite"))
+    questions = fixtures.questions("deep_researcher")
+    ids = [
+        store.submit(
+            "deep_researcher",
+            {"messages": [{"role": "user", "content": questions[i % len(questions)]}]},
+        )["id"]
+        for i in range(jobs)
+    ]
+    pool = JobWorkerPool(
+        store, workers, poll_interval=0.01, executor_threads=workers * 8
+    )
+    start = time.perf_counter()
+    await pool.start()
+    while True:
+        counts = store.counts()
+        if sum(counts[status] for status in FINISHED) == jobs:
+            break
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    await pool.stop()
+
+    finished = [store.get(job_id) for job_id in ids]
+    store.close()
+    return {
+        "wall_seconds": round(elapsed, 3),
+        "jobs_per_second": round(jobs / elapsed, 2),
+        "failed": sum(1 for job in finished if job["status"] != "succeeded"),
+        "job_latency_ms": summarize_latencies(
+            [job["finished_at"] - job["created_at"] for job in finished]
+        ),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the job queue benchmark."""
+    parser = argparse.ArgumentParser(description="Job queue throughput by worker count")
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument(
+        "--workers", default="1,2,4,8", help="Comma-separated pool sizes"
+    )
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures.load()
+    latency = LatencyProfile.preset(args.latency, args.latency_scale, args.seed)
+    # Every job should reach the emulated API
+    set_llm_cache(None)
+
+    report: Dict[str, Any] = {"meta": vars(args), "pools": {}}
+    with (
+        tempfile.TemporaryDirectory() as directory,
+        override_models(
+            chat_model_factory=fake_chat_model_factory(fixtures, latency),
+            genai_client=FakeGenaiClient(fixtures, latency),
+        ),
+    ):
+        for workers in (int(size) for size in args.workers.split(",")):
+            result = asyncio.run(run_pool(fixtures, workers, args.jobs, directory))
+            report["pools"][workers] = result
+            sys.stderr.write(
+                f"workers={workers:<3} {result['jobs_per_second']:.2f} jobs/s "
+                f"wall={result['wall_seconds']:.2f}s failed={result['failed']}\n"
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
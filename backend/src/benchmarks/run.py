@@ -0,0 +1,256 @@
+r"""Offline benchmark runner for the agent graphs.
+
+Runs each scenario against the recorded fake Gemini clients and writes a JSON
+report with latency percentiles, throughput, peak RSS and per-node timings::
+
+    python -m benchmarks.run --iterations 20 --concurrency 4 --output results.json
+    python -m benchmarks.run --scenario deep_researcher --latency realistic \
+        --latency-scale 0.1 --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# The graphs refuse to import without a key and the MCP agent would spawn
+# npx servers, neither of which is wanted for offline runs.
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from agent.configuration import PERFORMANCE_PROFILES  # noqa: E402
+from agent.llm_cache import create_llm_cache, set_llm_cache  # noqa: E402
+from agent.models import override_models  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.scenarios import SCENARIOS, Scenario  # noqa: E402
+from benchmarks.stats import peak_rss_bytes, summarize_latencies  # noqa: E402
+from telemetry import (  # noqa: E402
+    InMemorySpanExporter,
+    configure_tracing,
+    get_metrics,
+)
+from tools.cache import create_tool_cache, set_tool_cache  # noqa: E402
+
+
+def node_timings(spans: List[Any]) -> Dict[str, Dict[str, float]]:
+    """Aggregate node span durations by node name."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    for span in spans:
+        if span.kind == "node":
+            durations[span.name].append(span.duration)
+    return {
+        name: {**summarize_latencies(values), "total_s": round(sum(values), 4)}
+        for name, values in sorted(durations.items())
+    }
+
+
+def run_scenario(
+    scenario: Scenario,
+    fixtures: Fixtures,
+    iterations: int,
+    concurrency: int,
+    exporter: InMemorySpanExporter,
+    profile: str = "balanced",
+    overrides: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """Run one scenario and return its result dictionary."""
+    graph = scenario.load_graph()
+    config = {
+        "configurable": {
+            **scenario.config,
+            "performance_profile": profile,
+            **(overrides or {}),
+        }
+    }
+
+    # Warm up imports, pydantic schemas and graph caches outside the timing
+    graph.invoke(scenario.make_input(fixtures, 0), config)
+    exporter.clear()
+    get_metrics().reset()
+
+    def run_once(i: int) -> float | None:
+        start = time.perf_counter()
+        try:
+            graph.invoke(scenario.make_input(fixtures, i), config)
+        except Exception as e:
+            sys.stderr.write(f"[{scenario.name}] iteration {i} failed: {e}\n")
+            return None
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(run_once, range(iterations)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = [r for r in results if r is not None]
+    spans = exporter.clear()
+    rss = peak_rss_bytes()
+    return {
+        "performance_profile": profile,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": iterations - len(latencies),
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": summarize_latencies(latencies),
+        "peak_rss_mb": round(rss / 2**20, 1) if rss else None,
+        "llm_calls": sum(1 for span in spans if span.kind == "llm"),
+        "tool_calls": sum(1 for span in spans if span.kind == "tool"),
+        "nodes": node_timings(spans),
+        "metrics": get_metrics().snapshot(),
+    }
+
+
+def parse_override(item: str) -> "tuple[str, Any]":
+    """Parse a ``KEY=VALUE`` override; values are JSON when they parse as such."""
+    key, _, value = item.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    """Render the relative change of key metrics against a baseline report."""
+    lines = [
+        f"{'scenario':<18} {'metric':<16} {'baseline':>12} {'current':>12} {'change':>9}"
+    ]
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        metrics = [
+            ("p50 ms", base["latency_ms"]["p50"], result["latency_ms"]["p50"]),
+            ("p95 ms", base["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            ("p99 ms", base["latency_ms"]["p99"], result["latency_ms"]["p99"]),
+            ("throughput rps", base["throughput_rps"], result["throughput_rps"]),
+        ]
+        for label, before, after in metrics:
+            change = f"{100 * (after - before) / before:+.1f}%" if before else "n/a"
+            lines.append(
+                f"{name:<18} {label:<16} {before:>12.3f} {after:>12.3f} {change:>9}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the benchmark runner."""
+    parser = argparse.ArgumentParser(description="Offline graph benchmarks")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Scenario to run (repeatable, defaults to all)",
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--latency",
+        default="fast",
+        help="Latency preset: none, fast, realistic or heavy_tail",
+    )
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0, help="Multiplier for latencies"
+    )
+    parser.add_argument(
+        "--profile",
+        default="balanced",
+        choices=PERFORMANCE_PROFILES,
+        help="Performance profile passed to every run",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Configurable value passed to every run (repeatable, JSON values)",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        action="store_true",
+        help="Serve repeated deterministic model calls from the response cache",
+    )
+    parser.add_argument(
+        "--tool-cache",
+        action="store_true",
+        help="Serve repeated pure and unchanged-file tool calls from the tool cache",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures", help="Alternative fixture file")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    overrides = dict(parse_override(item) for item in args.set)
+    # Repeated iterations would otherwise be answered from the cache
+    set_llm_cache(create_llm_cache(path="") if args.llm_cache else None)
+    set_tool_cache(create_tool_cache() if args.tool_cache else None)
+    fixtures = Fixtures.load(args.fixtures)
+    latency = LatencyProfile.preset(args.latency, args.latency_scale, args.seed)
+    exporter = InMemorySpanExporter()
+    configure_tracing(exporter)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "latency_scale": args.latency_scale,
+            "seed": args.seed,
+            "performance_profile": args.profile,
+            "overrides": overrides,
+            "llm_cache": args.llm_cache,
+            "tool_cache": args.tool_cache,
+        },
+        "scenarios": {},
+    }
+    with override_models(
+        chat_model_factory=fake_chat_model_factory(fixtures, latency),
+        genai_client=FakeGenaiClient(fixtures, latency),
+    ):
+        for name in args.scenario or sorted(SCENARIOS):
+            result = run_scenario(
+                SCENARIOS[name],
+                fixtures,
+                args.iterations,
+                args.concurrency,
+                exporter,
+                args.profile,
+                overrides,
+            )
+            report["scenarios"][name] = result
+            latency_ms = result["latency_ms"]
+            sys.stderr.write(
+                f"{name:<18} p50={latency_ms['p50']:.1f}ms p95={latency_ms['p95']:.1f}ms "
+                f"p99={latency_ms['p99']:.1f}ms {result['throughput_rps']:.2f} runs/s "
+                f"errors={result['errors']}\n"
+            )
+    configure_tracing()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            sys.stderr.write(compare(report, json.load(f)) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
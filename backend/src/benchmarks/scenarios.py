@@ -0,0 +1,78 @@
+"""Benchmark scenarios, one per graph."""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+from agent.registry import get_graph
+from benchmarks.fake_gemini import Fixtures
+
+
+@dataclass
+class Scenario:
+    """A graph plus a way to build its inputs.
+
+    Attributes:
+        name: Scenario name, also used as the key in the results file
+        graph: Name of the graph in the graph registry
+        make_input: Builds the graph input for the i-th iteration
+        config: Extra ``configurable`` values passed to every run
+    """
+
+    name: str
+    graph: str
+    make_input: Callable[[Fixtures, int], Dict[str, Any]]
+    config: Dict[str, Any] = field(default_factory=dict)
+
+    def load_graph(self) -> Any:
+        """Return the compiled graph."""
+        return get_graph(self.graph)
+
+
+def _question(fixtures: Fixtures, scenario: str, i: int) -> str:
+    questions = fixtures.questions(scenario)
+    return questions[i % len(questions)]
+
+
+def _research_input(fixtures: Fixtures, i: int) -> Dict[str, Any]:
+    return {
+        "messages": [
+            {"role": "user", "content": _question(fixtures, "deep_researcher", i)}
+        ]
+    }
+
+
+def _batch_research_input(fixtures: Fixtures, i: int) -> Dict[str, Any]:
+    questions = fixtures.questions("deep_researcher")
+    return {
+        "questions": [
+            questions[(i + j) % len(questions)] for j in range(len(questions))
+        ]
+    }
+
+
+def _router_input(fixtures: Fixtures, i: int) -> Dict[str, Any]:
+    scenarios = fixtures.data["questions"]
+    questions = [question for name in sorted(scenarios) for question in scenarios[name]]
+    return {"messages": [{"role": "user", "content": questions[i % len(questions)]}]}
+
+
+def _chat_input(scenario: str) -> Callable[[Fixtures, int], Dict[str, Any]]:
+    def make_input(fixtures: Fixtures, i: int) -> Dict[str, Any]:
+        return {
+            "messages": [{"role": "user", "content": _question(fixtures, scenario, i)}]
+        }
+
+    return make_input
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("deep_researcher", "deep_researcher", _research_input),
+        Scenario("batch_researcher", "batch_researcher", _batch_research_input),
+        Scenario("chatbot", "chatbot", _chat_input("chatbot")),
+        Scenario("math_agent", "math_agent", _chat_input("math_agent")),
+        Scenario("mcp_agent", "mcp_agent", _chat_input("mcp_agent")),
+        Scenario("router", "router", _router_input),
+    ]
+}
@@ -0,0 +1,198 @@
+"""Load test of the run scheduler: chat latency while research saturates the quota.
+
+Research workers run deep researcher runs back to back while chat turns
+arrive at a fixed interval. The fake Gemini clients emulate an API quota of
+``--quota`` concurrent calls. Three phases are compared::
+
+    python -m benchmarks.scheduler_load --duration 10 --quota 8
+
+* ``idle``: chat turns alone, the latency to aim for;
+* ``unscheduled``: chat turns queue for the quota behind research calls;
+* ``scheduled``: the scheduler admits ``--quota`` calls at a time, by weighted
+  fair queuing with interactive turns weighted above research, and keeps
+  ``--interactive-reserve`` of them free of research.
+
+The report has chat latencies, completed research runs and the scheduler
+metrics of each phase.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+os.environ.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+os.environ.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+
+from agent.llm_cache import set_llm_cache  # noqa: E402
+from agent.models import override_models  # noqa: E402
+from agent.registry import get_graph  # noqa: E402
+from agent.scheduler import RESEARCH, Scheduler, set_scheduler  # noqa: E402
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGenaiClient,
+    Fixtures,
+    LatencyProfile,
+    fake_chat_model_factory,
+)
+from benchmarks.stats import summarize_latencies  # noqa: E402
+from telemetry import get_metrics  # noqa: E402
+
+
+def run_phase(
+    fixtures: Fixtures,
+    duration: float,
+    research_workers: int,
+    chat_interval: float,
+) -> Dict[str, Any]:
+    """Run chat turns for ``duration`` seconds next to ``research_workers``."""
+    research = get_graph("deep_researcher")
+    chatbot = get_graph("chatbot")
+    research_questions = fixtures.questions("deep_researcher")
+    chat_questions = fixtures.questions("chatbot")
+    stop = threading.Event()
+    research_runs = itertools.count()
+    completed: List[int] = []
+
+    def research_loop(worker: int) -> None:
+        for i in itertools.count():
+            if stop.is_set():
+                return
+            research.invoke(
+                {
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": research_questions[i % len(research_questions)],
+                        }
+                    ],
+                    "initial_search_query_count": 5,
+                },
+                {"configurable": {"tenant_id": f"research-{worker}"}},
+            )
+            completed.append(next(research_runs))
+
+    def chat_turn(i: int) -> float:
+        start = time.perf_counter()
+        chatbot.invoke(
+            {
+                "messages": [
+                    {"role": "user", "content": chat_questions[i % len(chat_questions)]}
+                ]
+            },
+            {"configurable": {"tenant_id": f"chat-{i}"}},
+        )
+        return time.perf_counter() - start
+
+    get_metrics().reset()
+    workers = [
+        threading.Thread(target=research_loop, args=(worker,), daemon=True)
+        for worker in range(research_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    # Let the research fan-out fill the quota before the first chat turn
+    time.sleep(min(1.0, duration / 5) if research_workers else 0)
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        deadline = time.perf_counter() + duration
+        for i in itertools.count():
+            if time.perf_counter() >= deadline:
+                break
+            futures.append(executor.submit(chat_turn, i))
+            time.sleep(chat_interval)
+        latencies = [future.result() for future in futures]
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    metrics = get_metrics().snapshot()
+    return {
+        "chat_latency_ms": summarize_latencies(latencies),
+        "research_runs": len(completed),
+        "scheduler_wait_seconds": metrics.get("scheduler_wait_seconds", {}).get(
+            "values", []
+        ),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the scheduler load test."""
+    parser = argparse.ArgumentParser(description="Chat latency under research load")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--research-workers", type=int, default=6)
+    parser.add_argument("--chat-interval", type=float, default=0.25)
+    parser.add_argument("--quota", type=int, default=8, help="Concurrent API calls")
+    parser.add_argument("--tenant-limit", type=int, default=4)
+    parser.add_argument(
+        "--interactive-reserve",
+        type=int,
+        default=2,
+        help="Slots of the quota research may not use",
+    )
+    parser.add_argument(
+        "--weights",
+        default='{"interactive": 8, "research": 1}',
+        help="Priority class weights as JSON",
+    )
+    parser.add_argument("--latency", default="realistic")
+    parser.add_argument("--latency-scale", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    fixtures = Fixtures.load()
+    latency = LatencyProfile.preset(
+        args.latency, args.latency_scale, args.seed, max_concurrency=args.quota
+    )
+    # Every call should reach the emulated API
+    set_llm_cache(None)
+
+    phases = {
+        "idle": (0, Scheduler()),
+        "unscheduled": (args.research_workers, Scheduler()),
+        "scheduled": (
+            args.research_workers,
+            Scheduler(
+                args.quota,
+                json.loads(args.weights),
+                args.tenant_limit,
+                {RESEARCH: max(1, args.quota - args.interactive_reserve)},
+            ),
+        ),
+    }
+    report: Dict[str, Any] = {"meta": vars(args), "phases": {}}
+    with override_models(
+        chat_model_factory=fake_chat_model_factory(fixtures, latency),
+        genai_client=FakeGenaiClient(fixtures, latency),
+    ):
+        for name, (research_workers, scheduler) in phases.items():
+            set_scheduler(scheduler)
+            result = run_phase(
+                fixtures, args.duration, research_workers, args.chat_interval
+            )
+            report["phases"][name] = result
+            chat = result["chat_latency_ms"]
+            sys.stderr.write(
+                f"{name:<12} chat p50={chat['p50']:.1f}ms p95={chat['p95']:.1f}ms "
+                f"turns={chat['count']} research_runs={result['research_runs']}\n"
+            )
+    set_scheduler(Scheduler())
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Startup-time benchmark based on ``python -X importtime``.
+
+Measures, in fresh interpreters, how long it takes to import the ``agent``
+package and to load each graph through the registry, and which heavy
+dependencies were pulled in::
+
+    python -m benchmarks.startup --repeat 3 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from agent.registry import GRAPHS
+from benchmarks.stats import percentile
+
+HEAVY_MODULES = ("langchain_google_genai", "google.genai", "langchain_mcp_adapters")
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse ``-X importtime`` output into self/cumulative times per module."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append(
+                {
+                    "module": name,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+    return modules
+
+
+def measure(code: str) -> Dict[str, Any]:
+    """Run ``code`` in a fresh interpreter with ``-X importtime``."""
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+    env.setdefault("MCP_FILESYSTEM_ENABLED", "false")
+    env.setdefault("MCP_BRAVE_SEARCH_ENABLED", "false")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    modules = parse_importtime(result.stderr)
+    top_level = [m for m in modules if m["depth"] == 0]
+    imported = {m["module"] for m in modules}
+    return {
+        "ok": result.returncode == 0,
+        "total_ms": round(sum(m["cumulative_us"] for m in top_level) / 1000, 2),
+        "modules": len(modules),
+        "heavy_imports": [
+            name
+            for name in HEAVY_MODULES
+            if any(m == name or m.startswith(name + ".") for m in imported)
+        ],
+        "slowest": sorted(modules, key=lambda m: -m["self_us"])[:10],
+        "error": None if result.returncode == 0 else result.stderr.strip()[-500:],
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the startup benchmark."""
+    parser = argparse.ArgumentParser(description="Import-time startup benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    cases = {"import agent": "import agent"}
+    for name in GRAPHS:
+        cases[f"load {name}"] = (
+            f"from agent.registry import get_graph; get_graph({name!r})"
+        )
+
+    report: Dict[str, Any] = {}
+    for label, code in cases.items():
+        runs = [measure(code) for _ in range(args.repeat)]
+        totals = [run["total_ms"] for run in runs]
+        report[label] = {
+            "ok": all(run["ok"] for run in runs),
+            "median_ms": round(percentile(totals, 50), 2),
+            "min_ms": min(totals),
+            "modules": runs[-1]["modules"],
+            "heavy_imports": runs[-1]["heavy_imports"],
+            "slowest": runs[-1]["slowest"],
+            "error": runs[-1]["error"],
+        }
+        sys.stderr.write(
+            f"{label:<24} {report[label]['median_ms']:>9.1f} ms  "
+            f"heavy={report[label]['heavy_imports']}\n"
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""SQLite checkpointers, optionally writing behind the graph in batches."""
+
+import os
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.pregel import Pregel
+
+from .sqlite import SqliteCheckpointSaver
+from .write_behind import DURABILITY_MODES, WriteBehindCheckpointSaver
+
+
+def create_checkpointer(
+    path: str | None = None,
+    write_behind: bool | None = None,
+    durability: str | None = None,
+    flush_interval_ms: float | None = None,
+) -> BaseCheckpointSaver:
+    """Create the SQLite checkpointer, configured from the environment by default.
+
+    Args:
+        path: Database file (``CHECKPOINT_DB``, default ``checkpoints.sqlite``)
+        write_behind: Buffer writes and flush them in batches
+            (``CHECKPOINT_WRITE_BEHIND``, default true)
+        durability: Write-behind durability mode (``CHECKPOINT_DURABILITY``,
+            default ``interrupt``)
+        flush_interval_ms: Write-behind flush interval
+            (``CHECKPOINT_FLUSH_INTERVAL_MS``, default 50)
+    """
+    if path is None:
+        path = os.getenv("CHECKPOINT_DB", "checkpoints.sqlite")
+    if write_behind is None:
+        write_behind = os.getenv("CHECKPOINT_WRITE_BEHIND", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    saver = SqliteCheckpointSaver(path)
+    if not write_behind:
+        return saver
+    return WriteBehindCheckpointSaver(
+        saver,
+        flush_interval=(
+            flush_interval_ms
+            if flush_interval_ms is not None
+            else float(os.getenv("CHECKPOINT_FLUSH_INTERVAL_MS", "50"))
+        )
+        / 1000,
+        durability=durability or os.getenv("CHECKPOINT_DURABILITY", "interrupt"),
+    )
+
+
+def attach_checkpointer(graph: Pregel, checkpointer: BaseCheckpointSaver) -> Pregel:
+    """Return a copy of a compiled graph that persists through ``checkpointer``.
+
+    Write-behind savers are also flushed whenever a run of the graph ends.
+    """
+    graph = graph.copy(update={"checkpointer": checkpointer})
+    if isinstance(checkpointer, WriteBehindCheckpointSaver):
+        graph = graph.with_config(callbacks=[checkpointer.run_end_handler])
+    return graph
+
+
+__all__ = [
+    "DURABILITY_MODES",
+    "SqliteCheckpointSaver",
+    "WriteBehindCheckpointSaver",
+    "attach_checkpointer",
+    "create_checkpointer",
+]
@@ -0,0 +1,384 @@
+"""Checkpoint saver backed by a local SQLite database in WAL mode."""
+
+import asyncio
+import random
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Constant statement texts, so sqlite3's statement cache reuses the prepared
+# statements across calls
+_INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata_type, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_WRITE = (
+    "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+    "idx, channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_UPSERT_WRITE = _INSERT_WRITE.replace("INSERT OR IGNORE", "INSERT OR REPLACE")
+_SELECT_COLUMNS = (
+    "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+    "checkpoint, metadata_type, metadata FROM checkpoints"
+)
+_SELECT_WRITES = (
+    "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? "
+    "AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx"
+)
+
+# Rows produced by serialize_checkpoint / serialize_writes
+CheckpointRow = Tuple[str, str, str, str | None, str, bytes, str, bytes]
+WriteRow = Tuple[str, str, str, str, int, str, str, bytes, str]
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Synchronous checkpoint saver storing every checkpoint in SQLite.
+
+    The database runs in WAL mode so readers never block the writer. Each
+    ``put``/``put_writes`` is its own transaction; :meth:`put_batch` writes
+    many checkpoints and writes in a single transaction and is what
+    :class:`checkpointing.WriteBehindCheckpointSaver` flushes through.
+
+    Args:
+        path: Database file, or ``":memory:"``
+        synchronous: SQLite ``synchronous`` pragma. ``NORMAL`` is durable
+            against application crashes in WAL mode; ``FULL`` also survives
+            power loss
+        serde: Optional checkpoint serializer
+    """
+
+    def __init__(
+        self, path: str = "checkpoints.sqlite", synchronous: str = "NORMAL", serde=None
+    ):
+        """Open (or create) the database at ``path``."""
+        super().__init__(serde=serde)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, cached_statements=64
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> "SqliteCheckpointSaver":
+        """Return the saver itself."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Close the database connection."""
+        self.close()
+
+    # Serialization, shared with the write-behind buffer so it can serialize
+    # outside of the database lock
+
+    def serialize_checkpoint(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> CheckpointRow:
+        """Serialize a ``put`` call into a ``checkpoints`` row."""
+        configurable = config["configurable"]
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        return (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            checkpoint["id"],
+            configurable.get("checkpoint_id"),
+            type_,
+            data,
+            metadata_type,
+            metadata_data,
+        )
+
+    def serialize_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> List[WriteRow]:
+        """Serialize a ``put_writes`` call into ``writes`` rows."""
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    configurable["thread_id"],
+                    configurable.get("checkpoint_ns", ""),
+                    configurable["checkpoint_id"],
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    data,
+                    task_path,
+                )
+            )
+        return rows
+
+    def put_batch(
+        self, checkpoints: Sequence[CheckpointRow], writes: Sequence[WriteRow]
+    ) -> None:
+        """Insert serialized checkpoints and writes in one transaction.
+
+        Special writes (errors, interrupts, resumes) replace earlier ones for
+        the same task; regular writes are only stored once, as in the other
+        LangGraph savers.
+        """
+        regular = [row for row in writes if row[4] >= 0]
+        special = [row for row in writes if row[4] < 0]
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                if checkpoints:
+                    self.conn.executemany(_INSERT_CHECKPOINT, checkpoints)
+                if regular:
+                    self.conn.executemany(_INSERT_WRITE, regular)
+                if special:
+                    self.conn.executemany(_UPSERT_WRITE, special)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # BaseCheckpointSaver interface
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint and return the config pointing at it."""
+        self.put_batch([self.serialize_checkpoint(config, checkpoint, metadata)], [])
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the intermediate writes of a task."""
+        self.put_batch([], self.serialize_writes(config, writes, task_id, task_path))
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Return the requested checkpoint, or the latest one of the thread."""
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    _SELECT_COLUMNS + " WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    _SELECT_COLUMNS + " WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            writes = self.conn.execute(_SELECT_WRITES, row[:3]).fetchall()
+        return self._to_tuple(row, writes)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+        clauses, params = [], []
+        if config is not None:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if (checkpoint_ns := configurable.get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = _SELECT_COLUMNS
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        yielded = 0
+        for row in rows:
+            if limit is not None and yielded >= limit:
+                break
+            with self._lock:
+                writes = self.conn.execute(_SELECT_WRITES, row[:3]).fetchall()
+            checkpoint_tuple = self._to_tuple(row, writes)
+            if filter and not all(
+                checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()
+            ):
+                continue
+            yielded += 1
+            yield checkpoint_tuple
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint and write of a thread."""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            )
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("COMMIT")
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        """Return a monotonically increasing string version, as InMemorySaver."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def _to_tuple(self, row: CheckpointRow, writes: List[Tuple]) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id = row[:4]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((row[4], row[5])),
+            metadata=self.serde.loads_typed((row[6], row[7])),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    # Async interface: SQLite calls run in the default executor
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Asynchronous version of :meth:`get_tuple`."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Asynchronous version of :meth:`list`."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Asynchronous version of :meth:`put`."""
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Asynchronous version of :meth:`put_writes`."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Asynchronous version of :meth:`delete_thread`."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,324 @@
+"""Write-behind checkpointing: buffer checkpoint writes and flush them in batches.
+
+LangGraph saves a checkpoint after every superstep and the writes of every
+task, so the parallel ``web_research`` branches of the deep researcher turn
+into many small transactions per run. :class:`WriteBehindCheckpointSaver`
+serializes each write immediately but only appends it to an in-memory buffer;
+a background thread flushes the buffer in a single transaction every
+``flush_interval`` seconds, when it reaches ``max_batch`` rows, and at the end
+of every run.
+
+Durability modes:
+
+* ``batched``: flush on the interval, the batch size and at run end. A crash
+  loses at most the last ``flush_interval`` seconds of checkpoints.
+* ``interrupt``: additionally flush synchronously whenever a task interrupts
+  (human-in-the-loop), so a paused thread is always resumable.
+* ``sync``: flush on every write; equivalent to the underlying saver.
+"""
+
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.serde.types import INTERRUPT
+
+from .sqlite import CheckpointRow, SqliteCheckpointSaver, WriteRow
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("batched", "interrupt", "sync")
+
+
+class WriteBehindCheckpointSaver(BaseCheckpointSaver[str]):
+    """Buffer checkpoint writes in memory and flush them to ``saver`` in batches.
+
+    Reads (``get_tuple``, ``list``) and deletes flush the buffer first, so they
+    always observe every write made so far.
+
+    Args:
+        saver: Underlying saver providing ``put_batch``
+        flush_interval: Seconds between background flushes
+        max_batch: Buffered rows that trigger an early flush
+        durability: One of ``batched``, ``interrupt`` or ``sync``
+    """
+
+    def __init__(
+        self,
+        saver: SqliteCheckpointSaver,
+        flush_interval: float = 0.05,
+        max_batch: int = 512,
+        durability: str = "interrupt",
+    ):
+        """Buffer the writes of ``saver`` and start flushing them in the background."""
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unknown durability '{durability}', expected one of {DURABILITY_MODES}"
+            )
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.durability = durability
+        self.run_end_handler = _FlushOnRunEndHandler(self)
+
+        self._checkpoints: List[CheckpointRow] = []
+        self._writes: List[WriteRow] = []
+        self._buffer_lock = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stats = {"flushes": 0, "checkpoints": 0, "writes": 0, "max_batch": 0}
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        atexit.register(self.flush)
+
+    # Buffering and flushing
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is None and self.durability != "sync":
+            with self._buffer_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._flush_loop, name="checkpoint-flusher", daemon=True
+                    )
+                    self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._buffer_lock:
+                self._buffer_lock.wait(self.flush_interval)
+                if self._closed:
+                    return
+                pending = self._checkpoints or self._writes
+            if pending:
+                try:
+                    self.flush()
+                except Exception as e:
+                    # The rows stay buffered and are retried on the next tick
+                    logger.error(f"Background checkpoint flush failed: {e}")
+
+    def _enqueue(
+        self, checkpoints: Sequence[CheckpointRow], writes: Sequence[WriteRow]
+    ) -> bool:
+        """Buffer rows and return whether the caller must flush synchronously."""
+        self._ensure_flusher()
+        with self._buffer_lock:
+            self._checkpoints.extend(checkpoints)
+            self._writes.extend(writes)
+            if len(self._checkpoints) + len(self._writes) >= self.max_batch:
+                self._buffer_lock.notify()
+        if self.durability == "sync":
+            return True
+        return self.durability == "interrupt" and any(
+            row[5] == INTERRUPT for row in writes
+        )
+
+    def pending(self) -> int:
+        """Return the number of buffered rows."""
+        with self._buffer_lock:
+            return len(self._checkpoints) + len(self._writes)
+
+    def flush(self) -> None:
+        """Write every buffered row to the underlying saver in one transaction."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                checkpoints, self._checkpoints = self._checkpoints, []
+                writes, self._writes = self._writes, []
+            if not checkpoints and not writes:
+                return
+            try:
+                self.saver.put_batch(checkpoints, writes)
+            except BaseException:
+                with self._buffer_lock:
+                    self._checkpoints[:0] = checkpoints
+                    self._writes[:0] = writes
+                raise
+            self._stats["flushes"] += 1
+            self._stats["checkpoints"] += len(checkpoints)
+            self._stats["writes"] += len(writes)
+            self._stats["max_batch"] = max(
+                self._stats["max_batch"], len(checkpoints) + len(writes)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Return flush counters: flushes, rows flushed and the largest batch."""
+        return {**self._stats, "pending": self.pending()}
+
+    def close(self) -> None:
+        """Stop the background flusher, flush and close the underlying saver."""
+        with self._buffer_lock:
+            self._closed = True
+            self._buffer_lock.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.flush)
+        self.saver.close()
+
+    def __enter__(self) -> "WriteBehindCheckpointSaver":
+        """Return the saver itself."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Flush the buffer and close the underlying saver."""
+        self.close()
+
+    # BaseCheckpointSaver interface
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Buffer a checkpoint and return the config pointing at it."""
+        row = self.saver.serialize_checkpoint(config, checkpoint, metadata)
+        if self._enqueue([row], []):
+            self.flush()
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Buffer the intermediate writes of a task."""
+        rows = self.saver.serialize_writes(config, writes, task_id, task_path)
+        if self._enqueue([], rows):
+            self.flush()
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Flush the buffer, then read from the underlying saver."""
+        self.flush()
+        return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Flush the buffer, then list from the underlying saver."""
+        self.flush()
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Flush the buffer, then delete the thread from the underlying saver."""
+        self.flush()
+        self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        """Return the next version of the underlying saver."""
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Asynchronous version of :meth:`get_tuple`."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Asynchronous version of :meth:`list`."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Buffer a checkpoint, flushing in a thread if the durability mode requires it."""
+        row = self.saver.serialize_checkpoint(config, checkpoint, metadata)
+        if self._enqueue([row], []):
+            await asyncio.to_thread(self.flush)
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Buffer intermediate writes, flushing in a thread if required."""
+        rows = self.saver.serialize_writes(config, writes, task_id, task_path)
+        if self._enqueue([], rows):
+            await asyncio.to_thread(self.flush)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Asynchronous version of :meth:`delete_thread`."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class _FlushOnRunEndHandler(BaseCallbackHandler):
+    """Flush a write-behind saver when a top-level graph run finishes."""
+
+    run_inline = True
+
+    def __init__(self, saver: WriteBehindCheckpointSaver):
+        self.saver = saver
+
+    def _flush(self, parent_run_id: UUID | None) -> None:
+        if parent_run_id is None:
+            try:
+                self.saver.flush()
+            except Exception as e:
+                logger.error(f"Checkpoint flush at run end failed: {e}")
+
+    def on_chain_end(
+        self,
+        outputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._flush(parent_run_id)
+
+    def on_chain_error(
+        self,
+        error: BaseException,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._flush(parent_run_id)
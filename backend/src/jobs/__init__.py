@@ -0,0 +1,130 @@
+"""Background jobs: graph runs submitted now and collected later.
+
+``POST /jobs`` queues a run of a graph (the deep researcher by default) in a
+local SQLite database and returns its id at once; a pool of asyncio workers,
+on an event loop and executor of its own in the server process, runs the
+queued jobs, ``JOBS_WORKERS`` at a time.
+Clients poll ``GET /jobs/{id}`` and fetch ``GET /jobs/{id}/result`` instead
+of holding a stream open for the whole run.
+
+* ``POST /jobs/{id}/cancel`` cancels a queued job, or stops a running one
+  after the node it is executing finishes;
+* ``POST /jobs/{id}/retry`` queues a failed or cancelled job again. Transient
+  errors are retried automatically up to the job's ``max_attempts``;
+* a running job holds a lease of ``JOBS_LEASE_SECONDS`` that its pool keeps
+  renewing. Jobs whose pool is gone, e.g. a stopped or crashed server, are
+  queued again by any pool once their lease expires, or failed if they have
+  no attempts left. With ``JOBS_CHECKPOINT`` on, a retried job resumes from
+  its last checkpoint (``CHECKPOINT_DB``).
+
+Metrics at ``GET /metrics``: ``jobs_total`` and ``job_duration_seconds`` by
+graph and status, ``jobs_running`` and ``jobs_queued`` gauges.
+"""
+
+import os
+import threading
+
+from checkpointing import create_checkpointer
+
+from .store import (
+    CANCELLED,
+    FAILED,
+    FINISHED,
+    QUEUED,
+    RUNNING,
+    STATUSES,
+    SUCCEEDED,
+    JobNotFoundError,
+    JobStateError,
+    JobStore,
+)
+from .workers import JobWorkerPool, job_result, to_jsonable
+
+
+def create_job_pool(
+    path: str | None = None,
+    workers: int | None = None,
+    poll_interval: float | None = None,
+    checkpoint: bool | None = None,
+    executor_threads: int | None = None,
+    lease_seconds: float | None = None,
+) -> JobWorkerPool:
+    """Create the job queue and its workers, configured from the environment by default.
+
+    Args:
+        path: Queue database (``JOBS_DB``, default ``jobs.sqlite``)
+        workers: Jobs run at the same time (``JOBS_WORKERS``, default 2)
+        poll_interval: Seconds between polls of idle workers
+            (``JOBS_POLL_INTERVAL_SECONDS``, default 0.5)
+        checkpoint: Persist job runs with the checkpointer so retries resume
+            (``JOBS_CHECKPOINT``, default true)
+        executor_threads: Threads running the synchronous graph nodes of all
+            jobs (``JOBS_EXECUTOR_THREADS``, default 8 per worker)
+        lease_seconds: Time a running job stays owned by its pool without a
+            heartbeat (``JOBS_LEASE_SECONDS``, default 30)
+    """
+    if path is None:
+        path = os.getenv("JOBS_DB", "jobs.sqlite")
+    if workers is None:
+        workers = int(os.getenv("JOBS_WORKERS", "2"))
+    if poll_interval is None:
+        poll_interval = float(os.getenv("JOBS_POLL_INTERVAL_SECONDS", "0.5"))
+    if checkpoint is None:
+        checkpoint = os.getenv("JOBS_CHECKPOINT", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    if executor_threads is None:
+        executor_threads = int(os.getenv("JOBS_EXECUTOR_THREADS", str(workers * 8)))
+    if lease_seconds is None:
+        lease_seconds = float(os.getenv("JOBS_LEASE_SECONDS", "30"))
+    return JobWorkerPool(
+        JobStore(path),
+        workers,
+        poll_interval,
+        create_checkpointer() if checkpoint else None,
+        executor_threads=executor_threads,
+        lease_seconds=lease_seconds,
+    )
+
+
+_pool: JobWorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_job_pool() -> JobWorkerPool:
+    """Return the process-wide job worker pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = create_job_pool()
+    return _pool
+
+
+def set_job_pool(pool: JobWorkerPool | None) -> None:
+    """Replace the process-wide job worker pool."""
+    global _pool
+    with _pool_lock:
+        _pool = pool
+
+
+__all__ = [
+    "CANCELLED",
+    "FAILED",
+    "FINISHED",
+    "QUEUED",
+    "RUNNING",
+    "STATUSES",
+    "SUCCEEDED",
+    "JobNotFoundError",
+    "JobStateError",
+    "JobStore",
+    "JobWorkerPool",
+    "create_job_pool",
+    "get_job_pool",
+    "job_result",
+    "set_job_pool",
+    "to_jsonable",
+]
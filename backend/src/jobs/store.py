@@ -0,0 +1,300 @@
+"""Persistent job queue backed by a local SQLite database in WAL mode."""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    graph TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input TEXT NOT NULL,
+    config TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 1,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+_COLUMNS = (
+    "id, graph, status, input, config, result, error, attempts, max_attempts, "
+    "cancel_requested, worker, created_at, started_at, finished_at, lease_expires_at"
+)
+
+
+class JobNotFoundError(KeyError):
+    """Raised when no job has the requested id."""
+
+
+class JobStateError(RuntimeError):
+    """Raised when a job cannot make the requested transition."""
+
+
+class JobStore:
+    """Queue of graph runs with their status, attempts and results.
+
+    Every transition is a single conditional ``UPDATE``, so several worker
+    pools, also in other processes, can share one database. A claimed job
+    holds a lease that its pool renews with :meth:`heartbeat`; only jobs whose
+    lease expired count as abandoned and are queued again.
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) the queue database at ``path``."""
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_expires_at" not in columns:
+            # Queues created before jobs had leases
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _row(self, job_id: str) -> Dict[str, Any] | None:
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return _to_job(row) if row else None
+
+    def submit(
+        self,
+        graph: str,
+        input: Dict[str, Any],
+        config: Dict[str, Any] | None = None,
+        max_attempts: int = 1,
+    ) -> Dict[str, Any]:
+        """Queue a run of ``graph`` and return the new job."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, graph, status, input, config, max_attempts, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    graph,
+                    QUEUED,
+                    json.dumps(input),
+                    json.dumps(config or {}),
+                    max(1, max_attempts),
+                    time.time(),
+                ),
+            )
+            return self._row(job_id)
+
+    def claim(self, worker: str, lease_seconds: float = 30.0) -> Dict[str, Any] | None:
+        """Move the oldest queued job to ``running`` and return it, if any.
+
+        Args:
+            worker: Id of the claiming worker, unique across processes
+            lease_seconds: Time the job stays claimed without a heartbeat
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                f"started_at = ?, finished_at = NULL, error = NULL, "
+                f"lease_expires_at = ? "
+                f"WHERE id = (SELECT id FROM jobs WHERE status = ? "
+                f"ORDER BY created_at LIMIT 1) AND status = ? RETURNING {_COLUMNS}",
+                (RUNNING, worker, now, now + lease_seconds, QUEUED, QUEUED),
+            ).fetchone()
+        return _to_job(row) if row else None
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """Return a job.
+
+        Raises:
+            JobNotFoundError: If no job has the id
+        """
+        with self._lock:
+            job = self._row(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    def list(self, status: str | None = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recent jobs, optionally only those with ``status``."""
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(
+                query + " ORDER BY created_at DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [_to_job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {status: 0 for status in STATUSES} | dict(rows)
+
+    def complete(self, job_id: str, result: Any) -> bool:
+        """Store the result of a running job; False if it is no longer running."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? "
+                "WHERE id = ? AND status = ?",
+                (SUCCEEDED, json.dumps(result), time.time(), job_id, RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: str, error: str, requeue: bool = False) -> bool:
+        """Record the error of a running job, queueing it again if ``requeue``."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = ?",
+                (
+                    QUEUED if requeue else FAILED,
+                    error,
+                    None if requeue else time.time(),
+                    job_id,
+                    RUNNING,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued job, or ask the worker of a running job to stop it.
+
+        Raises:
+            JobNotFoundError: If no job has the id
+            JobStateError: If the job already finished
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ? "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+            job = self._row(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        if job["status"] in (SUCCEEDED, FAILED):
+            raise JobStateError(f"Job {job_id} already {job['status']}")
+        return job
+
+    def mark_cancelled(self, job_id: str) -> bool:
+        """Finish a running job whose cancellation the worker carried out."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, RUNNING),
+            )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, job_ids: List[str]) -> List[str]:
+        """Return the ids among ``job_ids`` whose cancellation was requested."""
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN "
+                f"({', '.join('?' * len(job_ids))})",
+                job_ids,
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def retry(self, job_id: str) -> Dict[str, Any]:
+        """Queue a failed or cancelled job again, with one more attempt allowed.
+
+        Raises:
+            JobNotFoundError: If no job has the id
+            JobStateError: If the job is not failed or cancelled
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 0, error = NULL, "
+                "finished_at = NULL, max_attempts = MAX(max_attempts, attempts + 1) "
+                "WHERE id = ? AND status IN (?, ?)",
+                (QUEUED, job_id, FAILED, CANCELLED),
+            )
+            job = self._row(job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        if not cursor.rowcount:
+            raise JobStateError(
+                f"Job {job_id} is {job['status']}, not failed or cancelled"
+            )
+        return job
+
+    def heartbeat(self, owner: str, lease_seconds: float = 30.0) -> int:
+        """Renew the leases of the running jobs of workers whose id starts with ``owner``."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? "
+                "WHERE status = ? AND substr(worker, 1, ?) = ?",
+                (time.time() + lease_seconds, RUNNING, len(owner), owner),
+            ).rowcount
+
+    def requeue_abandoned(self) -> int:
+        """Queue running jobs again whose lease expired, e.g. after a crash.
+
+        Jobs of live pools, in this process or another, keep their leases.
+        Abandoned jobs that used up their ``max_attempts`` fail instead, so a
+        job that takes its worker down is not run again and again.
+
+        Returns:
+            The number of jobs queued again
+        """
+        now = time.time()
+        expired = "status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                f"WHERE {expired} AND attempts >= max_attempts",
+                (FAILED, "Worker lost after the last attempt", now, RUNNING, now),
+            )
+            return self._conn.execute(
+                f"UPDATE jobs SET status = ? WHERE {expired}",
+                (QUEUED, RUNNING, now),
+            ).rowcount
+
+
+def _to_job(row: tuple) -> Dict[str, Any]:
+    job = dict(zip([column.strip() for column in _COLUMNS.split(",")], row))
+    job["input"] = json.loads(job["input"])
+    job["config"] = json.loads(job["config"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    job["cancel_requested"] = bool(job["cancel_requested"])
+    return job
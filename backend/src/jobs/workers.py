@@ -0,0 +1,300 @@
+"""Pool of asyncio workers running queued jobs through the agent graphs."""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from agent.registry import get_graph
+from agent.retry import is_transient
+from checkpointing import attach_checkpointer
+from telemetry import get_metrics
+
+from .store import CANCELLED, FAILED, SUCCEEDED, JobStore
+
+logger = logging.getLogger(__name__)
+
+# Channels left out of job results: opaque indexes, not answers
+_EXCLUDED_CHANNELS = ("knowledge_store",)
+
+_DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert a graph output to JSON-serializable values."""
+    if isinstance(value, BaseMessage):
+        return {"type": value.type, "content": value.content, "id": value.id}
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def job_result(output: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the stored result of a graph output: its answer and its channels."""
+    messages = output.get("messages") or []
+    answer = messages[-1].content if messages else output.get("answers")
+    return {
+        "answer": to_jsonable(answer),
+        "output": to_jsonable(
+            {
+                key: value
+                for key, value in output.items()
+                if key not in _EXCLUDED_CHANNELS
+            }
+        ),
+    }
+
+
+class JobWorkerPool:
+    """Run queued jobs on ``workers`` concurrent asyncio workers.
+
+    Each job runs with the job id as ``thread_id``. With a checkpointer, a job
+    retried after a failure or a restart resumes from its last checkpoint
+    instead of starting over.
+
+    The workers run on an event loop of their own, in a background thread,
+    whose default executor runs the graphs' synchronous nodes; the loop that
+    calls :meth:`start` is left as it is. The pool has a process-unique
+    ``worker_id`` and renews the leases of the jobs it runs, so that pools
+    sharing the store only requeue the jobs of pools that are gone.
+
+    Args:
+        store: The job queue
+        workers: Number of jobs run at the same time
+        poll_interval: Seconds between queue polls of an idle worker, and
+            between checks for cancellation requests
+        checkpointer: Persists the runs of the jobs' graphs
+        graph_factory: Returns the compiled graph of a name; the graph
+            registry by default
+        executor_threads: Threads running the graphs' synchronous nodes; 0
+            for asyncio's default size
+        lease_seconds: Time a claimed job stays owned by the pool without a
+            heartbeat; heartbeats are sent every third of it
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 2,
+        poll_interval: float = 0.5,
+        checkpointer: BaseCheckpointSaver | None = None,
+        graph_factory: Callable[[str], Any] = get_graph,
+        executor_threads: int = 0,
+        lease_seconds: float = 30.0,
+    ):
+        """Create a stopped pool; :meth:`start` runs its workers."""
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.checkpointer = checkpointer
+        self.graph_factory = graph_factory
+        self.executor_threads = executor_threads
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._graphs: Dict[str, Any] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        # Queue updates, kept apart from the nodes so leases are renewed in time
+        self._store_executor = ThreadPoolExecutor(1, "job-store")
+
+    @property
+    def started(self) -> bool:
+        """Whether the workers are running."""
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the workers on the pool's event loop.
+
+        Jobs left ``running`` by a pool that is gone are queued again first.
+        """
+        if self._loop is not None:
+            return
+        self._stopping = False
+        self._loop = asyncio.new_event_loop()
+        if self.executor_threads > 0:
+            # asyncio's default executor (min(32, CPUs + 4) threads) would cap
+            # the nodes of all jobs, and the research fan-out, at once
+            self._loop.set_default_executor(
+                ThreadPoolExecutor(self.executor_threads, "job-node")
+            )
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="job-loop", daemon=True
+        )
+        self._thread.start()
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._start(), self._loop)
+        )
+
+    async def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        requeued = await self._store(self.store.requeue_abandoned)
+        if requeued:
+            logger.info(f"Requeued {requeued} abandoned jobs")
+        self._tasks = [
+            asyncio.create_task(self._work(f"{self.worker_id}/{i}"))
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._watch()))
+        logger.info(f"Started {self.workers} job workers as {self.worker_id}")
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running are queued again."""
+        if self._loop is None:
+            return
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop)
+        )
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        await asyncio.to_thread(self._thread.join)
+        self._loop.close()
+        self._loop, self._thread, self._wakeup = None, None, None
+
+    async def _stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was queued; safe from any thread."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _store(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._store_executor, func, *args
+        )
+
+    def _graph(self, name: str) -> Any:
+        if name not in self._graphs:
+            graph = self.graph_factory(name)
+            if self.checkpointer is not None:
+                graph = attach_checkpointer(graph, self.checkpointer)
+            self._graphs[name] = graph
+        return self._graphs[name]
+
+    async def _work(self, worker: str) -> None:
+        while True:
+            job = await self._store(self.store.claim, worker, self.lease_seconds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._invoke(job))
+            self._running[job["id"]] = task
+            try:
+                await self._finish(job, task)
+            finally:
+                self._running.pop(job["id"], None)
+
+    async def _invoke(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        graph = self._graph(job["graph"])
+        config = dict(job["config"])
+        config["configurable"] = {
+            **(config.get("configurable") or {}),
+            "thread_id": job["id"],
+        }
+        input: Dict[str, Any] | None = job["input"]
+        if self.checkpointer is not None and job["attempts"] > 1:
+            state = await graph.aget_state(config)
+            if state.next:
+                # Resume the interrupted run from its last checkpoint
+                input = None
+        return await graph.ainvoke(input, config)
+
+    async def _finish(self, job: Dict[str, Any], task: asyncio.Task) -> None:
+        metrics = get_metrics()
+        running = metrics.gauge("jobs_running", "Jobs being run by the workers")
+        running.inc(graph=job["graph"])
+        start = time.perf_counter()
+        status = SUCCEEDED
+        try:
+            output = await task
+            await self._store(self.store.complete, job["id"], job_result(output))
+        except asyncio.CancelledError:
+            if self._stopping or not task.cancelled():
+                # The pool is shutting down; another start picks the job up again
+                task.cancel()
+                await self._store(self.store.fail, job["id"], "Worker stopped", True)
+                raise
+            status = CANCELLED
+            await self._store(self.store.mark_cancelled, job["id"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            requeue = is_transient(e) and job["attempts"] < job["max_attempts"]
+            status = "retried" if requeue else FAILED
+            logger.warning(
+                f"Job {job['id']} attempt {job['attempts']} failed: {error}"
+                + ("; retrying" if requeue else "")
+            )
+            await self._store(self.store.fail, job["id"], error, requeue)
+        finally:
+            running.dec(graph=job["graph"])
+        metrics.counter("jobs_total", "Finished job attempts by status").inc(
+            graph=job["graph"], status=status
+        )
+        metrics.histogram(
+            "job_duration_seconds",
+            "Run time of job attempts",
+            buckets=_DURATION_BUCKETS,
+        ).observe(time.perf_counter() - start, graph=job["graph"], status=status)
+
+    async def _watch(self) -> None:
+        """Cancel the runs of jobs whose cancellation was requested.
+
+        Also renews the leases of the pool's jobs and queues the jobs of pools
+        whose leases expired.
+        """
+        queued = get_metrics().gauge("jobs_queued", "Jobs waiting for a worker")
+        last_heartbeat = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if time.monotonic() - last_heartbeat >= self.lease_seconds / 3:
+                last_heartbeat = time.monotonic()
+                await self._store(
+                    self.store.heartbeat, self.worker_id + "/", self.lease_seconds
+                )
+                requeued = await self._store(self.store.requeue_abandoned)
+                if requeued:
+                    logger.info(f"Requeued {requeued} abandoned jobs")
+                    self._wakeup.set()
+            for job_id in await self._store(
+                self.store.cancel_requested, list(self._running)
+            ):
+                task = self._running.get(job_id)
+                if task is not None and not task.done():
+                    logger.info(f"Cancelling job {job_id}")
+                    task.cancel()
+            counts = await self._store(self.store.counts)
+            queued.set(counts["queued"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the pool size, the jobs it is running and the jobs per status."""
+        return {
+            "workers": self.workers,
+            "worker_id": self.worker_id,
+            "started": self.started,
+            "running": list(self._running),
+            "jobs": self.store.counts(),
+        }
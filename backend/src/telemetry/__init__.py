@@ -0,0 +1,89 @@
+"""Tracing, metrics and profiling of graph runs."""
+
+import functools
+import inspect
+from typing import Any, Callable
+
+from langgraph.config import get_config
+from langgraph.pregel import Pregel
+
+from .metrics import Counter, Gauge, Histogram, MetricsRegistry, get_metrics
+from .profiling import profile_node, run_profiled
+from .state_metrics import get_state_metrics_handler, get_state_summaries
+from .tracing import (
+    InMemorySpanExporter,
+    JsonLinesSpanExporter,
+    Span,
+    SpanExporter,
+    configure_tracing,
+    get_tracer,
+    get_tracing_handler,
+    register_exporter,
+    trace_span,
+)
+
+
+def instrument_graph(graph: Pregel) -> Pregel:
+    """Attach the telemetry callback handlers to a compiled graph."""
+    return graph.with_config(
+        callbacks=[get_tracing_handler(), get_state_metrics_handler()]
+    )
+
+
+def instrument_node(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a node function with the per-execution telemetry hooks.
+
+    The wrapper keeps the original signature, so LangGraph still passes
+    ``config`` to nodes that accept it, and coroutine functions stay
+    coroutine functions.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                config = get_config()
+            except RuntimeError:
+                return await func(*args, **kwargs)
+            node = (config.get("metadata") or {}).get("langgraph_node", func.__name__)
+            with profile_node(node, config, boundary=async_wrapper.__code__):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            config = get_config()
+        except RuntimeError:
+            # Called outside of a graph run
+            return func(*args, **kwargs)
+        node = (config.get("metadata") or {}).get("langgraph_node", func.__name__)
+        with profile_node(node, config, boundary=wrapper.__code__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "InMemorySpanExporter",
+    "JsonLinesSpanExporter",
+    "MetricsRegistry",
+    "Span",
+    "SpanExporter",
+    "configure_tracing",
+    "get_metrics",
+    "get_state_metrics_handler",
+    "get_state_summaries",
+    "get_tracer",
+    "get_tracing_handler",
+    "instrument_graph",
+    "instrument_node",
+    "profile_node",
+    "register_exporter",
+    "run_profiled",
+    "trace_span",
+]
@@ -0,0 +1,209 @@
+"""Process-wide counters and histograms exposed at ``GET /metrics``.
+
+Metrics are created on first use through the default registry::
+
+    from telemetry import get_metrics
+
+    get_metrics().counter("reflection_total", "Reflection decisions").inc(outcome="skipped")
+
+and rendered in the Prometheus text format, or as a JSON-friendly snapshot.
+"""
+
+import bisect
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[str, str] | None = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        """Create an empty counter named ``name``."""
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        """Add ``amount`` to the counter for ``labels``."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        """Return the current value for ``labels``."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return the value of every label set."""
+        with self._lock:
+            return [{"labels": dict(k), "value": v} for k, v in self._values.items()]
+
+    def render(self) -> Iterable[str]:
+        """Yield the Prometheus text lines of the counter."""
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_format_labels(key)} {value:g}"
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        """Set the gauge for ``labels`` to ``value``."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        """Subtract ``amount`` from the gauge for ``labels``."""
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Bucketed distribution of observed values per label set."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        """Create an empty histogram with the given bucket upper bounds."""
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts + overflow, sum, count)
+        self._values: Dict[LabelKey, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """Record one observation for ``labels``."""
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.setdefault(
+                key, [[0] * (len(self.buckets) + 1), 0.0, 0]
+            )
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return the bucket counts, sum and count of every label set."""
+        with self._lock:
+            return [
+                {
+                    "labels": dict(key),
+                    "count": count,
+                    "sum": round(total, 6),
+                    "buckets": dict(zip(map(str, self.buckets + (math.inf,)), counts)),
+                }
+                for key, (counts, total, count) in self._values.items()
+            ]
+
+    def render(self) -> Iterable[str]:
+        """Yield the Prometheus text lines of the histogram."""
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    yield f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}"
+                yield f"{self.name}_sum{_format_labels(key)} {total:g}"
+                yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+class MetricsRegistry:
+    """Named metrics, created on first use."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, *args: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric '{name}' is already a {metric.type}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Return the counter called ``name``, creating it if needed."""
+        return self._get(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        """Return the gauge called ``name``, creating it if needed."""
+        return self._get(Gauge, name, description)
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram called ``name``, creating it if needed."""
+        return self._get(Histogram, name, description, buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return every metric as JSON-serializable data."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "type": metric.type,
+                "description": metric.description,
+                "values": metric.snapshot(),
+            }
+            for metric in metrics
+        }
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            if metric.description:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Forget every metric."""
+        with self._lock:
+            self._metrics.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
@@ -0,0 +1,297 @@
+"""Opt-in CPU profiling of graph node executions.
+
+Profiling is requested per run, either through ``configurable``::
+
+    {"configurable": {"profile": True}}
+
+or with an ``x-profile: 1`` request header (the LangGraph API forwards
+``x-`` headers into ``configurable``). Independently of the per-run flag,
+``PROFILING_SAMPLE_RATE`` profiles a random fraction of all runs; the choice
+is derived from the run id so every node of a sampled run is profiled.
+
+Two modes are available through ``PROFILING_MODE``:
+
+* ``sampling`` (default): a background thread samples the stack of the
+  thread executing the node every ``PROFILING_INTERVAL_MS`` milliseconds.
+  Overhead is independent of how much Python code the node runs.
+* ``deterministic``: ``cProfile`` records every call. Python 3.12+ only
+  allows one active ``cProfile`` at a time, so concurrent nodes fall back to
+  sampling.
+
+Work a node hands to executor threads (the deadline and hedging pools of
+``web_research``) is sampled too when it is called through
+:func:`run_profiled`; those stacks appear under the node in
+``stacks.collapsed`` and, in sampling mode, in the ``.pstats`` file.
+
+For each node execution a ``.pstats`` file is written, and the collapsed
+stacks (``node;frame;frame count``) are appended to ``stacks.collapsed``,
+ready for ``flamegraph.pl`` or speedscope. Artifacts are stored under
+``PROFILING_DIR/<thread_id>/<run_id>/``.
+"""
+
+import contextvars
+import cProfile
+import logging
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+Frame = Tuple[str, int, str]  # (filename, first line, function name), as in pstats
+T = TypeVar("T")
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+
+def _is_truthy(value: Any) -> bool:
+    return value is True or str(value).lower() in _TRUTHY
+
+
+def should_profile(configurable: Dict[str, Any]) -> bool:
+    """Decide whether the run owning ``configurable`` is profiled."""
+    if _is_truthy(configurable.get("profile")) or _is_truthy(
+        configurable.get("x-profile")
+    ):
+        return True
+    rate = float(os.getenv("PROFILING_SAMPLE_RATE", "0") or 0)
+    if rate <= 0:
+        return False
+    run_id = configurable.get("run_id")
+    if run_id is None:
+        return random.random() < rate
+    # Stable per run, so that every node of a sampled run is profiled
+    return zlib.crc32(str(run_id).encode("utf-8")) / 2**32 < rate
+
+
+class StackSampler:
+    """Background thread sampling the stacks of registered threads."""
+
+    def __init__(self, interval: float):
+        """Sample every ``interval`` seconds once a thread is registered."""
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Tuple[Any, Counter]] = {}
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(
+        self, ident: int, boundary: Any, samples: Counter | None = None
+    ) -> Counter:
+        """Start sampling thread ``ident`` up to the ``boundary`` code object.
+
+        Samples are added to ``samples`` if given, else to a new counter.
+        """
+        samples = Counter() if samples is None else samples
+        with self._lock:
+            self._targets[ident] = (boundary, samples)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+        return samples
+
+    def stop(self, ident: int) -> None:
+        """Stop sampling thread ``ident``."""
+        with self._lock:
+            self._targets.pop(ident, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for ident, (boundary, samples) in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    samples[_walk(frame, boundary)] += 1
+            time.sleep(self.interval)
+
+
+def _walk(frame: Any, boundary: Any) -> Tuple[Frame, ...]:
+    """Return the stack from the boundary frame (excluded) to ``frame``."""
+    stack: List[Frame] = []
+    while frame is not None and frame.f_code is not boundary:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def samples_to_pstats(samples: Counter, interval: float) -> Dict[Frame, Any]:
+    """Convert stack samples into the dictionary format used by ``pstats``."""
+    stats: Dict[Frame, list] = {}
+    for stack, count in samples.items():
+        elapsed = count * interval
+        seen = set()
+        for depth, func in enumerate(stack):
+            entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+            if func not in seen:
+                seen.add(func)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += elapsed
+            if depth == len(stack) - 1:
+                entry[2] += elapsed
+            if depth:
+                caller = stack[depth - 1]
+                cc, nc, tt, ct = entry[4].get(caller, (0, 0, 0.0, 0.0))
+                self_time = elapsed if depth == len(stack) - 1 else 0.0
+                entry[4][caller] = (
+                    cc + count,
+                    nc + count,
+                    tt + self_time,
+                    ct + elapsed,
+                )
+    return {func: tuple(entry) for func, entry in stats.items()}
+
+
+def format_collapsed(node: str, samples: Counter) -> str:
+    """Render samples in the collapsed-stack format used by flamegraph tools."""
+    lines = []
+    for stack, count in samples.items():
+        frames = [node] + [
+            f"{name} ({os.path.basename(filename)}:{line})"
+            for filename, line, name in stack
+        ]
+        lines.append(";".join(frames) + f" {count}")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+_sampler: StackSampler | None = None
+# Sampler and samples of the node profiled in the current context
+_active: contextvars.ContextVar[Tuple[StackSampler, Counter] | None] = (
+    contextvars.ContextVar("active_profile", default=None)
+)
+_sampler_lock = threading.Lock()
+_cprofile_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def _get_sampler(interval: float) -> StackSampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = StackSampler(interval)
+        return _sampler
+
+
+def _artifact_dir(configurable: Dict[str, Any]) -> str:
+    path = os.path.join(
+        os.getenv("PROFILING_DIR", "profiles"),
+        str(configurable.get("thread_id") or "no-thread"),
+        str(configurable.get("run_id") or "no-run"),
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def profile_node(
+    node: str, config: Dict[str, Any], boundary: Any = None
+) -> Iterator[None]:
+    """Profile the enclosed node execution if its run opted in.
+
+    Args:
+        node: Name of the node being executed
+        config: The node's runnable config
+        boundary: Code object of the calling wrapper; sampled stacks are cut
+            at this frame so thread-pool and LangGraph internals are omitted
+    """
+    configurable = config.get("configurable") or {}
+    if not should_profile(configurable):
+        yield
+        return
+
+    interval = float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000
+    deterministic = os.getenv("PROFILING_MODE", "sampling") == "deterministic"
+    profiler = None
+    if deterministic and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (debugger, coverage) is already active
+            profiler = None
+            _cprofile_lock.release()
+
+    sampler = _get_sampler(interval)
+    ident = threading.get_ident()
+    samples = sampler.start(ident, boundary)
+    token = _active.set((sampler, samples))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        sampler.stop(ident)
+        _active.reset(token)
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        try:
+            _write_artifacts(node, config, configurable, samples, profiler, interval)
+        except OSError as e:
+            logger.warning(f"Failed to write profile for node {node}: {e}")
+        logger.info(
+            f"Profiled node {node} ({elapsed * 1000:.1f} ms, "
+            f"{sum(samples.values())} samples, mode={'cprofile' if profiler else 'sampling'})"
+        )
+
+
+def run_profiled(func: Callable[[], T]) -> T:
+    """Call ``func``, sampling this thread into the profile of the calling node.
+
+    Executors running part of a node in their own threads call the work
+    through this function, in a copy of the node's context, so that the
+    profile shows the work rather than the node waiting for it.
+    """
+    active = _active.get()
+    if active is None:
+        return func()
+    sampler, samples = active
+    ident = threading.get_ident()
+    sampler.start(ident, run_profiled.__code__, samples)
+    try:
+        return func()
+    finally:
+        sampler.stop(ident)
+
+
+def _write_artifacts(
+    node: str,
+    config: Dict[str, Any],
+    configurable: Dict[str, Any],
+    samples: Counter,
+    profiler: cProfile.Profile | None,
+    interval: float,
+) -> None:
+    directory = _artifact_dir(configurable)
+    metadata = config.get("metadata") or {}
+    step = metadata.get("langgraph_step", 0)
+    task = str(metadata.get("langgraph_checkpoint_ns", "")).rsplit(":", 1)[-1][:8]
+    stem = os.path.join(directory, f"{step:03d}-{node}-{task or os.getpid()}")
+
+    if profiler is not None:
+        profiler.dump_stats(stem + ".pstats")
+    else:
+        with open(stem + ".pstats", "wb") as f:
+            marshal.dump(samples_to_pstats(samples, interval), f)
+
+    with _write_lock:
+        with open(os.path.join(directory, "stacks.collapsed"), "a") as f:
+            f.write(format_collapsed(node, samples))
@@ -0,0 +1,271 @@
+"""Per-superstep state size and memory instrumentation.
+
+When enabled, the serialized size of every state channel is recorded at each
+superstep boundary, using the same serializer the checkpointer uses, so the
+numbers match what is written per checkpoint. Sizes are measured on the state
+handed to the nodes of each step (i.e. the state produced by the previous
+superstep) and on the final output of the run.
+
+Optionally, ``tracemalloc`` snapshots are taken at node boundaries and the
+allocation sites that grew the most during the node are recorded. Snapshots
+are process-wide, so nodes running concurrently share their attribution.
+
+Configuration (environment variables, or the same names in lower case in
+``configurable`` for a single run)::
+
+    STATE_METRICS_ENABLED=true
+    STATE_METRICS_TRACEMALLOC=true
+    STATE_METRICS_ALERT_BYTES=1000000            # default per-channel threshold
+    STATE_METRICS_CHANNEL_ALERTS={"messages": 500000}
+
+A summary is logged at the end of every instrumented run and kept in memory;
+see :func:`get_state_summaries`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .tracing import is_node_run
+
+logger = logging.getLogger(__name__)
+
+_serde = JsonPlusSerializer()
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+
+def _setting(name: str, metadata: Dict[str, Any], default: str = "") -> str:
+    value = metadata.get(name.lower())
+    if value is None:
+        value = os.getenv(name, default)
+    return str(value)
+
+
+def channel_sizes(state: Any) -> Dict[str, int]:
+    """Return the serialized size in bytes of each channel of ``state``."""
+    if not isinstance(state, dict):
+        return {}
+    sizes = {}
+    for key, value in state.items():
+        try:
+            sizes[key] = len(_serde.dumps_typed(value)[1])
+        except Exception:
+            sizes[key] = len(repr(value).encode("utf-8"))
+    return sizes
+
+
+@dataclass
+class RunStateStats:
+    """State metrics collected for one graph run."""
+
+    run_id: str
+    graph: str
+    thread_id: str | None
+    performance_profile: str
+    thresholds: Dict[str, int]
+    default_threshold: int
+    tracemalloc: bool
+    started: float = field(default_factory=time.time)
+    steps: Dict[int, Dict[str, int]] = field(default_factory=dict)
+    alerts: List[Dict[str, Any]] = field(default_factory=list)
+    node_memory: List[Dict[str, Any]] = field(default_factory=list)
+
+    def record(self, step: int, sizes: Dict[str, int]) -> None:
+        """Record channel sizes for a step, keeping the largest observation."""
+        current = self.steps.setdefault(step, {})
+        for channel, size in sizes.items():
+            if size > current.get(channel, -1):
+                current[channel] = size
+            threshold = self.thresholds.get(channel, self.default_threshold)
+            alerted = any(alert["channel"] == channel for alert in self.alerts)
+            if threshold and size > threshold and not alerted:
+                alert = {
+                    "channel": channel,
+                    "step": step,
+                    "bytes": size,
+                    "threshold": threshold,
+                }
+                self.alerts.append(alert)
+                logger.warning(
+                    f"State channel '{channel}' of run {self.run_id} ({self.graph}) "
+                    f"reached {size} bytes at step {step}, above {threshold}"
+                )
+
+    def summary(self) -> Dict[str, Any]:
+        """Build the per-run summary."""
+        ordered = sorted(self.steps.items())
+        peak: Dict[str, int] = {}
+        for _, sizes in ordered:
+            for channel, size in sizes.items():
+                peak[channel] = max(peak.get(channel, 0), size)
+        first = ordered[0][1] if ordered else {}
+        final = ordered[-1][1] if ordered else {}
+        return {
+            "run_id": self.run_id,
+            "graph": self.graph,
+            "thread_id": self.thread_id,
+            "performance_profile": self.performance_profile,
+            "duration_s": round(time.time() - self.started, 3),
+            "steps": [{"step": step, "channels": sizes} for step, sizes in ordered],
+            "peak_bytes": peak,
+            "final_bytes": final,
+            "growth_bytes": {
+                channel: size - first.get(channel, 0) for channel, size in final.items()
+            },
+            "alerts": self.alerts,
+            "node_memory": self.node_memory,
+        }
+
+
+class StateMetricsCallbackHandler(BaseCallbackHandler):
+    """Callback handler recording state sizes and node memory deltas."""
+
+    run_inline = True
+
+    def __init__(self, max_summaries: int = 100, top_allocations: int = 5):
+        """Keep the last ``max_summaries`` run summaries."""
+        self.top_allocations = top_allocations
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, RunStateStats] = {}
+        self._roots: Dict[UUID, UUID] = {}
+        self._snapshots: Dict[UUID, Any] = {}
+        self.summaries: Deque[Dict[str, Any]] = deque(maxlen=max_summaries)
+
+    def _root_of(self, parent_run_id: UUID | None) -> UUID | None:
+        with self._lock:
+            return self._roots.get(parent_run_id) if parent_run_id else None
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: List[str] | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Start run bookkeeping, or measure the state entering a node."""
+        metadata = metadata or {}
+        if parent_run_id is None:
+            if _setting("STATE_METRICS_ENABLED", metadata).lower() not in _TRUTHY:
+                return
+            stats = RunStateStats(
+                run_id=str(metadata.get("run_id") or run_id),
+                graph=kwargs.get("name") or "graph",
+                thread_id=metadata.get("thread_id"),
+                performance_profile=_setting(
+                    "PERFORMANCE_PROFILE", metadata, "balanced"
+                ),
+                thresholds=json.loads(
+                    _setting("STATE_METRICS_CHANNEL_ALERTS", metadata, "{}")
+                ),
+                default_threshold=int(
+                    _setting("STATE_METRICS_ALERT_BYTES", metadata, "0")
+                ),
+                tracemalloc=_setting("STATE_METRICS_TRACEMALLOC", metadata).lower()
+                in _TRUTHY,
+            )
+            if stats.tracemalloc and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            with self._lock:
+                self._runs[run_id] = stats
+                self._roots[run_id] = run_id
+            return
+
+        root = self._root_of(parent_run_id)
+        if root is None:
+            return
+        with self._lock:
+            self._roots[run_id] = root
+            stats = self._runs.get(root)
+        name = kwargs.get("name") or ""
+        if stats is None or not is_node_run(name, metadata, tags):
+            return
+        step = int(metadata.get("langgraph_step", 0))
+        # Send() branches receive a private payload rather than the graph state
+        if "__pregel_push" not in (metadata.get("langgraph_triggers") or ()):
+            stats.record(step, channel_sizes(inputs))
+        if stats.tracemalloc and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self._snapshots[run_id] = (snapshot, name, step)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record node memory deltas and finish the run summary."""
+        self._finish(run_id, outputs)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Finish bookkeeping for a failed run or node."""
+        self._finish(run_id, None)
+
+    def _finish(self, run_id: UUID, outputs: Any) -> None:
+        with self._lock:
+            root = self._roots.pop(run_id, None)
+            started = self._snapshots.pop(run_id, None)
+            stats = self._runs.get(root) if root else None
+        if stats is None:
+            return
+
+        if started is not None and tracemalloc.is_tracing():
+            snapshot, node, step = started
+            diff = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+            stats.node_memory.append(
+                {
+                    "node": node,
+                    "step": step,
+                    "delta_bytes": sum(stat.size_diff for stat in diff),
+                    "top_allocations": [
+                        {"location": str(stat.traceback), "delta_bytes": stat.size_diff}
+                        for stat in diff[: self.top_allocations]
+                    ],
+                }
+            )
+
+        if root != run_id:
+            return
+        with self._lock:
+            self._runs.pop(run_id, None)
+        if outputs is not None:
+            final_step = max(stats.steps, default=0) + 1
+            stats.record(final_step, channel_sizes(outputs))
+        summary = stats.summary()
+        self.summaries.append(summary)
+        channels = ", ".join(
+            f"{channel}={size / 1024:.1f}KB ({summary['growth_bytes'].get(channel, 0) / 1024:+.1f}KB)"
+            for channel, size in sorted(
+                summary["final_bytes"].items(), key=lambda kv: -kv[1]
+            )
+        )
+        logger.info(
+            f"State summary for run {stats.run_id} ({stats.graph}): "
+            f"{len(summary['steps'])} steps, {channels}"
+        )
+
+
+_handler = StateMetricsCallbackHandler()
+
+
+def get_state_metrics_handler() -> StateMetricsCallbackHandler:
+    """Return the callback handler attached to compiled graphs."""
+    return _handler
+
+
+def get_state_summaries(limit: int | None = None) -> List[Dict[str, Any]]:
+    """Return the most recent per-run state summaries, newest last."""
+    summaries = list(_handler.summaries)
+    return summaries[-limit:] if limit else summaries
@@ -0,0 +1,172 @@
+"""Command-line report for JSON-lines trace files.
+
+Prints the critical path of a traced graph run and a waterfall of all of its
+spans::
+
+    python -m telemetry.trace_report traces.jsonl
+    python -m telemetry.trace_report traces.jsonl --trace-id <id> --width 80
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+from telemetry.tracing import Span
+
+
+def load_spans(path: str) -> List[Span]:
+    """Load every span from a JSON-lines trace file."""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(Span.from_dict(json.loads(line)))
+    return spans
+
+
+def group_traces(spans: List[Span]) -> Dict[str, List[Span]]:
+    """Group spans by trace id, ordered by start time."""
+    traces: Dict[str, List[Span]] = defaultdict(list)
+    for span in spans:
+        traces[span.trace_id].append(span)
+    for trace_spans in traces.values():
+        trace_spans.sort(key=lambda s: s.start_time)
+    return dict(traces)
+
+
+def _children(spans: List[Span]) -> Dict[str | None, List[Span]]:
+    children: Dict[str | None, List[Span]] = defaultdict(list)
+    ids = {span.span_id for span in spans}
+    for span in spans:
+        # Spans whose parent was never exported are treated as top level
+        parent = span.parent_id if span.parent_id in ids else None
+        children[parent].append(span)
+    return children
+
+
+def critical_path(spans: List[Span]) -> List[Span]:
+    """Return the chain of spans that determined the trace's end time.
+
+    Starting from the root, the child that finished last is on the critical
+    path; before it, the latest child that finished before it started, and so
+    on. The walk then descends into each selected child.
+    """
+    children = _children(spans)
+    roots = children.get(None, [])
+    if not roots:
+        return []
+    root = max(roots, key=lambda s: s.end_time or 0)
+
+    def walk(span: Span) -> List[Span]:
+        path = [span]
+        kids = sorted(children.get(span.span_id, []), key=lambda s: s.end_time or 0)
+        chain: List[Span] = []
+        cursor = span.end_time or 0
+        for kid in reversed(kids):
+            if (kid.end_time or 0) <= cursor:
+                chain.append(kid)
+                cursor = kid.start_time
+        for kid in reversed(chain):
+            path.extend(walk(kid))
+        return path
+
+    return walk(root)
+
+
+def format_critical_path(spans: List[Span]) -> str:
+    """Render the critical path and a per-node breakdown as text."""
+    path = critical_path(spans)
+    if not path:
+        return "No spans found."
+    total = path[0].duration or 1e-9
+    lines = [f"Critical path ({total:.3f}s total)", ""]
+    lines.append(f"{'span':<40} {'kind':<6} {'duration':>10} {'share':>7}")
+    for span in path:
+        lines.append(
+            f"{_label(span)[:40]:<40} {span.kind:<6} {span.duration:>9.3f}s "
+            f"{100 * span.duration / total:>6.1f}%"
+        )
+
+    per_node: Dict[str, float] = defaultdict(float)
+    for span in path:
+        if span.kind == "node":
+            per_node[span.name] += span.duration
+    if per_node:
+        lines += ["", "Time on the critical path by node", ""]
+        for name, duration in sorted(per_node.items(), key=lambda kv: -kv[1]):
+            lines.append(
+                f"{name:<40} {duration:>9.3f}s {100 * duration / total:>6.1f}%"
+            )
+    return "\n".join(lines)
+
+
+def format_waterfall(spans: List[Span], width: int = 60) -> str:
+    """Render every span of a trace as an indented waterfall chart."""
+    if not spans:
+        return "No spans found."
+    children = _children(spans)
+    start = min(span.start_time for span in spans)
+    end = max(span.end_time or span.start_time for span in spans)
+    scale = width / max(end - start, 1e-9)
+
+    lines = [f"Waterfall ({end - start:.3f}s)", ""]
+
+    def render(span: Span, depth: int) -> None:
+        offset = int((span.start_time - start) * scale)
+        length = max(1, int(span.duration * scale))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = ("  " * depth + _label(span))[:40]
+        marker = " !" if span.status == "error" else ""
+        lines.append(f"{label:<40} |{bar:<{width}}| {span.duration:.3f}s{marker}")
+        for kid in sorted(children.get(span.span_id, []), key=lambda s: s.start_time):
+            render(kid, depth + 1)
+
+    for root in children.get(None, []):
+        render(root, 0)
+    return "\n".join(lines)
+
+
+def _label(span: Span) -> str:
+    attrs = span.attributes
+    if span.kind == "llm" and attrs.get("model"):
+        return f"{span.name} ({attrs['model']})"
+    if span.kind == "node" and attrs.get("id") is not None:
+        return f"{span.name} [{attrs['id']}]"
+    return span.name
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Entry point of the trace report CLI."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="JSON-lines trace file")
+    parser.add_argument(
+        "--trace-id", help="Trace to report on (defaults to the most recent one)"
+    )
+    parser.add_argument(
+        "--width", type=int, default=60, help="Width of the waterfall bars"
+    )
+    args = parser.parse_args(argv)
+
+    traces = group_traces(load_spans(args.path))
+    if not traces:
+        sys.stderr.write("No spans found.\n")
+        return 1
+    if args.trace_id:
+        if args.trace_id not in traces:
+            sys.stderr.write(f"Trace {args.trace_id} not found.\n")
+            return 1
+        spans = traces[args.trace_id]
+    else:
+        spans = max(traces.values(), key=lambda s: s[0].start_time)
+
+    sys.stdout.write(f"Trace {spans[0].trace_id}\n\n")
+    sys.stdout.write(format_critical_path(spans) + "\n\n")
+    sys.stdout.write(format_waterfall(spans, args.width) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,459 @@
+"""Hierarchical span tracing for graph runs.
+
+Spans are produced by a LangChain callback handler that is attached to every
+compiled graph, so one span is recorded per graph run, per node execution, per
+chat-model call and per tool call without touching the node code. Calls that
+bypass LangChain (such as the raw ``google.genai`` client used for grounded
+search) can open a manual span with :func:`trace_span`.
+
+Finished spans are handed to a pluggable :class:`SpanExporter`. Tracing is off
+by default and is enabled through environment variables::
+
+    TRACING_EXPORTER=jsonl            # "jsonl", "memory" or "none"
+    TRACING_FILE=traces.jsonl         # target file for the jsonl exporter
+
+or programmatically with :func:`configure_tracing`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """A single timed operation within a trace."""
+
+    name: str
+    kind: str  # "run", "node", "llm" or "tool"
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_time: float = field(default_factory=time.time)
+    end_time: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Return the span duration in seconds (0 while the span is open)."""
+        if self.end_time is None:
+            return 0.0
+        return self.end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span to a JSON-compatible dictionary."""
+        data = asdict(self)
+        data["duration"] = self.duration
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Span":
+        """Rebuild a span from :meth:`to_dict` output."""
+        data = {k: v for k, v in data.items() if k != "duration"}
+        return cls(**data)
+
+
+class SpanExporter:
+    """Base class for span exporters."""
+
+    def export(self, span: Span) -> None:
+        """Export a finished span."""
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Flush and release any resources held by the exporter."""
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Append finished spans to a local JSON-lines file, one span per line."""
+
+    def __init__(self, path: str):
+        """Open ``path`` for appending."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        """Write the span as a single JSON line."""
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def shutdown(self) -> None:
+        """Close the underlying file."""
+        with self._lock:
+            self._file.close()
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keep finished spans in memory, mostly useful for benchmarks."""
+
+    def __init__(self):
+        """Start with no spans."""
+        self._lock = threading.Lock()
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        """Store the span."""
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> List[Span]:
+        """Return and forget all stored spans."""
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+
+_EXPORTER_FACTORIES: Dict[str, Callable[[], SpanExporter]] = {
+    "jsonl": lambda: JsonLinesSpanExporter(os.getenv("TRACING_FILE", "traces.jsonl")),
+    "memory": InMemorySpanExporter,
+}
+
+
+def register_exporter(name: str, factory: Callable[[], SpanExporter]) -> None:
+    """Register an exporter factory selectable through ``TRACING_EXPORTER``."""
+    _EXPORTER_FACTORIES[name] = factory
+
+
+class Tracer:
+    """Create spans and forward them to the configured exporter."""
+
+    def __init__(self, exporter: SpanExporter | None = None):
+        """Create a tracer, disabled until it has an exporter."""
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are currently being recorded."""
+        return self.exporter is not None
+
+    def start_span(
+        self,
+        name: str,
+        kind: str,
+        parent: Span | None = None,
+        span_id: str | None = None,
+        attributes: Dict[str, Any] | None = None,
+    ) -> Span:
+        """Open a new span, inheriting the trace id from ``parent``."""
+        span_id = span_id or uuid.uuid4().hex
+        return Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else span_id,
+            span_id=span_id,
+            parent_id=parent.span_id if parent else None,
+            attributes=dict(attributes or {}),
+        )
+
+    def end_span(self, span: Span, error: BaseException | None = None) -> None:
+        """Close a span and export it."""
+        span.end_time = time.time()
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+
+def is_node_run(name: str, metadata: Dict[str, Any], tags: List[str] | None) -> bool:
+    """Whether a chain run is the execution of a graph node."""
+    return name == metadata.get("langgraph_node") and any(
+        tag.startswith("graph:step:") for tag in tags or []
+    )
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """LangChain callback handler that turns graph runs into spans.
+
+    Only the root graph run, node executions, chat-model calls and tool calls
+    become spans; intermediate runnables (prompt templates, output parsers,
+    edge functions) are collapsed into their closest traced ancestor.
+    """
+
+    run_inline = True
+
+    def __init__(self, tracer: Tracer):
+        """Record the runs of a graph as spans of ``tracer``."""
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._open: Dict[UUID, Span] = {}
+        # Maps untraced run ids to the closest traced ancestor span
+        self._aliases: Dict[UUID, Span | None] = {}
+
+    def resolve(self, run_id: UUID | None) -> Span | None:
+        """Return the open span for ``run_id`` or its closest traced ancestor."""
+        if run_id is None:
+            return None
+        with self._lock:
+            if run_id in self._open:
+                return self._open[run_id]
+            return self._aliases.get(run_id)
+
+    def _start(
+        self,
+        run_id: UUID,
+        parent_run_id: UUID | None,
+        name: str,
+        kind: str,
+        attributes: Dict[str, Any],
+    ) -> None:
+        parent = self.resolve(parent_run_id)
+        span = self.tracer.start_span(
+            name, kind, parent=parent, span_id=str(run_id), attributes=attributes
+        )
+        with self._lock:
+            self._open[run_id] = span
+
+    def _alias(self, run_id: UUID, parent_run_id: UUID | None) -> None:
+        parent = self.resolve(parent_run_id)
+        with self._lock:
+            self._aliases[run_id] = parent
+
+    def _end(
+        self,
+        run_id: UUID,
+        error: BaseException | None = None,
+        attributes: Dict[str, Any] | None = None,
+    ) -> None:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            self._aliases.pop(run_id, None)
+        if span is None:
+            return
+        if attributes:
+            span.attributes.update(attributes)
+        self.tracer.end_span(span, error)
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: List[str] | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open a run span for root graphs and a node span for graph nodes."""
+        if not self.tracer.enabled:
+            return
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        if parent_run_id is None:
+            attributes = {
+                "graph": name,
+                "performance_profile": metadata.get("performance_profile")
+                or os.getenv("PERFORMANCE_PROFILE", "balanced"),
+            }
+            for key in ("thread_id", "run_id", "assistant_id", "graph_id"):
+                if metadata.get(key) is not None:
+                    attributes[key] = str(metadata[key])
+            self._start(run_id, None, name, "run", attributes)
+        elif is_node_run(name, metadata, tags):
+            attributes = {
+                "node": name,
+                "step": metadata.get("langgraph_step"),
+            }
+            if isinstance(inputs, dict):
+                # Send() branches of the deep researcher carry their query and id
+                for key in ("search_query", "id"):
+                    if isinstance(inputs.get(key), (str, int)):
+                        attributes[key] = inputs[key]
+            self._start(run_id, parent_run_id, name, "node", attributes)
+        else:
+            self._alias(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close the chain span, if any."""
+        self._end(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close the chain span with an error status."""
+        # GraphInterrupt and friends are control flow rather than failures
+        if type(error).__name__ in ("GraphInterrupt", "GraphBubbleUp", "ParentCommand"):
+            self._end(run_id, attributes={"interrupted": True})
+        else:
+            self._end(run_id, error=error)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open an llm span for a chat-model call."""
+        if not self.tracer.enabled:
+            return
+        metadata = metadata or {}
+        invocation_params = kwargs.get("invocation_params") or {}
+        prompt_chars = sum(
+            len(str(message.content)) for batch in messages for message in batch
+        )
+        attributes = {
+            "model": metadata.get("ls_model_name") or invocation_params.get("model"),
+            "temperature": metadata.get("ls_temperature"),
+            "messages": sum(len(batch) for batch in messages),
+            "prompt_chars": prompt_chars,
+        }
+        self._start(run_id, parent_run_id, "chat_model", "llm", attributes)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open an llm span for a completion-style model call."""
+        if not self.tracer.enabled:
+            return
+        metadata = metadata or {}
+        attributes = {
+            "model": metadata.get("ls_model_name"),
+            "prompt_chars": sum(len(prompt) for prompt in prompts),
+        }
+        self._start(run_id, parent_run_id, "llm", "llm", attributes)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close the llm span and record token usage when available."""
+        attributes: Dict[str, Any] = {}
+        try:
+            message = response.generations[0][0].message
+            usage = getattr(message, "usage_metadata", None) or {}
+            attributes["input_tokens"] = usage.get("input_tokens")
+            attributes["output_tokens"] = usage.get("output_tokens")
+            attributes["tool_calls"] = len(getattr(message, "tool_calls", []) or [])
+        except (AttributeError, IndexError):
+            pass
+        self._end(run_id, attributes=attributes)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close the llm span with an error status."""
+        self._end(run_id, error=error)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Open a tool span."""
+        if not self.tracer.enabled:
+            return
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        attributes = {"tool": name, "input_chars": len(input_str or "")}
+        self._start(run_id, parent_run_id, name, "tool", attributes)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Close the tool span."""
+        self._end(run_id)
+
+    def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Close the tool span with an error status."""
+        self._end(run_id, error=error)
+
+
+_tracer = Tracer()
+_handler = TracingCallbackHandler(_tracer)
+
+
+def configure_tracing(exporter: SpanExporter | None = None) -> Tracer:
+    """Set the active exporter, or pick one from ``TRACING_EXPORTER``.
+
+    Args:
+        exporter: Exporter to use. When omitted, the exporter named by the
+            ``TRACING_EXPORTER`` environment variable is created; "none" or an
+            unset variable disables tracing.
+
+    Returns:
+        The process-wide tracer.
+    """
+    if exporter is None:
+        name = os.getenv("TRACING_EXPORTER", "none").lower()
+        factory = _EXPORTER_FACTORIES.get(name)
+        if factory is None and name != "none":
+            logger.warning(f"Unknown TRACING_EXPORTER '{name}', tracing disabled")
+        exporter = factory() if factory else None
+    if _tracer.exporter is not None and _tracer.exporter is not exporter:
+        _tracer.exporter.shutdown()
+    _tracer.exporter = exporter
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def get_tracing_handler() -> TracingCallbackHandler:
+    """Return the callback handler attached to compiled graphs."""
+    return _handler
+
+
+@contextmanager
+def trace_span(
+    config: RunnableConfig | None, name: str, kind: str = "llm", **attributes: Any
+) -> Iterator[Span]:
+    """Record a manual span nested under the node that owns ``config``.
+
+    Use this for work that does not go through LangChain callbacks::
+
+        with trace_span(config, "google_search", model=model) as span:
+            response = client.models.generate_content(...)
+            span.set_attribute("grounding_chunks", len(chunks))
+    """
+    callbacks = (config or {}).get("callbacks")
+    parent = _handler.resolve(getattr(callbacks, "parent_run_id", None))
+    span = _tracer.start_span(name, kind, parent=parent, attributes=attributes)
+    try:
+        yield span
+    except BaseException as e:
+        _tracer.end_span(span, e)
+        raise
+    else:
+        _tracer.end_span(span)
+
+
+configure_tracing()
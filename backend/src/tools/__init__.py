@@ -1,3 +1,25 @@
+"""Tools of the agents and the cache of their deterministic results."""
+
+from .cache import (
+    FILE,
+    PURE,
+    ToolResultCache,
+    awrap_tool_call,
+    declare_cache,
+    get_tool_cache,
+    set_tool_cache,
+    wrap_tool_call,
+)
 from .calculator import calculator_tool
 
-__all__ = ["calculator_tool"]
+__all__ = [
+    "FILE",
+    "PURE",
+    "ToolResultCache",
+    "awrap_tool_call",
+    "calculator_tool",
+    "declare_cache",
+    "get_tool_cache",
+    "set_tool_cache",
+    "wrap_tool_call",
+]
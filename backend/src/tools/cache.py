@@ -0,0 +1,282 @@
+"""Memoization of deterministic tool results in the tool-execution path.
+
+Tools opt in with :func:`declare_cache`:
+
+* ``pure`` tools (``calculator_tool``) return the same result for the same
+  arguments, so a result is reused for as long as it stays in the cache;
+* ``file`` tools (the MCP filesystem reads) are keyed by their arguments plus
+  the path, modification time and size of every file they read, so a result
+  is reused until one of the files changes. Paths that cannot be stat-ed
+  locally are never cached.
+
+``ToolNode(..., wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call)``
+looks every call up in the process-wide cache first; a hit returns the stored
+``ToolMessage`` content without running the tool or an MCP round trip. Only
+successful results are stored.
+
+Configured from the environment: ``TOOL_CACHE_ENABLED`` (default true) and
+``TOOL_CACHE_SIZE`` (default 1024 entries). Counters at ``GET /metrics``:
+``tool_cache_requests_total`` by ``tool`` and ``result`` (``hit``, ``miss``,
+``bypass``); hit rates per tool at ``GET /metrics/tools``.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Sequence, Tuple
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+from telemetry import get_metrics
+
+PURE = "pure"
+FILE = "file"
+
+# MCP filesystem tools that only read, with the arguments holding their paths.
+# get_file_info is left out: it reports access times, which change on every
+# read without touching the modification time the cache is keyed by.
+FILESYSTEM_READ_TOOLS: Dict[str, Tuple[str, ...]] = {
+    "read_file": ("path",),
+    "read_text_file": ("path",),
+    "read_media_file": ("path",),
+    "read_multiple_files": ("paths",),
+    "list_directory": ("path",),
+}
+
+
+def declare_cache(
+    tool: BaseTool, policy: str, path_args: Sequence[str] = ()
+) -> BaseTool:
+    """Declare how the results of ``tool`` may be cached.
+
+    Args:
+        tool: The tool, updated in place
+        policy: ``pure`` or ``file``
+        path_args: For ``file`` tools, the arguments holding a path or a
+            list of paths
+    """
+    if policy not in (PURE, FILE):
+        raise ValueError(f"Unknown tool cache policy '{policy}'")
+    tool.metadata = {
+        **(tool.metadata or {}),
+        "cache": policy,
+        "cache_path_args": tuple(path_args),
+    }
+    return tool
+
+
+def declare_filesystem_tools(tools: Sequence[BaseTool]) -> None:
+    """Declare the read-only MCP filesystem tools as ``file`` cacheable."""
+    for tool in tools:
+        if tool.name in FILESYSTEM_READ_TOOLS:
+            declare_cache(tool, FILE, FILESYSTEM_READ_TOOLS[tool.name])
+
+
+def file_fingerprint(path: str, root: str | None = None) -> Tuple | None:
+    """Return the resolved path, mtime and size of ``path``, or None if unknown.
+
+    Relative paths are resolved against ``root``, by default the directory
+    served by the MCP filesystem server (``MCP_FILESYSTEM_PATH``).
+    """
+    root = root if root is not None else os.getenv("MCP_FILESYSTEM_PATH", "/tmp")
+    resolved = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+    try:
+        stat = os.stat(resolved)
+    except (OSError, ValueError):
+        return None
+    return (resolved, stat.st_mtime_ns, stat.st_size)
+
+
+class ToolResultCache:
+    """Thread-safe LRU of tool results keyed by tool, arguments and file state."""
+
+    def __init__(self, maxsize: int = 1024):
+        """Create an empty cache of at most ``maxsize`` results."""
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        return len(self._entries)
+
+    def key(self, tool: BaseTool | None, args: Dict[str, Any]) -> Hashable | None:
+        """Return the cache key of a call, or None if it may not be cached."""
+        metadata = (tool.metadata or {}) if tool is not None else {}
+        policy = metadata.get("cache")
+        if policy not in (PURE, FILE):
+            return None
+        try:
+            arguments = json.dumps(args, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return None
+        if policy == PURE:
+            return (tool.name, arguments)
+
+        fingerprints = []
+        for name in metadata.get("cache_path_args", ()):
+            value = args.get(name)
+            paths = value if isinstance(value, list) else [value]
+            for path in paths:
+                if not isinstance(path, str):
+                    return None
+                fingerprint = file_fingerprint(path)
+                if fingerprint is None:
+                    return None
+                fingerprints.append(fingerprint)
+        if not fingerprints:
+            return None
+        return (tool.name, arguments, tuple(fingerprints))
+
+    def lookup(self, key: Hashable) -> Dict[str, Any] | None:
+        """Return the cached result of ``key`` and mark it most recently used."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        return value
+
+    def update(self, key: Hashable, message: ToolMessage) -> None:
+        """Store the content and artifact of ``message``, evicting the oldest results."""
+        with self._lock:
+            self._entries[key] = {
+                "content": message.content,
+                "artifact": message.artifact,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cached result and reset the hit rates."""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def record(self, tool: str, result: str) -> None:
+        """Count a lookup of ``tool`` with ``result`` hit, miss or bypass."""
+        get_metrics().counter(
+            "tool_cache_requests_total", "Tool result cache lookups by tool and result"
+        ).inc(tool=tool, result=result)
+        with self._lock:
+            stats = self._stats.setdefault(tool, {"hit": 0, "miss": 0, "bypass": 0})
+            stats[result] += 1
+
+    def hit_rates(self) -> Dict[str, Dict[str, Any]]:
+        """Return the lookups and hit rate of every cacheable tool called so far."""
+        with self._lock:
+            report = {}
+            for tool, stats in self._stats.items():
+                lookups = stats["hit"] + stats["miss"]
+                report[tool] = {
+                    **stats,
+                    "hit_rate": round(stats["hit"] / lookups, 4) if lookups else 0.0,
+                }
+            return report
+
+
+_cache: ToolResultCache | None = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def create_tool_cache(
+    enabled: bool | None = None, size: int | None = None
+) -> ToolResultCache | None:
+    """Create the tool result cache, configured from the environment by default.
+
+    Args:
+        enabled: Whether to cache at all (``TOOL_CACHE_ENABLED``, default true)
+        size: Entries kept (``TOOL_CACHE_SIZE``, default 1024)
+    """
+    if enabled is None:
+        enabled = os.getenv("TOOL_CACHE_ENABLED", "true").lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+    if not enabled:
+        return None
+    return ToolResultCache(
+        size if size is not None else int(os.getenv("TOOL_CACHE_SIZE", "1024"))
+    )
+
+
+def get_tool_cache() -> ToolResultCache | None:
+    """Return the process-wide tool result cache, or None when caching is off."""
+    global _cache, _configured
+    if not _configured:
+        with _cache_lock:
+            if not _configured:
+                _cache = create_tool_cache()
+                _configured = True
+    return _cache
+
+
+def set_tool_cache(cache: ToolResultCache | None) -> None:
+    """Replace the process-wide tool result cache; None turns caching off."""
+    global _cache, _configured
+    with _cache_lock:
+        _cache = cache
+        _configured = True
+
+
+def _lookup(request: Any) -> Tuple[ToolResultCache | None, Hashable | None, Any]:
+    """Return the cache, the key of the call and the cached message, if any."""
+    cache = get_tool_cache()
+    tool = request.tool
+    if cache is None or tool is None or not (tool.metadata or {}).get("cache"):
+        return None, None, None
+    key = cache.key(tool, request.tool_call["args"])
+    if key is None:
+        cache.record(tool.name, "bypass")
+        return None, None, None
+    entry = cache.lookup(key)
+    if entry is None:
+        cache.record(tool.name, "miss")
+        return cache, key, None
+    cache.record(tool.name, "hit")
+    return (
+        cache,
+        key,
+        ToolMessage(
+            content=entry["content"],
+            artifact=entry["artifact"],
+            name=tool.name,
+            tool_call_id=request.tool_call["id"],
+        ),
+    )
+
+
+def _store(cache: ToolResultCache | None, key: Hashable | None, result: Any) -> None:
+    if (
+        cache is not None
+        and isinstance(result, ToolMessage)
+        and result.status != "error"
+    ):
+        cache.update(key, result)
+
+
+def wrap_tool_call(request: Any, execute: Callable[[Any], Any]) -> Any:
+    """``ToolNode`` wrapper serving cacheable tool calls from the cache."""
+    cache, key, cached = _lookup(request)
+    if cached is not None:
+        return cached
+    result = execute(request)
+    _store(cache, key, result)
+    return result
+
+
+async def awrap_tool_call(
+    request: Any, execute: Callable[[Any], Awaitable[Any]]
+) -> Any:
+    """Async ``ToolNode`` wrapper serving cacheable tool calls from the cache."""
+    cache, key, cached = _lookup(request)
+    if cached is not None:
+        return cached
+    result = await execute(request)
+    _store(cache, key, result)
+    return result
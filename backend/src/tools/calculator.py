@@ -2,6 +2,8 @@ import math
 
 from langchain_core.tools import tool
 
+from .cache import PURE, declare_cache
+
 
 @tool
 def calculator_tool(expression: str) -> str:
@@ -80,3 +82,7 @@ def calculator_tool(expression: str) -> str:
         return "Error: Invalid mathematical expression syntax."
     except Exception as e:
         return f"Error: Unable to calculate the expression - {str(e)}"
+
+
+# Same expression, same result: repeated calls are served from the tool cache
+declare_cache(calculator_tool, PURE)
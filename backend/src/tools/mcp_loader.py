@@ -3,10 +3,11 @@ import logging
 from typing import Any, Dict, List
 
 from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
 
 from config.mcp_config import MCPConfiguration
 
+from .cache import declare_filesystem_tools
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,6 +25,9 @@ async def load_single_server_tools(
     Returns:
         List of tools from the server, empty list if failed
     """
+    # Imported lazily so that only the MCP agent pays for the adapters
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+
     for attempt in range(max_retries + 1):
         try:
             logger.debug(
@@ -98,6 +102,8 @@ async def load_mcp_tools_parallel(
     for name, task in tasks:
         try:
             tools = await task
+            if name == "filesystem":
+                declare_filesystem_tools(tools)
             if tools:
                 all_tools.extend(tools)
                 completed_servers.append(name)